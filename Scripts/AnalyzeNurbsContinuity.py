@@ -0,0 +1,80 @@
+import bpy
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.append(SCRIPTS_DIR)
+
+import NurbsContinuity
+import NurbsEvaluation
+
+# Reports the geometric continuity of NURBS surface objects with NurbsContinuity.py:
+# every knot line, cyclic seam, pole and boundary shared between patches, with its gap,
+# normal angle and curvature jump, and whether the whole surface is G2.
+# Objects analyzed together are compared in world space, so seams between separately
+# modeled parts (e.g. the pieces of a fuselage) are found too. Only splines of type
+# 'NURBS' are analyzed.
+
+def object_patches(obj):
+    """
+    NurbsSurface patches of an object's NURBS splines, in world space.
+    """
+    patches = []
+    matrix = np.array(obj.matrix_world)
+    for spline in obj.data.splines:
+        if spline.type != 'NURBS':
+            continue
+        patch = NurbsEvaluation.NurbsSurface.from_spline(spline)
+        # Affine maps act on homogeneous points as they are
+        homogeneous = patch.homogeneous_points() @ matrix.T
+        homogeneous[..., :3] /= homogeneous[..., 3:]
+        patch.control_points = homogeneous
+        patches.append(patch)
+    return patches
+
+def analyze_continuity(objects, samples=NurbsContinuity.SAMPLES, curvature_tolerance=NurbsContinuity.CURVATURE_TOLERANCE):
+    """
+    Analyzes the patches of all objects together and prints the report.
+    Returns True if the surface is G2 within the tolerances.
+    """
+    patches = []
+    owners = []
+    for obj in objects:
+        found = object_patches(obj)
+        patches += found
+        owners += [(obj.name, i) for i in range(len(found))]
+    if not patches:
+        print("No NURBS surface patches found.")
+        return False
+
+    start = time.perf_counter()
+    seams, scale = NurbsContinuity.analyze_patches(patches, samples, curvature_tolerance=curvature_tolerance)
+    print(f"{', '.join(obj.name for obj in objects)}: {len(patches)} patches in {time.perf_counter() - start:.2f}s")
+    for i, (name, index) in enumerate(owners):
+        if len(objects) > 1:
+            print(f"  patch {i} = {name} spline {index}")
+    for line in NurbsContinuity.format_report(seams, scale):
+        print(line)
+    print(f"Tolerances: gap {NurbsContinuity.POSITION_TOLERANCE * scale:.3g}, "
+          f"angle {math.degrees(NurbsContinuity.ANGLE_TOLERANCE):.3g} deg, "
+          f"curvature jump {curvature_tolerance / scale:.3g}")
+    return all(seam["continuity"] == 2 for seam in seams)
+
+# --- Execution ---
+if __name__ == "__main__":
+    # Objects analyzed together; the selected surfaces if none of them exist
+    OBJECT_NAMES=("WheelProfile_g2",)
+    SAMPLES=64
+
+    objects = [bpy.data.objects[name] for name in OBJECT_NAMES if name in bpy.data.objects]
+    if not objects:
+        objects = [obj for obj in bpy.context.selected_objects if obj.type == 'SURFACE']
+    if not objects:
+        print("Please select NURBS surface objects.")
+    else:
+        analyze_continuity(objects, SAMPLES)
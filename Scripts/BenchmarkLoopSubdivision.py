@@ -0,0 +1,413 @@
+import argparse
+import importlib.util
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+try:
+    import bpy
+except ImportError:
+    # Outside Blender only the NumPy engines run
+    bpy = None
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.append(SCRIPTS_DIR)
+
+import LoopSubdivisionEngine
+import MeshArrays
+import ParallelSubdivision
+
+# Benchmarks every Loop subdivision implementation in Scripts/ on synthetic cages.
+#
+#   blender --background --factory-startup --python Scripts/BenchmarkLoopSubdivision.py -- [options]
+#   python Scripts/BenchmarkLoopSubdivision.py [options]      (NumPy engines only)
+#
+# For every implementation, cage, size and iteration count it records the wall time
+# (best of REPEATS runs), the peak memory of one extra traced run, and the output
+# element counts into a JSON results file. tracemalloc sees Python and NumPy
+# allocations; Blender's own C allocations only show up in max_rss.
+# Outputs are compared by position against the 'numpy' engine (the vertex order
+# differs between implementations, so points are matched by proximity) and against
+# the expected element counts. With a baseline file, slower or bigger runs are
+# reported as regressions.
+
+GEONODES_DIR = os.path.join(SCRIPTS_DIR, "LoopSubdivisionGeoNodes")
+RESULTS_PATH = os.path.join(SCRIPTS_DIR, "LoopSubdivisionBenchmark.json")
+
+ITERATIONS = (1, 2, 3, 4, 5)
+REPEATS = 3
+# Runs slower than this are not repeated
+REPEAT_LIMIT = 1.0
+
+# A run is a regression when it is this much slower or bigger than the baseline
+TIME_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.25
+# Timings below this are noise
+MIN_TIME = 0.005
+
+# Largest deviation from the reference, relative to the cage's bounding box diagonal
+AGREEMENT_TOLERANCE = 1e-4
+REFERENCE = 'numpy'
+
+# --- Cages ---
+# Each returns (positions, triangles) with consistent winding.
+
+def icosphere(subdivisions):
+    t = (1.0 + math.sqrt(5.0)) / 2.0
+    P = np.array([(-1, t, 0), (1, t, 0), (-1, -t, 0), (1, -t, 0), (0, -1, t), (0, 1, t),
+                  (0, -1, -t), (0, 1, -t), (t, 0, -1), (t, 0, 1), (-t, 0, -1), (-t, 0, 1)], dtype=np.float64)
+    T = np.array([(0, 11, 5), (0, 5, 1), (0, 1, 7), (0, 7, 10), (0, 10, 11), (1, 5, 9), (5, 11, 4),
+                  (11, 10, 2), (10, 7, 6), (7, 1, 8), (3, 9, 4), (3, 4, 2), (3, 2, 6), (3, 6, 8),
+                  (3, 8, 9), (4, 9, 5), (2, 4, 11), (6, 2, 10), (8, 6, 7), (9, 8, 1)], dtype=np.int32)
+    P /= np.linalg.norm(P, axis=1)[:, None]
+    for _ in range(subdivisions):
+        edges, face_edges, _, _ = LoopSubdivisionEngine.build_edges(T, len(P))
+        T = LoopSubdivisionEngine.refine_triangles(T, face_edges, len(P))
+        P = np.concatenate((P, P[edges].mean(axis=1)))
+        P /= np.linalg.norm(P, axis=1)[:, None]
+    return P, T
+
+def _grid_triangles(rows, columns, wrap_rows, wrap_columns):
+    # Two triangles per quad of a rows x columns vertex grid, optionally wrapped around
+    r = np.arange(rows if wrap_rows else rows - 1)
+    c = np.arange(columns if wrap_columns else columns - 1)
+    r, c = np.meshgrid(r, c, indexing='ij')
+    a = r * columns + c
+    b = ((r + 1) % rows) * columns + c
+    d = r * columns + (c + 1) % columns
+    e = ((r + 1) % rows) * columns + (c + 1) % columns
+    return np.stack((a, b, e, a, e, d), axis=-1).reshape(-1, 3).astype(np.int32)
+
+def torus(major_segments, minor_segments, major_radius=1.0, minor_radius=0.25):
+    u = np.arange(major_segments)[:, None] * 2.0 * math.pi / major_segments
+    v = np.arange(minor_segments)[None, :] * 2.0 * math.pi / minor_segments
+    ring = major_radius + minor_radius * np.cos(v)
+    P = np.stack(np.broadcast_arrays(ring * np.cos(u), ring * np.sin(u), minor_radius * np.sin(v) + 0 * u),
+                 axis=-1).reshape(-1, 3)
+    return P, _grid_triangles(major_segments, minor_segments, True, True)
+
+def grid(segments):
+    """
+    Open grid over [0, 1]^2 with a wavy height, so the boundary rules get exercised.
+    """
+    x, y = np.meshgrid(np.linspace(0.0, 1.0, segments + 1), np.linspace(0.0, 1.0, segments + 1), indexing='ij')
+    z = 0.1 * np.sin(6.0 * x) * np.cos(4.0 * y)
+    P = np.stack((x, y, z), axis=-1).reshape(-1, 3)
+    return P, _grid_triangles(segments + 1, segments + 1, False, False)
+
+def fan(valence, rings):
+    """
+    Disk whose center vertex has the given valence, surrounded by `rings` rings.
+    """
+    angle = np.arange(valence) * 2.0 * math.pi / valence
+    radius = np.arange(1, rings + 1)[:, None]
+    z = 0.05 * np.cos(3.0 * angle) * radius
+    ring = np.stack(np.broadcast_arrays(radius * np.cos(angle), radius * np.sin(angle), z), axis=-1).reshape(-1, 3)
+    P = np.concatenate((np.zeros((1, 3)), ring))
+
+    i = np.arange(valence)
+    center = np.stack((np.zeros(valence, dtype=np.int64), 1 + i, 1 + (i + 1) % valence), axis=1)
+    outer = _grid_triangles(rings, valence, False, True) + 1
+    return P, np.concatenate((center, outer)).astype(np.int32)
+
+# name -> (builder, parameters of each size)
+CAGES = {
+    "icosphere": (icosphere, [(1,), (3,), (5,)]),
+    "torus": (torus, [(16, 8), (64, 32), (256, 64)]),
+    "grid": (grid, [(8,), (32,), (128,)]),
+    "fan": (fan, [(12, 2), (48, 8), (192, 32)]),
+}
+
+# --- Implementations ---
+# Each takes (positions, triangles, obj, iterations) and returns the subdivided
+# (positions, triangles). obj is a fresh Blender object holding the cage, or None
+# outside Blender.
+
+def _run_numpy(positions, triangles, obj, iterations):
+    return LoopSubdivisionEngine.subdivide(positions, triangles, iterations)
+
+def _run_stencil(positions, triangles, obj, iterations):
+    # Compiling included; a cache hit only costs the apply
+    stencil, refined = LoopSubdivisionEngine.compile_stencil(triangles, len(positions), iterations)
+    return stencil.apply(positions), refined
+
+def _run_bmesh(positions, triangles, obj, iterations):
+    import LoopSubdivision
+    LoopSubdivision.loop_subdivision_bmesh(obj, iterations)
+    return MeshArrays.read_positions(obj.data), MeshArrays.read_triangles(obj.data)
+
+def _load_geonodes(file_name):
+    spec = importlib.util.spec_from_file_location(os.path.splitext(file_name)[0].replace(".", "_"),
+                                                  os.path.join(GEONODES_DIR, file_name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _evaluated_arrays(obj):
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    evaluated = obj.evaluated_get(depsgraph)
+    me = evaluated.to_mesh()
+    try:
+        return MeshArrays.read_positions(me), MeshArrays.read_triangles(me)
+    finally:
+        evaluated.to_mesh_clear()
+
+def _run_geonodes_chatgpt(positions, triangles, obj, iterations):
+    _load_geonodes("chatgpt_5.2_thinking.py").add_loop_subdivision_modifier(obj, iterations)
+    return _evaluated_arrays(obj)
+
+def _run_geonodes_gemini(positions, triangles, obj, iterations):
+    _load_geonodes("gemini_3_pro.py").create_loop_modifier(obj, iterations)
+    return _evaluated_arrays(obj)
+
+# name -> (function, needs Blender, largest output triangle count worth running)
+IMPLEMENTATIONS = {
+    "numpy": (_run_numpy, False, 8000000),
+    "stencil": (_run_stencil, False, 4000000),
+    "bmesh": (_run_bmesh, True, 300000),
+    "geonodes_chatgpt": (_run_geonodes_chatgpt, True, 2000000),
+    "geonodes_gemini": (_run_geonodes_gemini, True, 2000000),
+}
+
+# --- Running ---
+
+def _max_rss():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+def _cage_object(positions, triangles):
+    me = bpy.data.meshes.new("LoopBenchmarkCage")
+    MeshArrays.write_triangle_mesh(me, positions, triangles)
+    obj = bpy.data.objects.new("LoopBenchmarkCage", me)
+    bpy.context.scene.collection.objects.link(obj)
+    bpy.context.view_layer.objects.active = obj
+    return obj
+
+def _remove_object(obj):
+    me = obj.data
+    bpy.data.objects.remove(obj)
+    bpy.data.meshes.remove(me)
+
+def _run_once(function, positions, triangles, iterations, traced):
+    obj = _cage_object(positions, triangles) if bpy is not None else None
+    try:
+        if traced:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = function(positions, triangles, obj, iterations)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if traced else None
+        return result, elapsed, peak
+    finally:
+        if traced:
+            tracemalloc.stop()
+        if obj is not None:
+            _remove_object(obj)
+
+def _nearest_distances(points, reference, radius):
+    """
+    Distance from every point to the closest reference point, found through a spatial
+    hash with cells of size radius. Points with nothing within about radius get inf.
+    """
+    def cell_hash(cells):
+        return (cells[:, 0] * 73856093) ^ (cells[:, 1] * 19349663) ^ (cells[:, 2] * 83492791)
+
+    reference_cells = np.floor(reference / radius).astype(np.int64)
+    reference_hash = cell_hash(reference_cells)
+    order = np.argsort(reference_hash, kind='stable')
+    sorted_hash = reference_hash[order]
+    sorted_reference = reference[order]
+
+    cells = np.floor(points / radius).astype(np.int64)
+    best = np.full(len(points), np.inf)
+    for offset in np.stack(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1], indexing='ij'), axis=-1).reshape(-1, 3):
+        h = cell_hash(cells + offset)
+        lo = np.searchsorted(sorted_hash, h, side='left')
+        hi = np.searchsorted(sorted_hash, h, side='right')
+        # Hash collisions only add candidates, the distances sort them out
+        for k in range(int((hi - lo).max(initial=0))):
+            has = lo + k < hi
+            d = np.linalg.norm(points[has] - sorted_reference[lo[has] + k], axis=1)
+            best[has] = np.minimum(best[has], d)
+    return best
+
+def deviation(positions, reference, scale):
+    """
+    Largest distance between the two point sets relative to scale, matching points
+    by proximity in both directions. inf if they do not match within AGREEMENT_TOLERANCE.
+    """
+    if len(positions) != len(reference):
+        return math.inf
+    radius = AGREEMENT_TOLERANCE * scale
+    d = max(_nearest_distances(positions, reference, radius).max(initial=0.0),
+            _nearest_distances(reference, positions, radius).max(initial=0.0))
+    return float(d / scale)
+
+def _available_implementations(names):
+    available = []
+    for name in names:
+        function, needs_blender, _ = IMPLEMENTATIONS[name]
+        if needs_blender and bpy is None:
+            print(f"{name}: skipped, needs Blender")
+            continue
+        available.append(name)
+    return available
+
+def run_benchmarks(implementations=None, cages=None, iterations=ITERATIONS, repeats=REPEATS, sizes=None):
+    """
+    Runs the benchmarks and returns the list of result records. sizes restricts
+    every cage to the given size indices.
+    """
+    names = _available_implementations(implementations or list(IMPLEMENTATIONS))
+    results = []
+    for cage_name in cages or list(CAGES):
+        builder, parameters = CAGES[cage_name]
+        for size, args in enumerate(parameters):
+            if sizes is not None and size not in sizes:
+                continue
+            positions, triangles = builder(*args)
+            edge_count = len(LoopSubdivisionEngine.build_edges(triangles, len(positions))[0])
+            scale = float(np.linalg.norm(positions.max(axis=0) - positions.min(axis=0)))
+
+            for level in iterations:
+                expected = ParallelSubdivision.subdivided_size(len(positions), edge_count, len(triangles), level)
+                outputs = {}
+                for name in names:
+                    function, _, max_triangles = IMPLEMENTATIONS[name]
+                    if expected[1] > max_triangles:
+                        continue
+                    try:
+                        (out_positions, out_triangles), elapsed, _ = _run_once(
+                            function, positions, triangles, level, False)
+                        times = [elapsed]
+                        if elapsed < REPEAT_LIMIT:
+                            times += [_run_once(function, positions, triangles, level, False)[1]
+                                      for _ in range(repeats - 1)]
+                        _, _, peak = _run_once(function, positions, triangles, level, True)
+                    except Exception as e:
+                        print(f"{name} {cage_name}[{size}] x{level}: failed: {e}")
+                        continue
+
+                    outputs[name] = out_positions
+                    record = {
+                        "implementation": name,
+                        "cage": cage_name,
+                        "size": size,
+                        "parameters": list(args),
+                        "iterations": level,
+                        "cage_vertices": len(positions),
+                        "cage_triangles": len(triangles),
+                        "vertices": len(out_positions),
+                        "triangles": len(out_triangles),
+                        "expected_vertices": expected[0],
+                        "expected_triangles": expected[1],
+                        "wall_time": min(times),
+                        "peak_memory": peak,
+                        "max_rss": _max_rss(),
+                        "deviation": None,
+                    }
+                    results.append(record)
+                    print(f"{name} {cage_name}[{size}] x{level}: {record['wall_time']:.4f}s "
+                          f"{peak / 2 ** 20:.1f} MiB {record['triangles']} triangles")
+
+                reference = outputs.get(REFERENCE)
+                if reference is not None:
+                    for record in results:
+                        if (record["cage"], record["size"], record["iterations"]) == (cage_name, size, level):
+                            record["deviation"] = deviation(outputs[record["implementation"]], reference, scale)
+    return results
+
+# --- Reports ---
+
+def _key(record):
+    return record["implementation"], record["cage"], record["size"], record["iterations"]
+
+def check_results(results):
+    """
+    Returns messages for outputs with unexpected element counts or positions.
+    """
+    problems = []
+    for r in results:
+        name = "{} {}[{}] x{}".format(*_key(r))
+        if (r["vertices"], r["triangles"]) != (r["expected_vertices"], r["expected_triangles"]):
+            problems.append(f"{name}: {r['vertices']} vertices, {r['triangles']} triangles, "
+                            f"expected {r['expected_vertices']}, {r['expected_triangles']}")
+        if r["deviation"] is not None and r["deviation"] > AGREEMENT_TOLERANCE:
+            problems.append(f"{name}: positions deviate from '{REFERENCE}' by {r['deviation']:.3g}")
+    return problems
+
+def compare_to_baseline(results, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """
+    Returns messages for runs that are slower or use more memory than the same run
+    in the baseline records.
+    """
+    previous = {_key(r): r for r in baseline}
+    regressions = []
+    for r in results:
+        old = previous.get(_key(r))
+        if old is None:
+            continue
+        name = "{} {}[{}] x{}".format(*_key(r))
+        if r["wall_time"] > max(old["wall_time"] * (1.0 + time_tolerance), MIN_TIME):
+            regressions.append(f"{name}: {r['wall_time']:.4f}s, baseline {old['wall_time']:.4f}s")
+        if old["peak_memory"] and r["peak_memory"] > old["peak_memory"] * (1.0 + memory_tolerance):
+            regressions.append(f"{name}: peak {r['peak_memory']} bytes, baseline {old['peak_memory']} bytes")
+    return regressions
+
+def environment():
+    return {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "blender": bpy.app.version_string if bpy is not None else None,
+        "cpu_count": os.cpu_count(),
+    }
+
+def write_results(path, results):
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=1)
+
+def read_results(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+def _arguments():
+    # Blender passes the script's own arguments after "--"
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    parser = argparse.ArgumentParser(description="Benchmarks the Loop subdivision implementations.")
+    parser.add_argument("--output", default=RESULTS_PATH, help="results JSON file")
+    parser.add_argument("--baseline", help="results JSON file to check for regressions against")
+    parser.add_argument("--implementations", nargs="+", choices=list(IMPLEMENTATIONS))
+    parser.add_argument("--cages", nargs="+", choices=list(CAGES))
+    parser.add_argument("--sizes", nargs="+", type=int, help="size indices, 0 is the smallest")
+    parser.add_argument("--iterations", nargs="+", type=int, default=list(ITERATIONS))
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    return parser.parse_args(argv)
+
+# --- Execution ---
+if __name__ == "__main__":
+    args = _arguments()
+    results = run_benchmarks(args.implementations, args.cages, args.iterations, args.repeats, args.sizes)
+    write_results(args.output, results)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    problems = check_results(results)
+    if args.baseline:
+        problems += compare_to_baseline(results, read_results(args.baseline))
+    for problem in problems:
+        print(problem)
+    if problems:
+        sys.exit(1)
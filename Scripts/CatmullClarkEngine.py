@@ -0,0 +1,229 @@
+import numpy as np
+
+import SubdivisionStencils
+from HalfEdgeMesh import HalfEdgeMesh
+
+# Array based Catmull-Clark subdivision of polygon meshes, built from sparse
+# stencils like the Loop engine (LoopSubdivisionEngine.py). Only NumPy is used.
+# Polygons are given Blender style as (loop_vertices, loop_starts).
+#
+# The rules are those of OpenSubdiv's Catmark scheme, which Blender's Subsurf
+# modifier uses:
+#  - Face points: average of the face's vertices.
+#  - Edge points: interior edge: (v1 + v2 + f1 + f2) / 4 with f the adjacent face points,
+#    boundary or non-manifold edge: midpoint.
+#  - Vertex points: interior, valence n: ((n - 2) * P + sum(neighbors) / n + sum(face points) / n) / n
+#    smooth boundary: 3/4 * P + 1/8 * (boundary neighbor sum)
+#    corners (a boundary vertex of a single face) stay put with boundary_smooth='PRESERVE_CORNERS',
+#    the Subsurf default, and follow the boundary rule with 'ALL'. Non-manifold vertices stay put.
+#  - Each n-gon becomes n quads (P, edge point, face point, previous edge point), one per corner
+#    in loop order, so the descendants of a cage face are contiguous.
+#
+# The refined mesh stores the vertex points first (same indices as before), then one
+# edge point per edge (V + e), then one face point per face (V + E + f).
+# Edge creases are not supported.
+
+BOUNDARY_SMOOTH = ('PRESERVE_CORNERS', 'ALL')
+
+def polygon_mesh(loop_vertices, loop_starts, vertex_count):
+    return HalfEdgeMesh.from_polygons(loop_vertices, loop_starts, vertex_count=vertex_count)
+
+def _face_corners(mesh, faces):
+    """
+    Returns (owner, half_edges): every half-edge of the given faces, with the index
+    into faces it belongs to.
+    """
+    sizes = mesh.face_size[faces]
+    owner = np.repeat(np.arange(len(faces)), sizes)
+    starts = np.repeat(mesh.face_start[faces].astype(np.int64) - (np.cumsum(sizes) - sizes), sizes)
+    return owner, starts + np.arange(int(sizes.sum()), dtype=np.int64)
+
+def _vertex_classes(mesh, boundary_smooth):
+    """
+    Returns (valence, interior, smooth_boundary) per vertex; all other vertices stay put.
+    """
+    if boundary_smooth not in BOUNDARY_SMOOTH:
+        raise ValueError(f"Unknown boundary_smooth '{boundary_smooth}', expected one of {BOUNDARY_SMOOTH}")
+    valence = mesh.valence()
+    boundary_valence = mesh.boundary_valence()
+    ring, ring_length, closed = mesh.vertex_rings()
+    # A single fan of faces around the vertex
+    manifold = (ring_length == valence) & (valence > 0)
+
+    interior = manifold & closed & (boundary_valence == 0)
+    smooth_boundary = manifold & ~closed & (boundary_valence == 2)
+    if boundary_smooth == 'PRESERVE_CORNERS':
+        smooth_boundary &= valence > 2
+    return valence, interior, smooth_boundary
+
+def level_stencil(mesh, boundary_smooth='PRESERVE_CORNERS'):
+    """
+    Returns the stencil of one Catmull-Clark step, mapping the V control points to
+    the V + E + F points of the refined mesh.
+    """
+    V, E, F = mesh.vertex_count, mesh.edge_count, mesh.face_count
+    size = mesh.face_size.astype(np.float64)
+    rows, cols, weights = [], [], []
+
+    # Face points
+    rows.append(V + E + mesh.face)
+    cols.append(mesh.vertex)
+    weights.append(1.0 / size[mesh.face])
+
+    # Edge points: ends, then the vertices of both adjacent faces
+    smooth = mesh.edge_face_count == 2
+    edge_rows = V + np.arange(E)
+    end_weight = np.where(smooth, 0.25, 0.5)
+    rows += [edge_rows, edge_rows]
+    cols += [mesh.edges[:, 0], mesh.edges[:, 1]]
+    weights += [end_weight, end_weight]
+    smooth_edges = np.nonzero(smooth)[0]
+    for side in range(2):
+        faces = mesh.face[mesh.edge_halves[smooth_edges, side]]
+        owner, halves = _face_corners(mesh, faces)
+        rows.append(edge_rows[smooth_edges][owner])
+        cols.append(mesh.vertex[halves])
+        weights.append(0.25 / size[faces][owner])
+
+    # Vertex points
+    valence, interior, smooth_boundary = _vertex_classes(mesh, boundary_smooth)
+    n = np.maximum(valence, 1).astype(np.float64)
+    rows.append(np.arange(V))
+    cols.append(np.arange(V))
+    weights.append(np.where(interior, (n - 2.0) / n, np.where(smooth_boundary, 0.75, 1.0)))
+
+    owner = np.concatenate((mesh.edges[:, 0], mesh.edges[:, 1]))
+    neighbor = np.concatenate((mesh.edges[:, 1], mesh.edges[:, 0]))
+    on_boundary = np.tile(mesh.edge_face_count == 1, 2)
+    rows.append(owner)
+    cols.append(neighbor)
+    weights.append(np.where(interior[owner], 1.0 / n[owner] ** 2,
+                            np.where(smooth_boundary[owner] & on_boundary, 0.125, 0.0)))
+
+    # Face points around interior vertices, expanded to the faces' vertices
+    corner_of = mesh.vertex
+    inner = np.nonzero(interior[corner_of])[0]
+    owner, halves = _face_corners(mesh, mesh.face[inner])
+    v = corner_of[inner][owner]
+    rows.append(v)
+    cols.append(mesh.vertex[halves])
+    weights.append(1.0 / (n[v] ** 2 * size[mesh.face[inner]][owner]))
+
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+    weights = np.concatenate(weights)
+    nonzero = weights != 0.0
+    return SubdivisionStencils.SparseStencil.from_coo(
+        rows[nonzero], cols[nonzero], weights[nonzero], V + E + F, V)
+
+def refine_polygons(mesh):
+    """
+    Returns the (H, 4) quads of one Catmull-Clark step, one per half-edge in order.
+    """
+    V, E = mesh.vertex_count, mesh.edge_count
+    quads = np.empty((mesh.half_edge_count, 4), dtype=np.int32)
+    quads[:, 0] = mesh.vertex
+    quads[:, 1] = V + mesh.edge
+    quads[:, 2] = V + E + mesh.face
+    quads[:, 3] = V + mesh.edge[mesh.prev]
+    return quads
+
+def refine_mesh(mesh):
+    """
+    Returns (quads, refined HalfEdgeMesh) of one Catmull-Clark step.
+    """
+    quads = refine_polygons(mesh)
+    vertex_count = mesh.vertex_count + mesh.edge_count + mesh.face_count
+    refined = HalfEdgeMesh.from_polygons(quads.ravel(), np.arange(0, 4 * len(quads), 4, dtype=np.int32),
+                                         vertex_count=vertex_count)
+    return quads, refined
+
+def limit_stencil(mesh, boundary_smooth='PRESERVE_CORNERS'):
+    """
+    Returns the stencil that moves every vertex of a quad mesh (any Catmull-Clark
+    level above 0) onto the limit surface:
+      interior, valence n: (n^2 * P + 4 * sum(neighbors) + sum(diagonals)) / (n * (n + 5))
+      smooth boundary:     (Q_0 + 4 * P + Q_1) / 6
+    """
+    V = mesh.vertex_count
+    valence, interior, smooth_boundary = _vertex_classes(mesh, boundary_smooth)
+    n = np.maximum(valence, 1).astype(np.float64)
+    scale = 1.0 / (n * (n + 5.0))
+
+    owner = np.concatenate((mesh.edges[:, 0], mesh.edges[:, 1]))
+    neighbor = np.concatenate((mesh.edges[:, 1], mesh.edges[:, 0]))
+    on_boundary = np.tile(mesh.edge_face_count == 1, 2)
+    diagonal = np.nonzero(interior[mesh.vertex])[0]
+
+    rows = np.concatenate((np.arange(V), owner, mesh.vertex[diagonal]))
+    cols = np.concatenate((np.arange(V), neighbor, mesh.opposite[diagonal]))
+    weights = np.concatenate((
+        np.where(interior, n / (n + 5.0), np.where(smooth_boundary, 4.0 / 6.0, 1.0)),
+        np.where(interior[owner], 4.0 * scale[owner], np.where(smooth_boundary[owner] & on_boundary, 1.0 / 6.0, 0.0)),
+        scale[mesh.vertex[diagonal]],
+    ))
+    nonzero = weights != 0.0
+    return SubdivisionStencils.SparseStencil.from_coo(rows[nonzero], cols[nonzero], weights[nonzero], V, V)
+
+def face_origins(loop_starts, loop_count, levels):
+    """
+    Index of the cage face every level-N quad descends from.
+    """
+    if levels == 0:
+        return np.arange(len(loop_starts))
+    sizes = np.diff(np.append(loop_starts, loop_count))
+    return np.repeat(np.repeat(np.arange(len(loop_starts)), sizes), 4 ** (levels - 1))
+
+def subdivide(positions, loop_vertices, loop_starts, levels=1, limit_surface=False,
+              boundary_smooth='PRESERVE_CORNERS'):
+    """
+    Applies Catmull-Clark subdivision and returns (positions, quads). With levels=0
+    the cage is returned unchanged as (positions, None).
+    """
+    P = np.asarray(positions, dtype=np.float64)
+    if levels == 0:
+        return P, None
+    mesh = polygon_mesh(loop_vertices, loop_starts, len(P))
+    for _ in range(levels):
+        P = level_stencil(mesh, boundary_smooth).apply(P)
+        quads, mesh = refine_mesh(mesh)
+    if limit_surface:
+        P = limit_stencil(mesh, boundary_smooth).apply(P)
+    return P, quads
+
+def compile_stencil(loop_vertices, loop_starts, vertex_count, levels, limit_surface=False,
+                    boundary_smooth='PRESERVE_CORNERS'):
+    """
+    Composes the stencils of `levels` steps (and the limit stencil) into one.
+    Returns (stencil, quads). levels must be at least 1.
+    """
+    if levels < 1:
+        raise ValueError("compile_stencil() needs at least one level")
+    mesh = polygon_mesh(loop_vertices, loop_starts, vertex_count)
+    stencil = None
+    for _ in range(levels):
+        step = level_stencil(mesh, boundary_smooth)
+        stencil = step if stencil is None else step.compose(stencil)
+        quads, mesh = refine_mesh(mesh)
+    if limit_surface:
+        stencil = limit_stencil(mesh, boundary_smooth).compose(stencil)
+    return stencil, quads
+
+def cached_stencil(loop_vertices, loop_starts, vertex_count, levels, limit_surface=False,
+                   boundary_smooth='PRESERVE_CORNERS', cache=None):
+    """
+    compile_stencil() through a StencilCache keyed by a hash of the polygons.
+    """
+    if cache is None:
+        cache = SubdivisionStencils.default_cache()
+    scheme = f"catmull_clark:{boundary_smooth}:{limit_surface}:{len(loop_starts)}"
+    key = SubdivisionStencils.topology_key(scheme, np.concatenate((loop_vertices, loop_starts)), vertex_count, levels)
+
+    entry = cache.get(key)
+    if entry is None:
+        stencil, quads = compile_stencil(loop_vertices, loop_starts, vertex_count, levels, limit_surface,
+                                         boundary_smooth)
+        entry = stencil.to_arrays()
+        entry["quads"] = quads
+        cache.put(key, entry)
+    return SubdivisionStencils.SparseStencil.from_arrays(entry), entry["quads"]
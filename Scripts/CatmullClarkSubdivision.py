@@ -0,0 +1,137 @@
+import bpy
+import os
+import sys
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.append(SCRIPTS_DIR)
+
+import CatmullClarkEngine
+import MeshArrays
+import SubdivisionStencils
+
+# Catmull-Clark subdivision of Blender meshes with the array engine in
+# CatmullClarkEngine.py. Positions match a Subsurf modifier with the same levels,
+# "Use Limit Surface" and boundary smooth settings; the vertex order differs.
+# Edge creases and UVs are not carried over.
+
+def _write_subdivided(me, positions, quads, loop_starts, loop_count, levels, material_index, use_smooth):
+    origin = CatmullClarkEngine.face_origins(loop_starts, loop_count, levels)
+    MeshArrays.write_polygon_mesh(me, positions, quads.ravel(), np.arange(0, 4 * len(quads), 4, dtype=np.int32))
+    MeshArrays.write_polygon_values(me, "material_index", material_index[origin])
+    MeshArrays.write_polygon_values(me, "use_smooth", use_smooth[origin])
+
+def catmull_clark_subdivision(obj, levels=3, limit_surface=True, boundary_smooth='PRESERVE_CORNERS'):
+    """
+    Applies Catmull-Clark subdivision to the object's mesh in place.
+    The defaults are those of a new Subsurf modifier at render level 3.
+    """
+    me = obj.data
+
+    # Ensure we are in Object mode to modify mesh data
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+    positions = MeshArrays.read_positions(me)
+    loop_vertices, loop_starts, _ = MeshArrays.read_polygons(me)
+    material_index = MeshArrays.read_polygon_values(me, "material_index", np.int32)
+    use_smooth = MeshArrays.read_polygon_values(me, "use_smooth", bool)
+
+    positions, quads = CatmullClarkEngine.subdivide(positions, loop_vertices, loop_starts, levels,
+                                                    limit_surface, boundary_smooth)
+    if quads is None:
+        return
+    _write_subdivided(me, positions, quads, loop_starts, len(loop_vertices), levels, material_index, use_smooth)
+
+def _subsurf_settings(obj):
+    """
+    Returns (levels, limit_surface, boundary_smooth) of the object's modifier stack if it
+    is a single Catmull-Clark Subsurf modifier, otherwise None.
+    """
+    if len(obj.modifiers) != 1:
+        return None
+    modifier = obj.modifiers[0]
+    if type(modifier) is not bpy.types.SubsurfModifier or modifier.subdivision_type != 'CATMULL_CLARK':
+        return None
+    return modifier.render_levels, modifier.use_limit_surface, modifier.boundary_smooth
+
+def bake_catmull_clark(objects, levels=None):
+    """
+    Replaces the single Subsurf modifier of each object by a subdivided copy of its
+    mesh named "<mesh>_CC<levels>", for export. levels overrides the modifier's render
+    levels; with levels given, objects without modifiers are baked too.
+    Objects sharing a mesh and settings are baked once, and meshes with the same
+    connectivity share one stencil and are subdivided in a single pass.
+    Objects with any other modifier stack are skipped.
+    Returns the baked objects.
+    """
+    # Ensure we are in Object mode to modify mesh data
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+    # (mesh, levels, limit_surface, boundary_smooth) -> objects
+    jobs = {}
+    for obj in objects:
+        if obj.type != 'MESH':
+            continue
+        settings = _subsurf_settings(obj)
+        if settings is None:
+            if len(obj.modifiers) or levels is None:
+                print(f"{obj.name}: skipped, modifier stack is not a single Catmull-Clark Subsurf modifier")
+                continue
+            settings = (levels, True, 'PRESERVE_CORNERS')
+        elif levels is not None:
+            settings = (levels,) + settings[1:]
+        jobs.setdefault((obj.data,) + tuple(settings), []).append(obj)
+
+    # Group the meshes by connectivity
+    groups = {}
+    for job in jobs:
+        me, job_levels, limit_surface, boundary_smooth = job
+        loop_vertices, loop_starts, _ = MeshArrays.read_polygons(me)
+        scheme = f"catmull_clark:{boundary_smooth}:{limit_surface}:{len(loop_starts)}"
+        key = SubdivisionStencils.topology_key(scheme, np.concatenate((loop_vertices, loop_starts)),
+                                               len(me.vertices), job_levels)
+        groups.setdefault(key, (loop_vertices, loop_starts, []))[2].append(job)
+
+    baked = []
+    for loop_vertices, loop_starts, group in groups.values():
+        me, job_levels, limit_surface, boundary_smooth = group[0]
+        if job_levels == 0:
+            continue
+        stencil, quads = CatmullClarkEngine.cached_stencil(loop_vertices, loop_starts, len(me.vertices), job_levels,
+                                                           limit_surface, boundary_smooth)
+        # One sparse product for the whole group: the positions side by side as columns
+        positions = stencil.apply(np.hstack([MeshArrays.read_positions(job[0]) for job in group]))
+
+        for i, job in enumerate(group):
+            me = job[0]
+            new_me = bpy.data.meshes.new(f"{me.name}_CC{job_levels}")
+            for material in me.materials:
+                new_me.materials.append(material)
+            _write_subdivided(new_me, positions[:, 3 * i:3 * i + 3], quads, loop_starts, len(loop_vertices),
+                              job_levels,
+                              MeshArrays.read_polygon_values(me, "material_index", np.int32),
+                              MeshArrays.read_polygon_values(me, "use_smooth", bool))
+            for obj in jobs[job]:
+                obj.data = new_me
+                obj.modifiers.clear()
+                baked.append(obj)
+    return baked
+
+# --- Execution ---
+if __name__ == "__main__":
+    # Bake mode: replace the Subsurf modifiers of all selected objects by real geometry
+    BAKE=True
+    LEVELS=3
+
+    if BAKE:
+        print(f"Baking Catmull-Clark Subdivision of {len(bpy.context.selected_objects)} objects...")
+        bake_catmull_clark(bpy.context.selected_objects)
+        print("Done.")
+    elif bpy.context.active_object and bpy.context.active_object.type == 'MESH':
+        print(f"Applying Catmull-Clark Subdivision to {bpy.context.active_object.name}...")
+        catmull_clark_subdivision(bpy.context.active_object, LEVELS)
+        print("Done.")
+    else:
+        print("Please select a mesh object.")
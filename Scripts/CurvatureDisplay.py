@@ -0,0 +1,203 @@
+import bpy
+import hashlib
+import os
+import sys
+
+import numpy as np
+from bpy.app.handlers import persistent
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.append(SCRIPTS_DIR)
+
+import CurvatureFields
+import MeshArrays
+import NurbsEvaluation
+
+# Shows the curvature of CurvatureFields.py on Blender objects, to judge studies such as
+# CurvatureStudy*, CurvatureTesting and CircularSubdStudy by numbers instead of shading.
+#
+#   - meshes: a per-vertex color attribute (blue negative, white zero, red positive) of
+#     the mean or Gaussian curvature or k1 / k2, written with one foreach_set, and
+#     optionally combs along the vertex normals
+#   - NURBS surfaces: curvature combs of the normal curvature along the u and v iso-lines
+#     of every patch, with the envelope through the tips
+# Combs are one Curves object "<object>_CurvatureCombs", written with one add_curves()
+# and one foreach_set.
+#
+# With register(obj) the display follows edits: after every depsgraph update that
+# changes the object's positions it is recomputed, reusing the mesh operators while the
+# topology stays the same. In edit mode only the combs of meshes follow, the color
+# attribute is written when leaving it; surfaces follow outside edit mode.
+
+COLOR_ATTRIBUTE = "Curvature"
+COMBS_SUFFIX = "_CurvatureCombs"
+# Stored on registered objects: the displayed field
+DISPLAY_PROPERTY = "curvature_display"
+# Longest comb tooth, relative to the object's size
+COMB_LENGTH = 0.1
+
+# --- Combs ---
+
+def write_combs(obj, roots, tips, envelopes=()):
+    """
+    Replaces the combs object of obj: one 2-point curve per tooth and one curve per
+    envelope, in obj's local space.
+    """
+    name = obj.name + COMBS_SUFFIX
+    combs = bpy.data.objects.get(name)
+    curves = bpy.data.hair_curves.new(name)
+    sizes = [2] * len(roots) + [len(e) for e in envelopes]
+    if sizes:
+        curves.add_curves(sizes)
+        points = np.concatenate([np.stack((roots, tips), axis=1).reshape(-1, 3)] + list(envelopes))
+        curves.position_data.foreach_set("vector", np.ascontiguousarray(points, dtype=np.float32).ravel())
+    if combs is None:
+        combs = bpy.data.objects.new(name, curves)
+        for collection in obj.users_collection:
+            collection.objects.link(combs)
+    else:
+        old = combs.data
+        combs.data = curves
+        if old.users == 0:
+            bpy.data.hair_curves.remove(old)
+    combs.matrix_world = obj.matrix_world
+    return combs
+
+def _comb_scale(values, size):
+    limit = np.percentile(np.abs(np.nan_to_num(values)), CurvatureFields.COLOR_PERCENTILE) if len(values) else 0.0
+    return COMB_LENGTH * size / limit if limit > 0 else 0.0
+
+# --- Meshes ---
+
+# Object name -> (topology hash, MeshCurvature)
+_operators = {}
+# Object name -> (hash of the positions, edit mode) last shown
+_shown = {}
+
+def _positions_key(obj, positions):
+    return hashlib.sha256(positions.tobytes()).hexdigest(), obj.mode == 'EDIT'
+
+def _mesh_operator(name, triangles, vertex_count):
+    key = hashlib.sha256(triangles.tobytes()).hexdigest() + f":{vertex_count}"
+    cached = _operators.get(name)
+    if cached is None or cached[0] != key:
+        cached = _operators[name] = (key, CurvatureFields.MeshCurvature(triangles, vertex_count))
+    return cached[1]
+
+def show_mesh_curvature(obj, field="mean", combs=False):
+    """
+    Writes the field ("mean", "gaussian", "k1" or "k2") of a mesh object as a color
+    attribute, and combs if asked. Returns the CurvatureFields result.
+    """
+    editing = obj.mode == 'EDIT'
+    if editing:
+        obj.update_from_editmode()
+    me = obj.data
+    positions = MeshArrays.read_positions(me)
+    triangles = MeshArrays.read_triangles(me)
+    result = _mesh_operator(obj.name, triangles, len(positions)).compute(positions, directions=False)
+    _shown[obj.name] = _positions_key(obj, positions)
+
+    values = result[field]
+    if not editing:
+        MeshArrays.write_attribute(me, COLOR_ATTRIBUTE, 'FLOAT_COLOR', 'POINT', CurvatureFields.diverging_colors(values))
+        me.color_attributes.active_color = me.color_attributes[COLOR_ATTRIBUTE]
+    if combs:
+        size = float(np.linalg.norm(positions.max(axis=0) - positions.min(axis=0))) if len(positions) else 0.0
+        tips = positions + (_comb_scale(values, size) * values)[:, None] * result["normal"]
+        write_combs(obj, positions, tips)
+    return result
+
+# --- NURBS surfaces ---
+
+def show_surface_curvature(obj, resolution=32):
+    """
+    Writes combs of the normal curvature along the iso-lines of every NURBS spline of a
+    surface object, resolution x resolution lines per patch.
+    """
+    grids = []
+    for spline in obj.data.splines:
+        if spline.type != 'NURBS':
+            continue
+        patch = NurbsEvaluation.NurbsSurface.from_spline(spline)
+        d = patch.evaluate_grid(resolution, resolution, derivatives=2)
+        normal = CurvatureFields.surface_curvature(d)["normal"]
+        grids.append((d[0, 0], np.nan_to_num(normal), CurvatureFields.normal_curvature(d, 'u'),
+                      CurvatureFields.normal_curvature(d, 'v')))
+    if not grids:
+        return None
+
+    positions = np.concatenate([g[0].reshape(-1, 3) for g in grids])
+    size = float(np.linalg.norm(positions.max(axis=0) - positions.min(axis=0)))
+    scale = _comb_scale(np.concatenate([np.concatenate((g[2].ravel(), g[3].ravel())) for g in grids]), size)
+    roots, tips, envelopes = [], [], []
+    for points, normal, curvature_u, curvature_v in grids:
+        tips_u = points + (scale * np.nan_to_num(curvature_u))[..., None] * normal
+        tips_v = points + (scale * np.nan_to_num(curvature_v))[..., None] * normal
+        roots += [points.reshape(-1, 3), points.reshape(-1, 3)]
+        tips += [tips_u.reshape(-1, 3), tips_v.reshape(-1, 3)]
+        # Grid rows run along u, columns along v
+        envelopes += list(tips_u) + list(tips_v.transpose(1, 0, 2))
+    return write_combs(obj, np.concatenate(roots), np.concatenate(tips), envelopes)
+
+def show_curvature(obj, field="mean", combs=False):
+    if obj.type == 'MESH':
+        return show_mesh_curvature(obj, field, combs)
+    if obj.type == 'SURFACE':
+        return show_surface_curvature(obj)
+    raise ValueError(f"{obj.name} is a {obj.type} object, expected a mesh or NURBS surface")
+
+# --- Live updates ---
+
+@persistent
+def _depsgraph_update_post(scene, depsgraph):
+    for update in depsgraph.updates:
+        if not update.is_updated_geometry or not isinstance(update.id, bpy.types.Object):
+            continue
+        obj = update.id.original
+        if obj.get(DISPLAY_PROPERTY) is None or obj.name.endswith(COMBS_SUFFIX):
+            continue
+        if obj.type == 'MESH':
+            if obj.mode == 'EDIT':
+                obj.update_from_editmode()
+            # Writing the colors is an update too; skip when the positions are unchanged
+            if _positions_key(obj, MeshArrays.read_positions(obj.data)) == _shown.get(obj.name):
+                continue
+            show_mesh_curvature(obj, obj[DISPLAY_PROPERTY], combs=obj.name + COMBS_SUFFIX in bpy.data.objects)
+        else:
+            show_surface_curvature(obj)
+
+def register(obj, field="mean"):
+    """
+    Keeps the curvature display of obj up to date.
+    """
+    obj[DISPLAY_PROPERTY] = field
+    if _depsgraph_update_post not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(_depsgraph_update_post)
+
+def unregister(obj=None):
+    """
+    Stops updating obj, or every object without obj.
+    """
+    for o in ([obj] if obj else bpy.data.objects):
+        if DISPLAY_PROPERTY in o:
+            del o[DISPLAY_PROPERTY]
+    if obj is None and _depsgraph_update_post in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_depsgraph_update_post)
+
+# --- Execution ---
+if __name__ == "__main__":
+    # "mean", "gaussian", "k1" or "k2" (meshes)
+    FIELD="mean"
+    COMBS=False
+    LIVE=True
+
+    objects = [obj for obj in bpy.context.selected_objects if obj.type in ('MESH', 'SURFACE')]
+    if not objects:
+        print("Please select mesh or NURBS surface objects.")
+    for obj in objects:
+        show_curvature(obj, FIELD, COMBS)
+        if LIVE:
+            register(obj, FIELD)
+        print(f"Showing the curvature of {obj.name}")
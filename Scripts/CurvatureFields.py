@@ -0,0 +1,240 @@
+import numpy as np
+
+# Per-vertex curvature of triangle meshes and NURBS surfaces: mean curvature H, Gaussian
+# curvature K, principal curvatures k1 >= k2 and their directions. Only NumPy is used.
+#
+# Meshes use the discrete operators of Meyer, Desbrun, Schroder and Barr, "Discrete
+# Differential-Geometry Operators for Triangulated 2-Manifolds" (2003):
+#   - H from the cotangent Laplacian of the positions, over the mixed Voronoi area
+#   - K from the angle defect (pi instead of 2 pi on boundary vertices), over the same area
+#   - k1, k2 = H +- sqrt(max(H^2 - K, 0))
+# Principal directions are the eigenvectors of the quadratic form that fits the normal
+# curvatures along the edges to the neighbors best, area weighted (the least squares
+# variant of Meyer et al. of Taubin's tensor).
+# Everything that only depends on the triangles is computed once by MeshCurvature, so
+# recomputing after a vertex edit is a few array passes.
+#
+# NURBS surfaces (NurbsEvaluation.py) use their analytic first and second derivatives.
+#
+# Signs: with outward normals a sphere of radius r has H = 1 / r and K = 1 / r^2.
+# Mesh normals follow the triangle winding, NURBS normals cross(dS/du, dS/dv).
+
+# Fraction of the largest |value| mapped to full color, by percentile
+COLOR_PERCENTILE = 95.0
+
+# --- Meshes ---
+
+class MeshCurvature:
+    """
+    Curvature operators of one triangle topology. Build it once, then call
+    compute() with the positions after every edit.
+    """
+
+    def __init__(self, triangles, vertex_count):
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        self.vertex_count = int(vertex_count)
+
+        # Corner c of a triangle and the two others, in winding order
+        self._corner = self.triangles.ravel()
+        self._next = np.roll(self.triangles, -1, axis=1).ravel()
+        self._previous = np.roll(self.triangles, 1, axis=1).ravel()
+
+        # Boundary edges are used by one triangle only
+        edges = np.sort(np.stack((self._corner, self._next), axis=1), axis=1)
+        _, inverse, counts = np.unique(edges, axis=0, return_inverse=True, return_counts=True)
+        boundary_edges = edges[counts[inverse.ravel()] == 1]
+        self.boundary = np.zeros(self.vertex_count, dtype=bool)
+        self.boundary[boundary_edges.ravel()] = True
+
+    @classmethod
+    def from_half_edge_mesh(cls, mesh):
+        """
+        Operators of a HalfEdgeMesh made of triangles.
+        """
+        if not mesh.is_triangle_mesh():
+            raise ValueError("MeshCurvature needs a triangle mesh, build it with triangulate=True")
+        return cls(mesh.triangles(), mesh.vertex_count)
+
+    def _sum(self, index, values):
+        if values.ndim == 1:
+            return np.bincount(index, values, minlength=self.vertex_count)
+        return np.stack([np.bincount(index, values[:, k], minlength=self.vertex_count)
+                         for k in range(values.shape[1])], axis=1)
+
+    def compute(self, positions, directions=True):
+        """
+        Returns a dict of (V,) arrays mean, gaussian, k1, k2, area and (V, 3) arrays
+        normal, d1, d2 (the directions of k1 and k2, left out without directions, which
+        take about half the time).
+        """
+        P = np.asarray(positions, dtype=np.float64)
+        corners = P[self.triangles]
+        a = corners.reshape(-1, 3)
+        b = np.roll(corners, -1, axis=1).reshape(-1, 3)
+        c = np.roll(corners, 1, axis=1).reshape(-1, 3)
+        ab = b - a
+        ac = c - a
+        cross = np.cross(ab, ac)
+        double_area = np.linalg.norm(cross, axis=1)
+        dot = np.einsum('cd,cd->c', ab, ac)
+        # Angle and cotangent at every corner
+        angle = np.arctan2(double_area, dot)
+        cot = dot / np.maximum(double_area, 1e-300)
+
+        # Mixed Voronoi area. The corner's cotangent weighs the opposite edge b-c; the
+        # corners after and before this one are those at b and c
+        F = len(self.triangles)
+        cot_b = np.roll(cot.reshape(F, 3), -1, axis=1).ravel()
+        cot_c = np.roll(cot.reshape(F, 3), 1, axis=1).ravel()
+        obtuse = (angle.reshape(F, 3) > np.pi / 2)
+        any_obtuse = np.repeat(obtuse.any(axis=1), 3)
+        triangle_area = 0.5 * double_area
+        voronoi = (np.einsum('cd,cd->c', ab, ab) * cot_c + np.einsum('cd,cd->c', ac, ac) * cot_b) / 8.0
+        mixed = np.where(any_obtuse, np.where(obtuse.ravel(), triangle_area / 2, triangle_area / 4), voronoi)
+        area = np.maximum(self._sum(self._corner, mixed), 1e-300)
+
+        # Cotangent Laplacian: edge b-c gets the cotangent of this corner, both ways
+        weight = 0.5 * cot
+        laplacian = (self._sum(self._next, weight[:, None] * (c - b))
+                     + self._sum(self._previous, weight[:, None] * (b - c)))
+
+        normal = self._sum(self._corner, cross)
+        normal /= np.maximum(np.linalg.norm(normal, axis=1, keepdims=True), 1e-300)
+        mean = -np.einsum('vd,vd->v', laplacian, normal) / (2.0 * area)
+        defect = np.where(self.boundary, np.pi, 2.0 * np.pi) - self._sum(self._corner, angle)
+        gaussian = defect / area
+        root = np.sqrt(np.maximum(mean * mean - gaussian, 0.0))
+
+        result = {
+            "mean": mean,
+            "gaussian": gaussian,
+            "k1": mean + root,
+            "k2": mean - root,
+            "area": area,
+            "normal": normal,
+        }
+        if directions:
+            result["d1"], result["d2"] = self._principal_directions(ab, ac, normal, triangle_area)
+        return result
+
+    def _principal_directions(self, ab, ac, normal, triangle_area):
+        # Normal curvatures along the two edges of every corner, weighted by the
+        # triangle's area, in a tangent frame (e1, e2) of the corner's vertex
+        helper = np.where(np.abs(normal[:, :1]) < 0.9, [[1.0, 0.0, 0.0]], [[0.0, 1.0, 0.0]])
+        e1 = np.cross(normal, helper)
+        e1 /= np.maximum(np.linalg.norm(e1, axis=1, keepdims=True), 1e-300)
+        e2 = np.cross(normal, e1)
+        n, corner_e1, corner_e2 = normal[self._corner], e1[self._corner], e2[self._corner]
+
+        sums = np.zeros((9, len(n)))
+        for edge in (ab, ac):
+            height = np.einsum('cd,cd->c', n, edge)
+            kappa = -2.0 * height / np.maximum(np.einsum('cd,cd->c', edge, edge), 1e-300)
+            t1 = np.einsum('cd,cd->c', edge, corner_e1)
+            t2 = np.einsum('cd,cd->c', edge, corner_e2)
+            t_length2 = np.maximum(t1 * t1 + t2 * t2, 1e-300)
+            features = (t1 * t1 / t_length2, 2.0 * t1 * t2 / t_length2, t2 * t2 / t_length2)
+            for k, (i, j) in enumerate(((0, 0), (0, 1), (0, 2), (1, 1), (1, 2), (2, 2))):
+                sums[k] += triangle_area * features[i] * features[j]
+            for i in range(3):
+                sums[6 + i] += triangle_area * kappa * features[i]
+
+        # Weighted least squares fit of the form [[m11, m12], [m12, m22]] to the normal
+        # curvatures: kappa = m11 t1^2 + 2 m12 t1 t2 + m22 t2^2
+        sums = self._sum(self._corner, sums.T)
+        A = sums[:, [0, 1, 2, 1, 3, 4, 2, 4, 5]].reshape(-1, 3, 3)
+        rhs = sums[:, 6:]
+        # Keeps vertices with too few edge directions solvable
+        A += (1e-9 * np.trace(A, axis1=1, axis2=2) + 1e-300)[:, None, None] * np.eye(3)
+        m11, m12, m22 = np.linalg.solve(A, rhs[..., None])[..., 0].T
+
+        # Eigenvector of the larger eigenvalue of [[m11, m12], [m12, m22]]
+        phi = 0.5 * np.arctan2(2.0 * m12, m11 - m22)
+        d1 = np.cos(phi)[:, None] * e1 + np.sin(phi)[:, None] * e2
+        d2 = np.cross(normal, d1)
+        return d1, d2
+
+def mesh_curvature(positions, triangles):
+    """
+    MeshCurvature(triangles, len(positions)).compute(positions), for one-off use.
+    """
+    return MeshCurvature(triangles, len(positions)).compute(positions)
+
+# --- NURBS surfaces ---
+
+def surface_curvature(d):
+    """
+    Curvature from evaluated surface derivatives, the dict of NurbsSurface.evaluate*()
+    with derivatives=2, at any sample shape (..., 3). Returns the dict of
+    MeshCurvature.compute() without area; degenerate samples (poles) are NaN.
+    """
+    Su, Sv = d[1, 0], d[0, 1]
+    E = np.einsum('...d,...d->...', Su, Su)
+    F = np.einsum('...d,...d->...', Su, Sv)
+    G = np.einsum('...d,...d->...', Sv, Sv)
+    det = E * G - F * F
+    valid = det > 1e-12 * np.maximum(E * G, 1e-300)
+    det = np.where(valid, det, np.nan)
+    normal = np.cross(Su, Sv) / np.sqrt(det)[..., None]
+    # Second fundamental form of the opposite normal, for the signs of the meshes
+    L = -np.einsum('...d,...d->...', d[2, 0], normal)
+    M = -np.einsum('...d,...d->...', d[1, 1], normal)
+    N = -np.einsum('...d,...d->...', d[0, 2], normal)
+
+    mean = (E * N - 2 * F * M + G * L) / (2 * det)
+    gaussian = (L * N - M * M) / det
+    root = np.sqrt(np.maximum(mean * mean - gaussian, 0.0))
+    k1 = mean + root
+    k2 = mean - root
+
+    # (a, b) with (II - k1 I)(a, b) = 0, from the better conditioned row
+    a1, b1 = M - k1 * F, -(L - k1 * E)
+    a2, b2 = N - k1 * G, -(M - k1 * F)
+    first = a1 * a1 + b1 * b1 >= a2 * a2 + b2 * b2
+    a = np.where(first, a1, a2)
+    b = np.where(first, b1, b2)
+    # Umbilics have no preferred direction
+    umbilic = a * a + b * b <= 1e-24 * np.maximum(E * G, 1e-300)
+    a = np.where(umbilic, 1.0, a)
+    b = np.where(umbilic, 0.0, b)
+    d1 = a[..., None] * Su + b[..., None] * Sv
+    d1 /= np.maximum(np.linalg.norm(d1, axis=-1, keepdims=True), 1e-300)
+    d2 = np.cross(normal, d1)
+    return {
+        "mean": mean,
+        "gaussian": gaussian,
+        "k1": k1,
+        "k2": k2,
+        "normal": normal,
+        "d1": d1,
+        "d2": d2,
+    }
+
+def normal_curvature(d, direction):
+    """
+    Normal curvature along the u (direction 'u') or v iso-lines of evaluated surface
+    derivatives, with the normals of surface_curvature().
+    """
+    Su, Sv = d[1, 0], d[0, 1]
+    normal = np.cross(Su, Sv)
+    normal /= np.maximum(np.linalg.norm(normal, axis=-1, keepdims=True), 1e-300)
+    tangent, second = (Su, d[2, 0]) if direction == 'u' else (Sv, d[0, 2])
+    return (-np.einsum('...d,...d->...', second, normal)
+            / np.maximum(np.einsum('...d,...d->...', tangent, tangent), 1e-300))
+
+# --- Display ---
+
+def diverging_colors(values, limit=None):
+    """
+    (V, 4) float32 RGBA colors: blue for negative, white for zero, red for positive
+    values, saturated at limit (default the COLOR_PERCENTILE of |values|).
+    """
+    values = np.nan_to_num(np.asarray(values, dtype=np.float64))
+    if limit is None:
+        limit = np.percentile(np.abs(values), COLOR_PERCENTILE) if len(values) else 1.0
+    t = np.clip(values / max(float(limit), 1e-300), -1.0, 1.0)
+    colors = np.ones((len(t), 4), dtype=np.float32)
+    colors[:, 0] = np.where(t < 0, 1.0 + t, 1.0)
+    colors[:, 1] = 1.0 - np.abs(t)
+    colors[:, 2] = np.where(t > 0, 1.0 - t, 1.0)
+    return colors
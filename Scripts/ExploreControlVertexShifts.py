@@ -0,0 +1,78 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import bpy
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.append(SCRIPTS_DIR)
+
+import MoveNurbsControlVertex
+import NurbsEvaluation
+import ShiftExploration
+
+# Ranks every combination of control point shifts of a NURBS surface object with
+# ShiftExploration.py, without touching the object, and writes the ranked table.
+#
+#   blender scene.blend --python Scripts/ExploreControlVertexShifts.py -- --object Surface [options]
+#
+# The default study is MoveNurbsControlVertex.shift_groups(): the corner shifts times the
+# side shifts. Larger studies (e.g. CubePatch_ScriptSearch) come from a JSON file
+#   {"epsilon": 1e-6, "groups": [{"option": [[[x, y, z], [x, y, z]], ...], ...}, ...]}
+# with the moves in the object's local coordinates. --apply moves the object's points
+# to the variant of a rank with MoveNurbsControlVertex.move_nurbs_control_points().
+
+def read_study(path):
+    """
+    (groups, epsilon) of a study file.
+    """
+    with open(path) as f:
+        study = json.load(f)
+    return study["groups"], study.get("epsilon", ShiftExploration.EPSILON)
+
+def explore_object(obj, groups, epsilon=ShiftExploration.EPSILON, workers=None, output=None):
+    """
+    Scores every variant of the object's NURBS splines. Returns the ranked records.
+    """
+    patches = [NurbsEvaluation.NurbsSurface.from_spline(s) for s in obj.data.splines if s.type == 'NURBS']
+    if not patches:
+        raise ValueError(f"{obj.name} has no NURBS splines")
+    start = time.perf_counter()
+    records = ShiftExploration.explore(patches, groups, epsilon, workers)
+    print(f"{obj.name}: {len(records)} variants in {time.perf_counter() - start:.2f}s")
+    for line in ShiftExploration.format_table(records):
+        print(line)
+    if output:
+        ShiftExploration.write_table(records, output)
+        print(f"Wrote {output}")
+    return records
+
+def _arguments():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Ranks control point shift combinations of a NURBS surface.")
+    parser.add_argument("--object", help="surface object, default the active object")
+    parser.add_argument("--study", help="study JSON file, default the shifts of MoveNurbsControlVertex.py")
+    parser.add_argument("--workers", type=int, help="worker processes, default one per CPU")
+    parser.add_argument("--output", help="ranked table CSV file, default next to the .blend")
+    parser.add_argument("--apply", type=int, metavar="RANK", help="apply the variant of this rank to the object")
+    return parser.parse_args(argv)
+
+# --- Execution ---
+if __name__ == "__main__":
+    args = _arguments()
+    obj = bpy.data.objects[args.object] if args.object else bpy.context.active_object
+    if args.study:
+        groups, epsilon = read_study(args.study)
+    else:
+        groups, epsilon = MoveNurbsControlVertex.shift_groups(), ShiftExploration.EPSILON
+    output = args.output
+    if output is None and bpy.data.filepath:
+        output = os.path.splitext(bpy.data.filepath)[0] + f"_{obj.name}_shifts.csv"
+
+    records = explore_object(obj, groups, epsilon, args.workers, output)
+    if args.apply:
+        moves = dict(ShiftExploration.variants(groups))[records[args.apply - 1]["variant"]]
+        MoveNurbsControlVertex.move_nurbs_control_points(moves, epsilon, obj)
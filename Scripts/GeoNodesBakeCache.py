@@ -0,0 +1,350 @@
+import bpy
+import functools
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+from bpy.app.handlers import persistent
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.append(SCRIPTS_DIR)
+
+import MeshArrays
+import NodeGroupReuse
+import SubdivisionStencils
+
+# Bake cache for objects whose modifiers are generated Geometry Nodes groups (the Loop
+# subdivision modifiers of LoopSubdivisionGeoNodes/*.py and LoopSubdivisionStencilNodes.py),
+# so opening a scene does not re-evaluate them.
+#
+# The evaluated mesh of every such object is stored in "<file>_GeoNodesCache/" next to the
+# .blend, one uncompressed .npz per entry: float32 positions, int32 face corner indices
+# and face starts, float16 corner normals and int32 material indices. UVs and other
+# attributes are not cached. The key hashes
+#   - the object's own mesh (positions, faces and generic attributes),
+#   - the fingerprint of every modifier's node group, as it is now,
+#   - every modifier input; for object inputs such as the stencil cage their transform,
+#     mesh, shape keys and the settings of their own modifiers (with the pose of an
+#     armature they use), so animated or armature-deformed cages change the key.
+# Keys only read original data, never the evaluated depsgraph: with the cached objects'
+# modifiers still enabled at load time, evaluating would run the very subdivision stacks
+# the cache is there to skip.
+#
+# Swapping in: the object gets a new mesh built from the cache, its own mesh is kept in
+# the custom property bake_cache_source, and its modifiers are hidden. restore() undoes
+# this, and happens automatically when an object the key depends on changes geometry,
+# and before the object's own mesh is edited: entering Edit Mode (or any other mode) on a
+# swapped-in object first gives it its own mesh back, so edits never go to the cache copy.
+# With register(), files are saved with the real meshes and modifiers, missing entries
+# are baked on save, and cached results are swapped in after loading and saving. To have
+# that from the moment a file opens, load this script as a text block with Register on.
+
+CACHE_VERSION = 1
+CACHE_SUFFIX = "_GeoNodesCache"
+# Stored on baked objects
+BAKE_SOURCE = "bake_cache_source"
+BAKE_SHOWN = "bake_cache_shown"
+BAKE_INPUTS = "bake_cache_inputs"
+BAKE_KEY = "bake_cache_key"
+
+# --- Keys ---
+
+def cache_directory():
+    """
+    Cache directory of the current .blend, or None for an unsaved file.
+    """
+    if not bpy.data.filepath:
+        return None
+    return os.path.splitext(bpy.data.filepath)[0] + CACHE_SUFFIX
+
+_caches = {}
+
+def _cache():
+    directory = cache_directory()
+    if directory is None:
+        return None
+    if directory not in _caches:
+        # Every entry is read once per load, so nothing is kept in memory
+        _caches[directory] = SubdivisionStencils.StencilCache(directory, memory_limit=0)
+    return _caches[directory]
+
+def _update_mesh_hash(h, me):
+    loop_vertices, loop_starts, _ = MeshArrays.read_polygons(me)
+    h.update(f"mesh:{len(me.vertices)}:{len(loop_starts)}:".encode())
+    h.update(MeshArrays.read_positions(me).astype(np.float32).tobytes())
+    h.update(loop_vertices.tobytes())
+    h.update(loop_starts.tobytes())
+    for attribute in sorted(me.attributes, key=lambda a: a.name):
+        if attribute.name == "position" or attribute.name.startswith(".") \
+                or attribute.data_type not in MeshArrays._ATTRIBUTE_TYPES:
+            continue
+        h.update(f"attribute:{attribute.name}:{attribute.domain}:{attribute.data_type}:".encode())
+        h.update(MeshArrays.read_attribute(me, attribute.name).tobytes())
+
+def _update_transform_hash(h, obj):
+    h.update(np.array(obj.matrix_world, dtype=np.float32).tobytes())
+    if obj.type == 'ARMATURE' and obj.pose is not None:
+        matrices = np.empty(len(obj.pose.bones) * 16, dtype=np.float32)
+        obj.pose.bones.foreach_get("matrix", matrices)
+        h.update(matrices.tobytes())
+
+def _update_modifier_hash(h, mod):
+    h.update(f"modifier:{mod.name}:{mod.type}:".encode())
+    if mod.type == 'NODES':
+        h.update(f"{NodeGroupReuse._value(mod.node_group)}:".encode())
+        for identifier, value in _modifier_inputs(mod) if mod.node_group else ():
+            h.update(f"{identifier}={NodeGroupReuse._value(value)}:".encode())
+        return
+    for prop in mod.bl_rna.properties:
+        if prop.type == 'COLLECTION' or prop.identifier == "rna_type":
+            continue
+        value = getattr(mod, prop.identifier, None)
+        h.update(f"{prop.identifier}={NodeGroupReuse._value(value)}:".encode())
+        if isinstance(value, bpy.types.Object):
+            _update_transform_hash(h, value)
+
+def _update_input_hash(h, obj):
+    """
+    Hashes what an object input's evaluated mesh depends on, from original data only.
+    """
+    _update_transform_hash(h, obj)
+    me = obj.data
+    _update_mesh_hash(h, me)
+    if me.shape_keys is not None:
+        for block in me.shape_keys.key_blocks:
+            h.update(f"shape:{block.name}:{block.value}:{block.mute}:{block.relative_key.name}:".encode())
+            positions = np.empty(len(block.data) * 3, dtype=np.float32)
+            block.data.foreach_get("co", positions)
+            h.update(positions.tobytes())
+    for mod in obj.modifiers:
+        _update_modifier_hash(h, mod)
+
+def _modifier_inputs(mod):
+    """
+    (identifier, value) of every non-geometry input of a Geometry Nodes modifier.
+    """
+    inputs = []
+    for item in mod.node_group.interface.items_tree:
+        if item.item_type == 'SOCKET' and item.in_out == 'INPUT' and item.socket_type != 'NodeSocketGeometry':
+            inputs.append((item.identifier, mod.get(item.identifier)))
+    return inputs
+
+def cached_modifiers(obj):
+    """
+    The object's modifiers if they can be cached: all Geometry Nodes modifiers with a
+    generated node group. Otherwise None.
+    """
+    if obj.type != 'MESH' or not obj.modifiers:
+        return None
+    for mod in obj.modifiers:
+        if mod.type != 'NODES' or mod.node_group is None or NodeGroupReuse.GENERATOR_KEY not in mod.node_group:
+            return None
+    return list(obj.modifiers)
+
+def bake_key(obj):
+    """
+    Returns (key, input objects) of the object's evaluated mesh, without evaluating
+    anything. For a swapped-in object this is the key of its own mesh and modifiers.
+    """
+    h = hashlib.sha256()
+    h.update(f"geonodes_bake:{CACHE_VERSION}:".encode())
+    _update_mesh_hash(h, obj.get(BAKE_SOURCE) or obj.data)
+    shown = obj.get(BAKE_SHOWN) or [[mod.show_viewport] for mod in obj.modifiers]
+    inputs = []
+    for mod, (viewport, *_) in zip(obj.modifiers, shown):
+        h.update(f"modifier:{mod.name}:{bool(viewport)}:{NodeGroupReuse.fingerprint(mod.node_group)}:".encode())
+        for identifier, value in _modifier_inputs(mod):
+            if isinstance(value, bpy.types.Object):
+                h.update(f"{identifier}=Object({value.name}):".encode())
+                if value.type == 'MESH':
+                    _update_input_hash(h, value)
+                inputs.append(value)
+            elif isinstance(value, bpy.types.ID):
+                h.update(f"{identifier}={type(value).__name__}({value.name}):".encode())
+            else:
+                h.update(f"{identifier}={NodeGroupReuse._value(value)}:".encode())
+    return h.hexdigest(), inputs
+
+# --- Baking ---
+
+def _evaluated_entry(obj):
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    evaluated = obj.evaluated_get(depsgraph)
+    me = evaluated.to_mesh()
+    try:
+        loop_vertices, loop_starts, _ = MeshArrays.read_polygons(me)
+        return {
+            "positions": MeshArrays.read_positions(me).astype(np.float32),
+            "loop_vertices": loop_vertices,
+            "loop_starts": loop_starts,
+            "corner_normals": MeshArrays.read_corner_normals(me).astype(np.float16),
+            "material_index": MeshArrays.read_polygon_values(me, "material_index", np.int32),
+        }
+    finally:
+        evaluated.to_mesh_clear()
+
+def _mesh_from_entry(name, entry, materials):
+    me = bpy.data.meshes.new(name)
+    for material in materials:
+        me.materials.append(material)
+    MeshArrays.write_polygon_mesh(me, entry["positions"], entry["loop_vertices"], entry["loop_starts"])
+    MeshArrays.write_polygon_values(me, "material_index", entry["material_index"])
+    MeshArrays.write_corner_normals(me, entry["corner_normals"].astype(np.float32))
+    return me
+
+def bake(obj):
+    """
+    Stores the object's evaluated mesh in the cache unless it is there already.
+    Returns True if the object can be cached.
+    """
+    cache = _cache()
+    if cache is None or obj.get(BAKE_SOURCE) is not None or cached_modifiers(obj) is None:
+        return False
+    key, _ = bake_key(obj)
+    if cache.get(key) is None:
+        cache.put(key, _evaluated_entry(obj))
+    return True
+
+def swap_in(obj):
+    """
+    Replaces the object's modifier result by the cached mesh if the cache has it.
+    Returns True if swapped.
+    """
+    cache = _cache()
+    if cache is None or obj.get(BAKE_SOURCE) is not None or obj.mode != 'OBJECT' or cached_modifiers(obj) is None:
+        return False
+    key, inputs = bake_key(obj)
+    entry = cache.get(key)
+    if entry is None:
+        return False
+
+    source = obj.data
+    obj[BAKE_SOURCE] = source
+    obj[BAKE_SHOWN] = [[mod.show_viewport, mod.show_render] for mod in obj.modifiers]
+    obj[BAKE_INPUTS] = [o.name for o in inputs]
+    obj[BAKE_KEY] = key
+    obj.data = _mesh_from_entry(f"{source.name}_Baked", entry, source.materials)
+    for mod in obj.modifiers:
+        mod.show_viewport = False
+        mod.show_render = False
+    return True
+
+def restore(obj):
+    """
+    Gives a swapped-in object back its own mesh and modifiers.
+    """
+    source = obj.get(BAKE_SOURCE)
+    if source is None:
+        return
+    baked = obj.data
+    obj.data = source
+    for mod, (viewport, render) in zip(obj.modifiers, obj.get(BAKE_SHOWN, [])):
+        mod.show_viewport = viewport
+        mod.show_render = render
+    for prop in (BAKE_SOURCE, BAKE_SHOWN, BAKE_INPUTS, BAKE_KEY):
+        if prop in obj:
+            del obj[prop]
+    if baked.users == 0:
+        bpy.data.meshes.remove(baked)
+
+def _restore_editing(name):
+    """
+    Restores an object that entered a mode editing its mesh, and enters the mode again
+    with its own mesh. Runs from a timer, outside the depsgraph update.
+    """
+    obj = bpy.data.objects.get(name)
+    if obj is None or obj.get(BAKE_SOURCE) is None:
+        return None
+    mode = obj.mode
+    with bpy.context.temp_override(active_object=obj, object=obj):
+        if mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        restore(obj)
+        if mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode=mode)
+    return None
+
+def swap_in_all():
+    start = time.perf_counter()
+    swapped = [obj for obj in bpy.data.objects if swap_in(obj)]
+    if swapped:
+        # Keys read original data only, so this time is the cache reads, not evaluation
+        print(f"Swapped in {len(swapped)} cached meshes in {time.perf_counter() - start:.2f}s")
+    return swapped
+
+def restore_all():
+    for obj in bpy.data.objects:
+        restore(obj)
+
+def bake_all():
+    return [obj for obj in bpy.data.objects if bake(obj)]
+
+# --- Handlers ---
+
+@persistent
+def _load_post(*args):
+    swap_in_all()
+
+@persistent
+def _save_pre(*args):
+    # Save the real meshes and modifiers, so the file never depends on the cache
+    restore_all()
+    bake_all()
+
+@persistent
+def _save_post(*args):
+    swap_in_all()
+
+@persistent
+def _depsgraph_update_post(scene, depsgraph):
+    updated = [update for update in depsgraph.updates if isinstance(update.id, bpy.types.Object)]
+    if not updated:
+        return
+    touched = {update.id.original.name for update in updated}
+    changed = {update.id.original.name for update in updated if update.is_updated_geometry}
+    for obj in bpy.data.objects:
+        if obj.get(BAKE_SOURCE) is None:
+            continue
+        if obj.name in touched and obj.mode != 'OBJECT':
+            # Edits would go to the cache copy; the mode can't be left during the update
+            bpy.app.timers.register(functools.partial(_restore_editing, obj.name))
+            continue
+        if not changed & set(obj.get(BAKE_INPUTS, [])):
+            continue
+        # Updates are also reported for evaluations that change nothing, e.g. after loading
+        if bake_key(obj)[0] != obj.get(BAKE_KEY):
+            restore(obj)
+
+_HANDLERS = (
+    (bpy.app.handlers.load_post, _load_post),
+    (bpy.app.handlers.save_pre, _save_pre),
+    (bpy.app.handlers.save_post, _save_post),
+    (bpy.app.handlers.depsgraph_update_post, _depsgraph_update_post),
+)
+
+def register():
+    for handlers, handler in _HANDLERS:
+        if handler not in handlers:
+            handlers.append(handler)
+
+def unregister():
+    for handlers, handler in _HANDLERS:
+        if handler in handlers:
+            handlers.remove(handler)
+
+# --- Execution ---
+if __name__ == "__main__":
+    # Bake now and swap in; with REGISTER the cache is kept up to date on save and used on load
+    REGISTER=True
+
+    if cache_directory() is None:
+        print("Save the .blend file first, the cache is stored next to it.")
+    else:
+        restore_all()
+        print(f"Baked {len(bake_all())} objects into {cache_directory()}")
+        swap_in_all()
+        if REGISTER:
+            register()
@@ -0,0 +1,325 @@
+import numpy as np
+
+import MeshArrays
+
+# Half-edge connectivity stored as flat NumPy columns instead of linked objects.
+# Only NumPy is used so it can be built inside Blender, in worker processes or offline.
+#
+# Half-edges are numbered like Blender's loops: the half-edges of face f are
+# face_start[f] .. face_start[f] + face_size[f] - 1, in winding order, and half-edge h
+# runs from vertex[h] to vertex[next[h]]. Per half-edge columns (int32):
+#   vertex    origin vertex
+#   face      face it belongs to
+#   next      following half-edge in the same face
+#   twin      half-edge of the neighboring face running the other way, -1 on
+#             boundaries, non-manifold edges and edges with flipped winding
+#   edge      undirected edge index
+#   opposite  vertex of next[next[h]], the corner opposite the edge in a triangle
+#
+# Edges are numbered in order of (min vertex, max vertex), the same numbering as
+# LoopSubdivisionEngine.build_edges(). Meshes made by refine() number them by
+# construction instead, see there.
+
+class HalfEdgeMesh:
+    """
+    Array-backed half-edge mesh. Build it with from_polygons(), from_triangles()
+    or from_blender_mesh().
+    """
+
+    def __init__(self, positions, vertex, face_start, face_size, vertex_count=None):
+        self.positions = None if positions is None else np.asarray(positions, dtype=np.float64)
+        self.vertex = np.asarray(vertex, dtype=np.int32)
+        self.face_start = np.asarray(face_start, dtype=np.int32)
+        self.face_size = np.asarray(face_size, dtype=np.int32)
+        if vertex_count is None:
+            vertex_count = len(self.positions) if self.positions is not None else int(self.vertex.max(initial=-1)) + 1
+        self.vertex_count = int(vertex_count)
+
+        self._build_faces()
+        self._build_edges()
+
+    def _build_faces(self):
+        H = len(self.vertex)
+        F = len(self.face_start)
+        self.face = np.repeat(np.arange(F, dtype=np.int32), self.face_size)
+        if H == 3 * F and self.is_triangle_mesh():
+            # Triangles: no per face modulo needed
+            h = np.arange(H, dtype=np.int32)
+            self.next = h + np.tile(np.array([1, 1, -2], dtype=np.int32), F)
+            self.prev = h + np.tile(np.array([2, -1, -1], dtype=np.int32), F)
+            self.opposite = self.vertex[self.prev]
+            return
+        local = np.arange(H, dtype=np.int32) - self.face_start[self.face]
+        self.next = (self.face_start[self.face] + (local + 1) % self.face_size[self.face]).astype(np.int32)
+        self.prev = (self.face_start[self.face] + (local - 1) % self.face_size[self.face]).astype(np.int32)
+        self.opposite = self.vertex[self.next[self.next]]
+
+    def _build_edges(self):
+        V = self.vertex_count
+        a = self.vertex.astype(np.int64)
+        b = a[self.next]
+
+        # One integer key per undirected edge, sorted by np.unique
+        keys = np.minimum(a, b) * V + np.maximum(a, b)
+        unique_keys, edge_of_half, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        edge_of_half = edge_of_half.ravel()
+
+        self.edges = np.empty((len(unique_keys), 2), dtype=np.int32)
+        self.edges[:, 0] = unique_keys // V
+        self.edges[:, 1] = unique_keys % V
+        self.edge = edge_of_half.astype(np.int32)
+        self.edge_face_count = counts.astype(np.int32)
+
+        # Half-edges grouped by edge; the first two of each group are its two sides
+        order = np.argsort(edge_of_half, kind="stable")
+        starts = np.cumsum(counts) - counts
+        shared = counts >= 2
+        self.edge_halves = np.full((len(counts), 2), -1, dtype=np.int32)
+        self.edge_halves[:, 0] = order[starts]
+        self.edge_halves[shared, 1] = order[starts[shared] + 1]
+        self._build_edge_sides()
+
+        # Twins only for manifold edges whose two faces wind consistently
+        first, second = self.edge_halves[:, 0], self.edge_halves[:, 1]
+        paired = (counts == 2)
+        paired[paired] = a[first[paired]] == b[second[paired]]
+        self._build_twins(paired)
+
+    def _build_edge_sides(self):
+        self.edge_half = self.edge_halves[:, 0]
+        self.edge_opposite = np.where(self.edge_halves >= 0, self.opposite[self.edge_halves], -1).astype(np.int32)
+
+    def _build_twins(self, paired):
+        first, second = self.edge_halves[paired, 0], self.edge_halves[paired, 1]
+        self.twin = np.full(len(self.vertex), -1, dtype=np.int32)
+        self.twin[first] = second
+        self.twin[second] = first
+
+    @classmethod
+    def from_polygons(cls, loop_vertices, loop_starts, loop_totals=None, positions=None, vertex_count=None):
+        """
+        Builds the mesh from Blender style polygon arrays (see MeshArrays.read_polygons()).
+        """
+        loop_starts = np.asarray(loop_starts, dtype=np.int32)
+        if loop_totals is None:
+            loop_totals = np.diff(np.append(loop_starts, len(loop_vertices))).astype(np.int32)
+        return cls(positions, loop_vertices, loop_starts, loop_totals, vertex_count)
+
+    @classmethod
+    def from_triangles(cls, triangles, positions=None, vertex_count=None):
+        """
+        Builds the mesh from an (F, 3) triangle array; half-edge 3*f + i runs from
+        corner i to corner i + 1 of triangle f.
+        """
+        tris = np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+        F = len(tris)
+        return cls(positions, tris.ravel(), np.arange(0, 3 * F, 3, dtype=np.int32), np.full(F, 3, dtype=np.int32), vertex_count)
+
+    @classmethod
+    def from_blender_mesh(cls, me, triangulate=False):
+        """
+        Builds the mesh from a Blender mesh with bulk foreach_get reads: its polygons,
+        or its loop triangles if triangulate is True.
+        """
+        positions = MeshArrays.read_positions(me)
+        if triangulate:
+            return cls.from_triangles(MeshArrays.read_triangles(me), positions)
+        loop_vertices, loop_starts, loop_totals = MeshArrays.read_polygons(me)
+        return cls.from_polygons(loop_vertices, loop_starts, loop_totals, positions)
+
+    @property
+    def half_edge_count(self):
+        return len(self.vertex)
+
+    @property
+    def face_count(self):
+        return len(self.face_start)
+
+    @property
+    def edge_count(self):
+        return len(self.edges)
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the connectivity and positions, in bytes.
+        """
+        arrays = (self.vertex, self.face, self.next, self.prev, self.twin, self.edge, self.opposite,
+                  self.face_start, self.face_size, self.edges, self.edge_face_count,
+                  self.edge_halves, self.edge_opposite)
+        total = sum(a.nbytes for a in arrays)
+        if self.positions is not None:
+            total += self.positions.nbytes
+        return total
+
+    def is_triangle_mesh(self):
+        return bool((self.face_size == 3).all())
+
+    def triangles(self):
+        """
+        Returns the faces as an (F, 3) array. Only valid for triangle meshes.
+        """
+        return self.vertex.reshape(-1, 3)
+
+    def refine(self):
+        """
+        Returns the mesh after splitting every triangle into 4 at its edge midpoints,
+        the topology of one Loop subdivision step: vertex V + e is the midpoint of
+        edge e and the children of face f are faces 4f .. 4f + 3, in the order of
+        LoopSubdivisionEngine.refine_triangles().
+        Every table is derived arithmetically from this mesh's, without sorting or
+        hashing. The refined edges are numbered
+          2 * e + s            the half of edge e at its endpoint edges[e, s]
+          2 * E + 3 * f + i    between the midpoints of edges i and i + 1 of face f
+        Triangle meshes only.
+        """
+        if not self.is_triangle_mesh():
+            raise ValueError("refine() needs a triangle mesh")
+        V = self.vertex_count
+        E = self.edge_count
+        F = self.face_count
+        tris = self.triangles()
+        fe = self.edge.reshape(-1, 3)
+        mid = fe + np.int32(V)
+
+        # Halves of the edges at the start and at the end of every half-edge
+        flipped = (tris != self.edges[fe, 0]).astype(np.int32)
+        start_piece = 2 * fe + flipped
+        end_piece = 2 * fe + 1 - flipped
+        inner = np.int32(2 * E) + 3 * np.arange(F, dtype=np.int32)[:, None] + np.arange(3, dtype=np.int32)
+
+        # Child c of face f holds half-edges 12f + 3c .. 12f + 3c + 2
+        vertex = np.empty((F, 12), dtype=np.int32)
+        for column, source in enumerate((0, 3, 5, 3, 1, 4, 4, 2, 5, 3, 4, 5)):
+            vertex[:, column] = tris[:, source] if source < 3 else mid[:, source - 3]
+        edge = np.empty((F, 12), dtype=np.int32)
+        for column, (table, j) in enumerate(((start_piece, 0), (inner, 2), (end_piece, 2),
+                                             (end_piece, 0), (start_piece, 1), (inner, 0),
+                                             (end_piece, 1), (start_piece, 2), (inner, 1),
+                                             (inner, 0), (inner, 1), (inner, 2))):
+            edge[:, column] = table[:, j]
+
+        mesh = HalfEdgeMesh.__new__(HalfEdgeMesh)
+        mesh.positions = None
+        mesh.vertex = vertex.ravel()
+        mesh.face_start = np.arange(0, 12 * F, 3, dtype=np.int32)
+        mesh.face_size = np.full(4 * F, 3, dtype=np.int32)
+        mesh.vertex_count = V + E
+        mesh._build_faces()
+        mesh.edge = edge.ravel()
+
+        mesh.edges = np.empty((2 * E + 3 * F, 2), dtype=np.int32)
+        mesh.edges[:2 * E, 0] = self.edges.ravel()
+        mesh.edges[:2 * E, 1] = np.repeat(np.arange(V, V + E, dtype=np.int32), 2)
+        next_mid = np.roll(mid, -1, axis=1)
+        mesh.edges[2 * E:, 0] = np.minimum(mid, next_mid).ravel()
+        mesh.edges[2 * E:, 1] = np.maximum(mid, next_mid).ravel()
+        mesh.edge_face_count = np.concatenate((
+            np.repeat(self.edge_face_count, 2), np.full(3 * F, 2, dtype=np.int32)))
+
+        # Both halves of an edge inherit its sides in order. The child half-edge at the
+        # start of half-edge 3f + j is 12f + (0, 4, 7)[j], the one at its end 12f + (3, 6, 2)[j].
+        face = np.arange(F, dtype=np.int32)[:, None] * 12
+        start_half = (face + np.array([0, 4, 7], dtype=np.int32)).ravel()
+        end_half = (face + np.array([3, 6, 2], dtype=np.int32)).ravel()
+        halves = np.full((2 * E + 3 * F, 2), -1, dtype=np.int32)
+        for side in range(2):
+            h = self.edge_halves[:, side]
+            h = h[h >= 0]
+            halves[start_piece.ravel()[h], side] = start_half[h]
+            halves[end_piece.ravel()[h], side] = end_half[h]
+        # Inner edges: the corner child's half-edge first, then the center child's
+        halves[2 * E:, 0] = (face + np.array([5, 8, 1], dtype=np.int32)).ravel()
+        halves[2 * E:, 1] = (face + np.array([9, 10, 11], dtype=np.int32)).ravel()
+        mesh.edge_halves = halves
+        mesh._build_edge_sides()
+
+        paired = np.concatenate((np.repeat(self.twin[self.edge_half] != -1, 2), np.ones(3 * F, dtype=bool)))
+        mesh._build_twins(paired)
+        return mesh
+
+    def destination(self):
+        return self.vertex[self.next]
+
+    def valence(self):
+        return np.bincount(self.edges.ravel(), minlength=self.vertex_count)
+
+    def boundary_valence(self):
+        """
+        Number of boundary edges at each vertex; 2 on a smooth boundary.
+        """
+        return np.bincount(self.edges[self.edge_face_count == 1].ravel(), minlength=self.vertex_count)
+
+    def vertex_rings(self):
+        """
+        Orders the neighbors of every vertex counter-clockwise (following the face winding)
+        by walking h -> twin[prev[h]] around it.
+        Returns:
+          ring        (V, max_valence) int32, neighbors in order, padded with -1
+          ring_length (V,) int32
+          closed      (V,) bool, True if the walk came back to where it started
+        For a boundary vertex the ring starts and ends at its two boundary neighbors.
+        """
+        V = self.vertex_count
+        H = self.half_edge_count
+        owner = self.vertex
+        to = self.destination()
+
+        # Start each walk at an outgoing half-edge without twin (a boundary),
+        # or at the first outgoing half-edge for closed rings
+        order = np.lexsort((np.arange(H), self.twin != -1, owner))
+        first = np.ones(H, dtype=bool)
+        first[1:] = owner[order[1:]] != owner[order[:-1]]
+        starts = order[first]
+        vertices = owner[starts]
+
+        max_valence = int(np.bincount(owner, minlength=V).max(initial=0)) + 1
+        ring = np.full((V, max_valence + 1), -1, dtype=np.int32)
+        ring_length = np.zeros(V, dtype=np.int32)
+        closed = np.zeros(V, dtype=bool)
+
+        ring[vertices, 0] = to[starts]
+        ring_length[vertices] = 1
+        cur = starts.copy()
+        active = np.ones(len(starts), dtype=bool)
+        for step in range(1, max_valence + 1):
+            idx = np.nonzero(active)[0]
+            if len(idx) == 0:
+                break
+            p = self.prev[cur[idx]]
+            q = owner[p]
+            nxt = self.twin[p]
+            back = nxt == starts[idx]
+            closed[vertices[idx[back]]] = True
+            keep = ~back
+            ring[vertices[idx[keep]], step] = q[keep]
+            ring_length[vertices[idx[keep]]] = step + 1
+            cur[idx] = nxt
+            active[idx] = keep & (nxt != -1)
+
+        width = max(int(ring_length.max(initial=0)), 1)
+        return ring[:, :width], ring_length, closed
+
+    def validate(self):
+        """
+        Returns a dict of problem counts; all zero for a closed or bordered 2-manifold
+        with consistent winding.
+        """
+        used = np.zeros(self.vertex_count, dtype=bool)
+        used[self.vertex] = True
+        repeated = self.vertex == self.destination()
+
+        interior = self.edge_face_count == 2
+        flipped = interior & (self.twin[self.edge_half] == -1)
+
+        # A manifold vertex has at most one fan of faces: valence equals ring length
+        ring, ring_length, closed = self.vertex_rings()
+        fans = used & (ring_length != self.valence())
+        return {
+            "non_manifold_edges": int((self.edge_face_count > 2).sum()),
+            "flipped_edges": int(flipped.sum()),
+            "boundary_edges": int((self.edge_face_count == 1).sum()),
+            "degenerate_faces": int(len(np.unique(self.face[repeated]))),
+            "isolated_vertices": int((~used).sum()),
+            "non_manifold_vertices": int(fans.sum()),
+        }
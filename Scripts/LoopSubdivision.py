@@ -1,10 +1,20 @@
 import bpy
 import bmesh
 import math
+import os
+import sys
 from mathutils import Vector
 
-# todo: use limit surface positions
-# todo: use limit surface tangents/normals
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.append(SCRIPTS_DIR)
+
+import LoopSubdivisionEngine
+import LoopSurfaceEvaluation
+import MeshArrays
+import OutOfCoreSubdivision
+import ParallelSubdivision
+
 # todo: use lookup table for get_loop_beta if this is too slow
 # todo: investigate paper for limiting bounding curvature for extraordinary vertices
 #   Triangle Mesh Subdivision with Bounded Curvature and the Convex Hull Property, Charles Loop, 2001
@@ -20,9 +30,198 @@ def get_loop_beta(n):
     beta = (1.0 / n) * (5.0/8.0 - val**2)
     return beta
 
-def loop_subdivision(obj, iterations=1):
+def loop_subdivision(obj, iterations=1, engine='NUMPY', limit_surface=False,
+                     adaptive=False, tolerance=None, max_angle=None, vertex_group=None):
     """
     Applies Loop Subdivision to the provided object.
+    engine='NUMPY' uses the array engine in LoopSubdivisionEngine.py,
+    engine='STENCIL' reuses a cached level-N stencil for the same connectivity,
+    engine='BMESH' uses the original per-element BMesh implementation.
+    limit_surface=True moves the result onto the limit surface and stores the
+    exact limit normals as custom normals.
+    adaptive=True (NUMPY engine only) refines up to `iterations` levels only around
+    extraordinary vertices, triangles that are not flat within `tolerance` (object
+    units) or bend more than `max_angle` (radians), and vertices of `vertex_group`.
+    Transition triangles keep the result watertight; its vertices always lie on
+    the limit surface.
+    """
+    if adaptive:
+        if engine != 'NUMPY':
+            raise ValueError("adaptive requires the 'NUMPY' engine")
+        loop_subdivision_adaptive(obj, iterations, limit_surface, tolerance, max_angle, vertex_group)
+        return
+    if engine == 'BMESH':
+        if limit_surface:
+            raise ValueError("limit_surface requires the 'NUMPY' or 'STENCIL' engine")
+        loop_subdivision_bmesh(obj, iterations)
+        return
+    if engine not in ('NUMPY', 'STENCIL'):
+        raise ValueError(f"Unknown engine '{engine}', expected 'NUMPY', 'STENCIL' or 'BMESH'")
+
+    me = obj.data
+
+    # Ensure we are in Object mode to modify mesh data
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+    # Bulk read: positions and Blender's own triangulation of the polygons.
+    # For triangle meshes this is the same input the BMesh path sees; quads may be
+    # split along the other diagonal than bmesh.ops.triangulate would pick.
+    positions = MeshArrays.read_positions(me)
+    triangles = MeshArrays.read_triangles(me)
+
+    if engine == 'STENCIL':
+        # After a vertex-only edit of the cage this is a single sparse mat-vec
+        stencil, triangles = LoopSubdivisionEngine.cached_stencil(triangles, len(positions), iterations)
+        positions = stencil.apply(positions)
+    else:
+        positions, triangles = LoopSubdivisionEngine.subdivide(positions, triangles, iterations)
+
+    if limit_surface:
+        positions, normals = LoopSubdivisionEngine.limit_surface(positions, triangles)
+
+    MeshArrays.write_triangle_mesh(me, positions, triangles)
+
+    if limit_surface:
+        MeshArrays.write_vertex_normals(me, normals)
+
+def loop_subdivision_adaptive(obj, iterations=1, limit_surface=False, tolerance=None, max_angle=None, vertex_group=None):
+    """
+    Feature adaptive variant of loop_subdivision(), see LoopSubdivisionEngine.subdivide_adaptive().
+    """
+    me = obj.data
+
+    # Ensure we are in Object mode to modify mesh data
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+    positions = MeshArrays.read_positions(me)
+    triangles = MeshArrays.read_triangles(me)
+    selected = None
+    if vertex_group is not None:
+        group = obj.vertex_groups[vertex_group]
+        selected = MeshArrays.read_vertex_weights(me, group.index) > 0.0
+
+    positions, triangles, normals = LoopSubdivisionEngine.subdivide_adaptive(
+        positions, triangles, iterations, max_angle=max_angle, tolerance=tolerance, selected=selected)
+
+    MeshArrays.write_triangle_mesh(me, positions, triangles)
+
+    if limit_surface:
+        MeshArrays.write_vertex_normals(me, normals)
+
+def loop_subdivision_objects(objects, iterations=1, workers=None):
+    """
+    Applies Loop Subdivision to the meshes of many objects on a pool of worker processes.
+    Objects that share a mesh datablock are subdivided once. A mesh with more than
+    ParallelSubdivision.PARTITION_SIZE triangles is split across the workers.
+    """
+    # Ensure we are in Object mode to modify mesh data
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+    meshes = list(dict.fromkeys(obj.data for obj in objects if obj.type == 'MESH'))
+    arrays = [(MeshArrays.read_positions(me), MeshArrays.read_triangles(me)) for me in meshes]
+    for index, positions, triangles in ParallelSubdivision.subdivide_meshes(arrays, iterations, workers):
+        MeshArrays.write_triangle_mesh(meshes[index], positions, triangles)
+
+def loop_subdivision_to_files(obj, iterations, directory, tile_size=OutOfCoreSubdivision.TILE_SIZE):
+    """
+    Loop subdivides the object's mesh tile by tile into memory-mapped files in
+    directory (see OutOfCoreSubdivision.py) instead of into the mesh, for results
+    bigger than memory. The object is left untouched. Returns the number of tiles.
+    Export the levels with OutOfCoreSubdivision.export_ply() or export_tiles_ply().
+    """
+    me = obj.data
+    if obj.mode == 'EDIT':
+        obj.update_from_editmode()
+    return OutOfCoreSubdivision.subdivide_to_files(
+        MeshArrays.read_positions(me), MeshArrays.read_triangles(me), iterations, directory, tile_size)
+
+# --- Live subdivision ---
+# The cage object stays editable and the subdivided result lives in a second
+# object. After a vertex-only edit of the cage only the refined vertices that
+# depend on the moved cage vertices are recomputed (LoopSubdivisionEngine.LoopSubdivider).
+
+# cage object name -> (target object name, LoopSubdivider)
+_live_subdivisions = {}
+
+def _read_cage_positions(cage_obj):
+    # Edit mode changes only reach the mesh datablock after this
+    if cage_obj.mode == 'EDIT':
+        cage_obj.update_from_editmode()
+    return MeshArrays.read_positions(cage_obj.data)
+
+def loop_subdivision_live(cage_obj, target_obj, iterations=1):
+    """
+    Writes the Loop subdivision of cage_obj into target_obj's mesh, leaving the cage untouched.
+    Returns the LoopSubdivider to pass to update_loop_subdivision().
+    """
+    positions = _read_cage_positions(cage_obj)
+    triangles = MeshArrays.read_triangles(cage_obj.data)
+    subdivider = LoopSubdivisionEngine.LoopSubdivider(positions, triangles, iterations)
+    MeshArrays.write_triangle_mesh(target_obj.data, subdivider.positions, subdivider.triangles)
+    return subdivider
+
+def update_loop_subdivision(cage_obj, target_obj, subdivider):
+    """
+    Brings target_obj up to date after cage vertices moved. The cage connectivity
+    must be unchanged; call loop_subdivision_live() again after topology edits.
+    Returns the number of refined vertices that were recomputed.
+    """
+    positions = _read_cage_positions(cage_obj)
+    if len(positions) != len(subdivider.cage_positions):
+        raise ValueError(f"{cage_obj.name} changed topology, rebuild with loop_subdivision_live()")
+    dirty = subdivider.update_all(positions)
+    if len(dirty):
+        MeshArrays.write_positions(target_obj.data, subdivider.positions)
+    return len(dirty)
+
+def _live_subdivision_handler(scene, depsgraph):
+    for update in depsgraph.updates:
+        obj = update.id.original
+        if not isinstance(obj, bpy.types.Object) or not update.is_updated_geometry:
+            continue
+        live = _live_subdivisions.get(obj.name)
+        if live is None:
+            continue
+        target_name, subdivider = live
+        target = bpy.data.objects.get(target_name)
+        if target is not None:
+            update_loop_subdivision(obj, target, subdivider)
+
+def register_live_subdivision(cage_obj, target_obj, iterations=1):
+    """
+    Keeps target_obj in sync with cage_obj while its vertices are moved.
+    """
+    _live_subdivisions[cage_obj.name] = (target_obj.name, loop_subdivision_live(cage_obj, target_obj, iterations))
+    if _live_subdivision_handler not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(_live_subdivision_handler)
+
+def unregister_live_subdivision(cage_obj):
+    _live_subdivisions.pop(cage_obj.name, None)
+    if not _live_subdivisions and _live_subdivision_handler in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_live_subdivision_handler)
+
+def loop_surface_evaluator(obj):
+    """
+    Returns a LoopSurfaceEvaluator for the limit surface of the object's mesh.
+    Triangle indices refer to the mesh's loop triangles. Keep the evaluator
+    around to evaluate several batches against the same cage.
+    """
+    me = obj.data
+    return LoopSurfaceEvaluation.LoopSurfaceEvaluator(MeshArrays.read_positions(me), MeshArrays.read_triangles(me))
+
+def evaluate_loop_surface(obj, faces, u, v):
+    """
+    Evaluates the Loop limit surface of the object's mesh without subdividing it.
+    faces are loop triangle indices and (u, v) barycentric parameters, the point
+    over (1 - u - v) * v1 + u * v2 + v * v3. Returns (positions, du, dv, normals)
+    as (S, 3) arrays in object space.
+    """
+    return loop_surface_evaluator(obj).evaluate(faces, u, v)
+
+def loop_subdivision_bmesh(obj, iterations=1):
+    """
+    Applies Loop Subdivision to the provided object one BMesh element at a time.
+    Kept as the reference implementation for the array engine.
     """
     me = obj.data
 
@@ -157,10 +356,22 @@ if __name__ == "__main__":
     active_obj = bpy.context.active_object
 
     ITERATIONS=3
+    LIMIT_SURFACE=False
+    # Adaptive mode: refine only where the surface is not flat within ADAPTIVE_TOLERANCE
+    # and around extraordinary vertices
+    ADAPTIVE=False
+    ADAPTIVE_TOLERANCE=0.001
+    # Parallel mode: subdivide all selected objects on a process pool
+    PARALLEL=False
 
-    if active_obj and active_obj.type == 'MESH':
+    if PARALLEL:
+        print(f"Applying Loop Subdivision to {len(bpy.context.selected_objects)} objects...")
+        loop_subdivision_objects(bpy.context.selected_objects, ITERATIONS)
+        print("Done.")
+    elif active_obj and active_obj.type == 'MESH':
         print(f"Applying Loop Subdivision to {active_obj.name}...")
-        loop_subdivision(active_obj, ITERATIONS)
+        loop_subdivision(active_obj, ITERATIONS, limit_surface=LIMIT_SURFACE,
+                         adaptive=ADAPTIVE, tolerance=ADAPTIVE_TOLERANCE)
         print("Done.")
     else:
         print("Please select a mesh object.")
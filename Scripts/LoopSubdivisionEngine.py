@@ -0,0 +1,684 @@
+import math
+import numpy as np
+
+import SubdivisionStencils
+from HalfEdgeMesh import HalfEdgeMesh
+
+# Array based Loop subdivision.
+# This module only depends on NumPy so it can run inside Blender, in worker
+# processes or in plain Python. Positions are (V, 3) float64 arrays and
+# triangles are (F, 3) integer arrays of vertex indices.
+#
+# The rules are the same as the BMesh implementation in LoopSubdivision.py:
+#  - Even vertices:
+#      boundary: 0.75*P + 0.125*(boundary neighbor sum) if exactly 2 boundary neighbors else keep P
+#      interior: (1 - n*beta)*P + beta*sum(neighbors)
+#  - Odd vertices:
+#      boundary edge: midpoint
+#      interior edge: 3/8*(v1+v2) + 1/8*(opp1+opp2)
+#  - Each triangle (v1, v2, v3) becomes (v1, e1, e3), (e1, v2, e2), (e2, v3, e3), (e1, e2, e3)
+#    where e1, e2, e3 are the odd vertices of edges v1v2, v2v3, v3v1.
+#
+# The refined mesh stores the even vertices first (same indices as before)
+# followed by one odd vertex per edge, so odd vertex of edge e has index V + e.
+#
+# The edge tables are only built from scratch for the input mesh. The tables of
+# each further level follow from the previous ones (HalfEdgeMesh.refine()), so
+# the refined vertices of levels 2 and up are numbered by that construction rather
+# than in sorted edge order.
+
+def loop_beta(valence):
+    """
+    Vectorized version of get_loop_beta() in LoopSubdivision.py.
+    Entries with valence 0 get a beta of 0.
+    """
+    n = np.maximum(np.asarray(valence, dtype=np.float64), 1.0)
+    val = 3.0/8.0 + (1.0/4.0) * np.cos(2.0 * math.pi / n)
+    beta = (1.0 / n) * (5.0/8.0 - val**2)
+    return np.where(np.asarray(valence) > 0, beta, 0.0)
+
+def build_edges(triangles, vertex_count):
+    """
+    Builds the edge table of a triangle mesh in one pass.
+    Returns:
+      edges           (E, 2) int32, endpoints sorted so edges[:, 0] < edges[:, 1]
+      face_edges      (F, 3) int32, edge index of v1v2, v2v3, v3v1 for each triangle
+      edge_face_count (E,)   int32, number of triangles using each edge
+      edge_opposite   (E, 2) int32, vertex opposite to the edge in its first two triangles, -1 if missing
+    """
+    mesh = HalfEdgeMesh.from_triangles(triangles, vertex_count=vertex_count)
+    return mesh.edges, mesh.edge.reshape(-1, 3), mesh.edge_face_count, mesh.edge_opposite
+
+def _scatter_add(index, values, count):
+    """
+    Sums rows of values into count buckets given by index.
+    """
+    out = np.empty((count, values.shape[1]), dtype=np.float64)
+    for d in range(values.shape[1]):
+        out[:, d] = np.bincount(index, weights=values[:, d], minlength=count)
+    return out
+
+def even_positions(positions, edges, edge_face_count):
+    """
+    Computes the updated positions of the existing ('even') vertices.
+    """
+    P = positions
+    V = len(P)
+    v1 = edges[:, 0]
+    v2 = edges[:, 1]
+
+    valence = np.bincount(edges.ravel(), minlength=V)
+    neighbor_sum = _scatter_add(np.concatenate((v1, v2)), P[np.concatenate((v2, v1))], V)
+
+    boundary = edge_face_count == 1
+    b1 = v1[boundary]
+    b2 = v2[boundary]
+    boundary_valence = np.bincount(np.concatenate((b1, b2)), minlength=V)
+    boundary_sum = _scatter_add(np.concatenate((b1, b2)), P[np.concatenate((b2, b1))], V)
+
+    beta = loop_beta(valence)
+    even = (1.0 - valence * beta)[:, None] * P + beta[:, None] * neighbor_sum
+
+    is_boundary = boundary_valence > 0
+    smooth_boundary = boundary_valence == 2
+    even[smooth_boundary] = 0.75 * P[smooth_boundary] + 0.125 * boundary_sum[smooth_boundary]
+    # Corner case or non-manifold, just keep original
+    keep = (is_boundary & ~smooth_boundary) | (valence == 0)
+    even[keep] = P[keep]
+    return even
+
+def odd_positions(positions, edges, edge_face_count, edge_opposite):
+    """
+    Computes the positions of the new ('odd') vertices, one per edge.
+    """
+    P = positions
+    p1 = P[edges[:, 0]]
+    p2 = P[edges[:, 1]]
+
+    odd = (p1 + p2) * 0.5
+    interior = edge_face_count >= 2
+    o1 = P[edge_opposite[interior, 0]]
+    o2 = P[edge_opposite[interior, 1]]
+    odd[interior] = (3.0/8.0) * (p1[interior] + p2[interior]) + (1.0/8.0) * (o1 + o2)
+    return odd
+
+def refine_triangles(triangles, face_edges, vertex_count):
+    """
+    Splits every triangle into 4, in the same order as the BMesh implementation.
+    """
+    v = np.asarray(triangles, dtype=np.int32)
+    e = face_edges + np.int32(vertex_count)
+    new_tris = np.empty((len(v), 4, 3), dtype=np.int32)
+    # Corner 1
+    new_tris[:, 0] = np.stack((v[:, 0], e[:, 0], e[:, 2]), axis=1)
+    # Corner 2
+    new_tris[:, 1] = np.stack((e[:, 0], v[:, 1], e[:, 1]), axis=1)
+    # Corner 3
+    new_tris[:, 2] = np.stack((e[:, 1], v[:, 2], e[:, 2]), axis=1)
+    # Center
+    new_tris[:, 3] = e
+    return new_tris.reshape(-1, 3)
+
+def subdivide_once(positions, triangles):
+    """
+    Applies one Loop subdivision step and returns (positions, triangles).
+    """
+    P = np.asarray(positions, dtype=np.float64)
+    V = len(P)
+    edges, face_edges, edge_face_count, edge_opposite = build_edges(triangles, V)
+
+    new_positions = np.concatenate((
+        even_positions(P, edges, edge_face_count),
+        odd_positions(P, edges, edge_face_count, edge_opposite),
+    ))
+    new_triangles = refine_triangles(triangles, face_edges, V)
+    return new_positions, new_triangles
+
+def refined_triangles(mesh):
+    """
+    Triangles of mesh.refine() without building the rest of its tables, for the last level.
+    """
+    return refine_triangles(mesh.triangles(), mesh.edge.reshape(-1, 3), mesh.vertex_count)
+
+def subdivide_levels(positions, triangles, iterations=1):
+    """
+    Yields (positions, triangles) of every level 1 .. iterations.
+    """
+    P = np.asarray(positions, dtype=np.float64)
+    mesh = HalfEdgeMesh.from_triangles(triangles, vertex_count=len(P))
+    for level in range(iterations):
+        P = np.concatenate((
+            even_positions(P, mesh.edges, mesh.edge_face_count),
+            odd_positions(P, mesh.edges, mesh.edge_face_count, mesh.edge_opposite),
+        ))
+        if level < iterations - 1:
+            mesh = mesh.refine()
+            yield P, mesh.triangles()
+        else:
+            yield P, refined_triangles(mesh)
+
+def subdivide(positions, triangles, iterations=1):
+    """
+    Applies Loop subdivision to a triangle mesh given as arrays.
+    """
+    P = np.asarray(positions, dtype=np.float64)
+    T = np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+    for P, T in subdivide_levels(P, T, iterations):
+        pass
+    return P, T
+
+# --- Stencils ---
+# The refined positions are a fixed linear combination of the control positions,
+# so the level-N subdivision of a connectivity can be compiled once into a sparse
+# matrix and reused for any positions with the same triangles.
+
+def level_stencil(triangles, vertex_count):
+    """
+    Returns (stencil, refined_triangles) for one Loop subdivision step.
+    The stencil maps vertex_count control points to vertex_count + edge_count points.
+    """
+    mesh = HalfEdgeMesh.from_triangles(triangles, vertex_count=vertex_count)
+    return mesh_stencil(mesh), refined_triangles(mesh)
+
+def mesh_stencil(mesh):
+    """
+    The one step stencil of level_stencil() for a HalfEdgeMesh of triangles.
+    """
+    V = mesh.vertex_count
+    edges, edge_face_count, edge_opposite = mesh.edges, mesh.edge_face_count, mesh.edge_opposite
+    E = len(edges)
+    v1 = edges[:, 0]
+    v2 = edges[:, 1]
+    boundary = edge_face_count == 1
+
+    valence = np.bincount(edges.ravel(), minlength=V)
+    boundary_valence = np.bincount(edges[boundary].ravel(), minlength=V)
+    beta = loop_beta(valence)
+    is_boundary = boundary_valence > 0
+    smooth_boundary = boundary_valence == 2
+    keep = (is_boundary & ~smooth_boundary) | (valence == 0)
+
+    # Even rows: weight on the vertex itself and on each neighbor across an edge
+    self_weight = np.where(smooth_boundary, 0.75, np.where(keep, 1.0, 1.0 - valence * beta))
+    owner = np.concatenate((v1, v2))
+    neighbor = np.concatenate((v2, v1))
+    on_boundary_edge = np.concatenate((boundary, boundary))
+    neighbor_weight = np.where(
+        smooth_boundary[owner], np.where(on_boundary_edge, 0.125, 0.0),
+        np.where(keep[owner], 0.0, beta[owner]))
+
+    # Odd rows
+    edge_rows = V + np.arange(E)
+    interior = ~boundary
+    ends_weight = np.where(boundary, 0.5, 3.0/8.0)
+
+    rows = np.concatenate((
+        np.arange(V), owner,
+        edge_rows, edge_rows,
+        edge_rows[interior], edge_rows[interior],
+    ))
+    cols = np.concatenate((
+        np.arange(V), neighbor,
+        v1, v2,
+        edge_opposite[interior, 0], edge_opposite[interior, 1],
+    ))
+    weights = np.concatenate((
+        self_weight, neighbor_weight,
+        ends_weight, ends_weight,
+        np.full(interior.sum(), 1.0/8.0), np.full(interior.sum(), 1.0/8.0),
+    ))
+    nonzero = weights != 0.0
+
+    return SubdivisionStencils.SparseStencil.from_coo(
+        rows[nonzero], cols[nonzero], weights[nonzero], V + E, V)
+
+def compile_stencil(triangles, vertex_count, levels):
+    """
+    Composes the stencils of `levels` subdivision steps.
+    Returns (stencil, refined_triangles); the stencil maps the vertex_count control
+    points straight to the vertices of the level-N mesh.
+    """
+    T = np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+    if levels == 0:
+        n = np.arange(vertex_count)
+        return SubdivisionStencils.SparseStencil(np.arange(vertex_count + 1), n, np.ones(vertex_count), vertex_count), T
+    mesh = HalfEdgeMesh.from_triangles(T, vertex_count=vertex_count)
+    stencil = None
+    for level in range(levels):
+        step = mesh_stencil(mesh)
+        stencil = step if stencil is None else step.compose(stencil)
+        if level < levels - 1:
+            mesh = mesh.refine()
+    return stencil, refined_triangles(mesh)
+
+def cached_stencil(triangles, vertex_count, levels, cache=None):
+    """
+    compile_stencil() through a StencilCache keyed by a hash of the face index buffer.
+    """
+    if cache is None:
+        cache = SubdivisionStencils.default_cache()
+    key = SubdivisionStencils.topology_key("loop", triangles, vertex_count, levels)
+
+    entry = cache.get(key)
+    if entry is None:
+        stencil, refined = compile_stencil(triangles, vertex_count, levels)
+        entry = stencil.to_arrays()
+        entry["triangles"] = refined
+        cache.put(key, entry)
+    return SubdivisionStencils.SparseStencil.from_arrays(entry), entry["triangles"]
+
+# --- Incremental updates ---
+# Moving a cage vertex only changes the refined vertices whose stencil reads it,
+# a region that grows by about one ring per level. LoopSubdivider keeps the
+# one-level stencil and the positions of every level so an edit recomputes just
+# those rows instead of the whole mesh.
+
+class LoopSubdivider:
+    """
+    Loop subdivision of a fixed connectivity that can be updated after cage edits.
+    """
+
+    def __init__(self, positions, triangles, iterations=1):
+        P = np.asarray(positions, dtype=np.float64).copy()
+        T = np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+        mesh = HalfEdgeMesh.from_triangles(T, vertex_count=len(P))
+        self.stencils = []
+        for level in range(iterations):
+            self.stencils.append(mesh_stencil(mesh))
+            if level < iterations - 1:
+                mesh = mesh.refine()
+        self.triangles = refined_triangles(mesh) if iterations else T
+
+        self.levels = [P]
+        for step in self.stencils:
+            self.levels.append(step.apply(self.levels[-1]))
+
+    @property
+    def cage_positions(self):
+        return self.levels[0]
+
+    @property
+    def positions(self):
+        """
+        Positions of the finest level, (V, 3). Updated in place by update().
+        """
+        return self.levels[-1]
+
+    def update(self, indices, positions):
+        """
+        Moves the cage vertices at indices to positions and recomputes what depends on them.
+        Returns the indices of the finest level vertices that were recomputed.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        self.levels[0][indices] = positions
+        dirty = np.unique(indices)
+        for level, step in enumerate(self.stencils):
+            dirty = step.rows_using(dirty)
+            self.levels[level + 1][dirty] = step.apply_rows(self.levels[level], dirty)
+        return dirty
+
+    def update_all(self, positions):
+        """
+        Takes a full (V, 3) array of cage positions and only updates the vertices that changed.
+        """
+        positions = np.asarray(positions, dtype=np.float64)
+        changed = np.nonzero((positions != self.levels[0]).any(axis=1))[0]
+        if len(changed) == 0:
+            return changed
+        return self.update(changed, positions[changed])
+
+# --- Limit surface ---
+# Vertices of any level can be pushed straight to their position on the limit
+# surface and given the exact limit normal, using masks from the eigen analysis
+# of the local subdivision matrix around each vertex:
+#  - interior, valence n: position (w*P + sum(Q)) / (w + n) with w = 3 / (8*beta)
+#                         tangents sum(cos(2*pi*i/n) * Q_i) and sum(sin(2*pi*i/n) * Q_i)
+#  - smooth boundary:     position (Q_0 + 4*P + Q_k) / 6
+#                         tangents Q_0 - Q_k along the boundary, and across it the
+#                         dominant left eigenvector of the boundary matrix
+#  - corners and non-manifold vertices never move, their normal is the area
+#    weighted average of the face normals
+
+def vertex_rings(triangles, vertex_count):
+    """
+    Orders the neighbors of every vertex counter-clockwise (following the face winding).
+    Returns:
+      ring        (V, max_valence) int32, neighbors in order, padded with -1
+      ring_length (V,) int32
+      closed      (V,) bool, True if the last neighbor connects back to the first
+    For a boundary vertex the ring starts and ends at its two boundary neighbors.
+    """
+    return HalfEdgeMesh.from_triangles(triangles, vertex_count=vertex_count).vertex_rings()
+
+def _face_normal_sum(positions, triangles):
+    """
+    Area weighted sum of the normals of the faces around each vertex.
+    """
+    P = positions
+    tris = np.asarray(triangles)
+    face_normals = np.cross(P[tris[:, 1]] - P[tris[:, 0]], P[tris[:, 2]] - P[tris[:, 0]])
+    return _scatter_add(tris.ravel(), np.repeat(face_normals, 3, axis=0), len(P))
+
+_boundary_mask_cache = {}
+
+def boundary_tangent_masks(k):
+    """
+    Returns the two tangent masks of a smooth boundary vertex with k triangles,
+    as a (2, k + 2) array with weights for [P, Q_0, ..., Q_k]: along the boundary
+    Q_0 - Q_k, which the boundary curve alone determines, and across it the left
+    eigenvector of the local subdivision matrix with the largest eigenvalue below 1
+    that is not the one along the boundary. From k = 4 on interior eigenvalues exceed
+    the boundary's 1/2, so picking the two largest would lose the boundary tangent.
+    """
+    masks = _boundary_mask_cache.get(k)
+    if masks is None:
+        n = k + 2
+        M = np.zeros((n, n))
+        M[0, 0] = 0.75
+        M[0, 1] = M[0, n - 1] = 0.125
+        M[1, 0] = M[1, 1] = 0.5
+        M[n - 1, 0] = M[n - 1, n - 1] = 0.5
+        for i in range(2, n - 1):
+            M[i, 0] = M[i, i] = 3.0/8.0
+            M[i, i - 1] += 1.0/8.0
+            M[i, i + 1] += 1.0/8.0
+        along = np.zeros(n)
+        along[1] = 1.0
+        along[n - 1] = -1.0
+        eigenvalues, left = np.linalg.eig(M.T)
+        eigenvalues = eigenvalues.real
+        left = left.real
+        across = None
+        for i in np.argsort(-eigenvalues):
+            if abs(eigenvalues[i] - 1.0) < 1e-9:
+                continue
+            mask = left[:, i] / np.linalg.norm(left[:, i])
+            # Skips the boundary tangent, and its multiples in a repeated eigenvalue
+            if abs(mask @ along) < (1.0 - 1e-9) * np.linalg.norm(along):
+                across = mask
+                break
+        masks = np.stack((along, across))
+        _boundary_mask_cache[k] = masks
+    return masks
+
+def limit_positions(positions, triangles):
+    """
+    Returns the limit surface position of every vertex.
+    """
+    P = np.asarray(positions, dtype=np.float64)
+    V = len(P)
+    edges, _, edge_face_count, _ = build_edges(triangles, V)
+    v1 = edges[:, 0]
+    v2 = edges[:, 1]
+    boundary = edge_face_count == 1
+
+    valence = np.bincount(edges.ravel(), minlength=V)
+    neighbor_sum = _scatter_add(np.concatenate((v1, v2)), P[np.concatenate((v2, v1))], V)
+    b1 = v1[boundary]
+    b2 = v2[boundary]
+    boundary_valence = np.bincount(np.concatenate((b1, b2)), minlength=V)
+    boundary_sum = _scatter_add(np.concatenate((b1, b2)), P[np.concatenate((b2, b1))], V)
+
+    beta = loop_beta(valence)
+    omega = 3.0 / (8.0 * np.where(beta > 0.0, beta, 1.0))
+    limit = (omega[:, None] * P + neighbor_sum) / (omega + valence)[:, None]
+
+    smooth_boundary = boundary_valence == 2
+    limit[smooth_boundary] = (4.0 * P[smooth_boundary] + boundary_sum[smooth_boundary]) / 6.0
+    keep = ((boundary_valence > 0) & ~smooth_boundary) | (valence == 0)
+    limit[keep] = P[keep]
+    return limit
+
+def limit_normals(positions, triangles):
+    """
+    Returns the unit limit surface normal of every vertex, oriented like the faces.
+    """
+    P = np.asarray(positions, dtype=np.float64)
+    V = len(P)
+    mesh = HalfEdgeMesh.from_triangles(triangles, vertex_count=V)
+    valence = mesh.valence()
+    boundary_valence = mesh.boundary_valence()
+    ring, ring_length, closed = mesh.vertex_rings()
+
+    fallback = _face_normal_sum(P, triangles)
+    normals = fallback.copy()
+
+    interior = closed & (boundary_valence == 0) & (ring_length == valence) & (valence >= 3)
+    boundary = ~closed & (boundary_valence == 2) & (ring_length == valence) & (valence >= 2)
+
+    # Interior vertices, one valence at a time
+    for n in np.unique(valence[interior]):
+        group = np.nonzero(interior & (valence == n))[0]
+        Q = P[ring[group, :n]]
+        angles = 2.0 * math.pi * np.arange(n) / n
+        t1 = np.einsum("i,gic->gc", np.cos(angles), Q)
+        t2 = np.einsum("i,gic->gc", np.sin(angles), Q)
+        normals[group] = np.cross(t1, t2)
+
+    # Smooth boundary vertices, one valence at a time
+    for n in np.unique(valence[boundary]):
+        group = np.nonzero(boundary & (valence == n))[0]
+        masks = boundary_tangent_masks(n - 1)
+        stencil_points = np.concatenate((P[group][:, None, :], P[ring[group, :n]]), axis=1)
+        t1 = np.einsum("i,gic->gc", masks[0], stencil_points)
+        t2 = np.einsum("i,gic->gc", masks[1], stencil_points)
+        normals[group] = np.cross(t1, t2)
+
+    # Eigenvector signs are arbitrary, orient everything like the surrounding faces
+    flip = np.einsum("ij,ij->i", normals, fallback) < 0.0
+    normals[flip] *= -1.0
+
+    length = np.linalg.norm(normals, axis=1)
+    degenerate = length < 1e-12
+    normals[degenerate] = fallback[degenerate]
+    length[degenerate] = np.linalg.norm(fallback[degenerate], axis=1)
+    return normals / np.where(length > 0.0, length, 1.0)[:, None]
+
+def limit_surface(positions, triangles):
+    """
+    Returns (limit_positions, limit_normals) for the vertices of any level.
+    """
+    return limit_positions(positions, triangles), limit_normals(positions, triangles)
+
+# --- Adaptive refinement ---
+# Feature adaptive subdivision refines only the triangles that need it, level by level:
+#  - triangles touching an extraordinary vertex (interior valence != 6, boundary
+#    valence != 4, corners and non-manifold vertices)
+#  - triangles with a dihedral angle above max_angle to a neighbor
+#  - triangles that are not flat within tolerance: an edge whose new vertex lands
+#    further than tolerance from the edge midpoint (curvature times edge length squared)
+#  - triangles touching a selected vertex (e.g. a vertex group)
+# Each level only subdivides the marked triangles plus their one-ring, which is
+# all the Loop rules read, so the refined positions are exactly those of uniform
+# subdivision. A triangle can only be refined again if all triangles around its
+# corners were refined too, which keeps neighboring levels at most one apart.
+#
+# Triangles of different levels meet along edges that are split on one side only.
+# The unrefined side is closed with red-green rules: a triangle with two or more
+# split edges is refined as well when possible, the others are split into 2 or 3
+# 'green' transition triangles, so the output never has T-junctions.
+# Vertices of different levels are only consistent on the limit surface, so every
+# output vertex is placed there and gets its exact limit normal.
+
+def _edge_faces(face_edges, edge_count):
+    """
+    Returns the first two triangles using each edge as an (E, 2) array, -1 if missing.
+    """
+    half_edges = face_edges.ravel()
+    order = np.argsort(half_edges, kind="stable")
+    counts = np.bincount(half_edges, minlength=edge_count)
+    starts = np.cumsum(counts) - counts
+    edge_faces = np.full((edge_count, 2), -1, dtype=np.int64)
+    used = counts >= 1
+    edge_faces[used, 0] = order[starts[used]] // 3
+    shared = counts >= 2
+    edge_faces[shared, 1] = order[starts[shared] + 1] // 3
+    return edge_faces
+
+def adaptive_marks(positions, triangles, edges, face_edges, edge_face_count, edge_opposite,
+                   extraordinary=True, max_angle=None, tolerance=None, selected=None):
+    """
+    Returns the triangles that want to be refined by the adaptive criteria.
+    """
+    P = positions
+    T = triangles
+    V = len(P)
+    marked = np.zeros(len(T), dtype=bool)
+
+    if extraordinary:
+        valence = np.bincount(edges.ravel(), minlength=V)
+        boundary_valence = np.bincount(edges[edge_face_count == 1].ravel(), minlength=V)
+        non_manifold = np.zeros(V, dtype=bool)
+        non_manifold[edges[edge_face_count > 2].ravel()] = True
+        irregular = np.where(boundary_valence == 0, valence != 6, (boundary_valence != 2) | (valence != 4))
+        marked |= (irregular | non_manifold)[T].any(axis=1)
+
+    if max_angle is not None:
+        face_normals = np.cross(P[T[:, 1]] - P[T[:, 0]], P[T[:, 2]] - P[T[:, 0]])
+        length = np.linalg.norm(face_normals, axis=1)
+        face_normals /= np.where(length > 0.0, length, 1.0)[:, None]
+        edge_faces = _edge_faces(face_edges, len(edges))
+        pairs = edge_faces[(edge_face_count == 2) & (edge_faces[:, 1] >= 0)]
+        cos_angle = np.einsum("ij,ij->i", face_normals[pairs[:, 0]], face_normals[pairs[:, 1]])
+        sharp = pairs[cos_angle < math.cos(max_angle)]
+        marked[sharp.ravel()] = True
+
+    if tolerance is not None:
+        midpoints = (P[edges[:, 0]] + P[edges[:, 1]]) * 0.5
+        deviation = np.linalg.norm(odd_positions(P, edges, edge_face_count, edge_opposite) - midpoints, axis=1)
+        marked |= (deviation > tolerance)[face_edges].any(axis=1)
+
+    if selected is not None:
+        marked |= selected[T].any(axis=1)
+    return marked
+
+def _transition_triangles(triangles, split, odd):
+    """
+    Closes triangles whose edges are split on the other side.
+    split and odd are (F, 3) arrays for the edges v1v2, v2v3, v3v1: whether the
+    edge is split and the index of its middle vertex.
+    """
+    v = triangles
+    count = split.sum(axis=1)
+    out = [v[count == 0]]
+
+    # One split edge: bisect towards the opposite corner
+    for i in range(3):
+        f = (count == 1) & split[:, i]
+        a, b, c = v[f, i], v[f, (i + 1) % 3], v[f, (i + 2) % 3]
+        m = odd[f, i]
+        out += [np.stack((a, m, c), axis=1), np.stack((m, b, c), axis=1)]
+
+    # Two split edges i and i + 1: cut off their shared corner, split the rest
+    for i in range(3):
+        f = (count == 2) & split[:, i] & split[:, (i + 1) % 3]
+        a, b, c = v[f, i], v[f, (i + 1) % 3], v[f, (i + 2) % 3]
+        m1, m2 = odd[f, i], odd[f, (i + 1) % 3]
+        out += [np.stack((m1, b, m2), axis=1), np.stack((a, m1, m2), axis=1), np.stack((a, m2, c), axis=1)]
+
+    # Three split edges: the regular 1-to-4 split
+    f = count == 3
+    e = odd[f]
+    out += [np.stack((v[f, 0], e[:, 0], e[:, 2]), axis=1), np.stack((e[:, 0], v[f, 1], e[:, 1]), axis=1),
+            np.stack((e[:, 1], v[f, 2], e[:, 2]), axis=1), e]
+    return np.concatenate(out).astype(np.int64)
+
+def subdivide_adaptive(positions, triangles, iterations=1, extraordinary=True, max_angle=None,
+                       tolerance=None, selected=None):
+    """
+    Feature adaptive Loop subdivision.
+    max_angle is a dihedral angle in radians above which triangles are refined,
+    tolerance a flatness distance in object units above which triangles are refined,
+    selected an optional (V,) bool array of cage vertices whose triangles are refined.
+    Returns (positions, triangles, normals) of a watertight mesh whose vertices
+    lie on the limit surface.
+    """
+    P = np.asarray(positions, dtype=np.float64)
+    T = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    V = len(P)
+    select = np.zeros(V, dtype=bool) if selected is None else np.asarray(selected, dtype=bool).copy()
+
+    # Work mesh of the current level: the refined triangles ('exact', whose
+    # positions match uniform subdivision) followed by the one-ring around them.
+    # ids maps its vertices to output vertices.
+    exact = np.ones(len(T), dtype=bool)
+    ids = np.arange(V, dtype=np.int64)
+    out_positions, out_normals = [None], [None]
+    out_positions[0], out_normals[0] = limit_surface(P, T)
+    vertex_total = V
+    out_triangles = []
+
+    for level in range(iterations + 1):
+        V = len(P)
+        edges, face_edges, edge_face_count, edge_opposite = build_edges(T, V)
+
+        # A triangle can be refined if the whole star of each corner is exact
+        complete = np.bincount(T.ravel(), minlength=V) == np.bincount(T[exact].ravel(), minlength=V)
+        refine = np.zeros(len(T), dtype=bool)
+        if level < iterations:
+            eligible = exact & complete[T].all(axis=1)
+            refine = eligible & adaptive_marks(P, T, edges, face_edges, edge_face_count, edge_opposite,
+                                               extraordinary, max_angle, tolerance, select)
+            # Red closure
+            while True:
+                split = np.zeros(len(edges), dtype=bool)
+                split[face_edges[refine].ravel()] = True
+                grow = eligible & ~refine & (split[face_edges].sum(axis=1) >= 2)
+                if not grow.any():
+                    break
+                refine |= grow
+
+        # Subdivide the refined triangles and their one-ring
+        touched = np.zeros(V, dtype=bool)
+        touched[T[refine].ravel()] = True
+        halo = touched[T].any(axis=1) & ~refine
+        faces = np.concatenate((np.nonzero(refine)[0], np.nonzero(halo)[0]))
+        used, local = np.unique(T[faces], return_inverse=True)
+        local = local.reshape(-1, 3)
+        sub_edges, sub_face_edges, sub_count, sub_opposite = build_edges(local, len(used))
+        new_P = np.concatenate((
+            even_positions(P[used], sub_edges, sub_count),
+            odd_positions(P[used], sub_edges, sub_count, sub_opposite),
+        ))
+        new_T = refine_triangles(local, sub_face_edges, len(used)).astype(np.int64)
+
+        # Output ids of the new odd vertices, found from the edges of this level
+        new_ids = np.concatenate((ids[used], vertex_total + np.arange(len(sub_edges), dtype=np.int64)))
+        vertex_total += len(sub_edges)
+        keys = edges[:, 0].astype(np.int64) * V + edges[:, 1]
+        sub_keys = np.sort(used[sub_edges], axis=1)
+        edge_of_sub = np.searchsorted(keys, sub_keys[:, 0] * V + sub_keys[:, 1])
+        odd_of_edge = np.full(len(edges), -1, dtype=np.int64)
+        odd_of_edge[edge_of_sub] = new_ids[len(used):]
+
+        # Unrefined exact triangles are final, closed against their refined neighbors
+        split = np.zeros(len(edges), dtype=bool)
+        split[face_edges[refine].ravel()] = True
+        leaves = exact & ~refine
+        out_triangles.append(_transition_triangles(ids[T[leaves]], split[face_edges[leaves]],
+                                                   odd_of_edge[face_edges[leaves]]))
+
+        if not refine.any():
+            break
+
+        # Limit positions of the new level, only valid on the children of refined triangles
+        limit, normals = limit_surface(new_P, new_T)
+        exact = np.zeros(len(new_T), dtype=bool)
+        exact[:4 * int(refine.sum())] = True
+        valid = np.unique(new_T[exact].ravel())
+        odd = valid[valid >= len(used)]
+        placed = np.full((len(sub_edges), 3), np.nan)
+        placed_normals = np.full((len(sub_edges), 3), np.nan)
+        placed[odd - len(used)] = limit[odd]
+        placed_normals[odd - len(used)] = normals[odd]
+        out_positions.append(placed)
+        out_normals.append(placed_normals)
+
+        select = np.concatenate((select[used], select[used][sub_edges].all(axis=1)))
+        P, T, ids = new_P, new_T, new_ids
+
+    # Drop vertices that ended up unused and renumber
+    out_triangles = np.concatenate(out_triangles)
+    kept, inverse = np.unique(out_triangles, return_inverse=True)
+    return (np.concatenate(out_positions)[kept], inverse.reshape(-1, 3).astype(np.int32),
+            np.concatenate(out_normals)[kept])
@@ -11,27 +11,54 @@
 #  - Odd vertices:
 #      boundary edge: midpoint
 #      interior edge: 3/8*(v1+v2) + 1/8*(opp1+opp2)
-#  - Topology rebuild:
-#      each triangle -> 4 triangles via instancing a tiny template mesh and welding
+#  - Topology rebuild, from index buffers:
+#      each triangle is copied 4 times (Duplicate Elements), every corner gets the index of
+#      its refined vertex (corner v keeps v, the point on edge e is V + e), and copies are welded
+#      by that index. The result is numbered like LoopSubdivisionEngine: even vertices, then
+#      one odd vertex per edge, then 4 faces per triangle. No instancing, no template object,
+#      and coincident edge points can no longer be merged by mistake.
+#      Geometry Nodes has no node that builds faces from an index buffer, so the weld stays:
+#      the copies are put on an integer lattice of their target index, computed with Integer
+#      Math so it is exact up to MAX_REFINED_VERTICES. An iteration that would go past it
+#      passes its mesh through unchanged, and add_loop_subdivision_modifier() refuses it.
 #
 # Blender-5-specific improvements:
 #  - Uses a Repeat Zone to expose Iterations as a modifier input. (Repeat Zone docs) :contentReference[oaicite:2]{index=2}
 #  - Uses Remove Named Attribute for cleanup between iterations. :contentReference[oaicite:3]{index=3}
+#
+# compact=True builds a leaner iteration group for big meshes: the neighbor sums come
+# from Evaluate on Domain over the edges instead of 2 points per edge with 8 attributes,
+# the even/odd positions are not copied into the triangle soup, the face slots are
+# removed once the corners have their targets, and one scratch attribute holds the corner
+# and then the point targets. attribute_memory_report() prints an estimate of the peak of
+# both layouts, computed from the element counts, not measured in Blender.
 
 import bpy
-import bmesh
 import math
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.append(SCRIPTS_DIR)
+
+import NodeGroupReuse
 
 
 # -----------------------------
 # Settings
 # -----------------------------
 DEFAULT_ITERATIONS = 3
+# Bump when the generated node groups change, so existing ones are not reused
+GENERATOR_VERSION = 5
 MOD_NAME = "Loop Subdivision (GN math, no Subdivide)"
 
-TEMPLATE_OBJ_NAME = "_LS_Template"
-TEMPLATE_SLOT_ATTR = "ls_slot"
-MERGE_DISTANCE = 1e-6
+# Refined vertex slots {v0, v1, v2, e01, e12, e20} of the corners of the 4 child
+# triangles, in the order of LoopSubdivisionEngine.refine_triangles()
+CHILD_SLOTS = ((0, 3, 5), (3, 1, 4), (4, 2, 5), (3, 4, 5))
+# Vertices are welded on a LATTICE_SIZE^3 integer lattice of their target index
+LATTICE_SIZE = 1024
+MAX_REFINED_VERTICES = LATTICE_SIZE ** 3
 
 # Named attributes used internally (removed at end of each iteration)
 A_EDGE_V1 = "ls_ev_v1"
@@ -57,6 +84,15 @@ A_F_V2 = "ls_f_v2"
 A_F_E01 = "ls_f_e01"
 A_F_E12 = "ls_f_e12"
 A_F_E20 = "ls_f_e20"
+A_F_CHILD = "ls_f_child"
+A_C_TARGET = "ls_c_target"
+A_P_TARGET = "ls_target"
+
+# Compact layout: one scratch attribute for the corner and then the point targets
+A_SCRATCH = "ls_scratch"
+
+# Bytes per element of the attribute types used above
+ATTRIBUTE_SIZE = {"INT": 4, "FLOAT": 4, "BOOLEAN": 1, "FLOAT_VECTOR": 12}
 
 
 # -----------------------------
@@ -74,12 +110,6 @@ def ensure_object_mode():
         bpy.ops.object.mode_set(mode="OBJECT")
 
 
-def remove_node_group_if_exists(name: str):
-    ng = bpy.data.node_groups.get(name)
-    if ng:
-        bpy.data.node_groups.remove(ng)
-
-
 def add_group_socket(ng, name: str, in_out: str, socket_type: str, default=None, min_value=None):
     s = ng.interface.new_socket(name=name, in_out=in_out, socket_type=socket_type)
     if default is not None and hasattr(s, "default_value"):
@@ -162,62 +192,17 @@ def config_switch(node, input_type):
     set_enum(node, "input_type", input_type)
 
 
-# -----------------------------
-# Template object: 1 triangle split into 4 (6 verts)
-# Per-vertex int attribute TEMPLATE_SLOT_ATTR in [0..5]
-# -----------------------------
-def ensure_template_object():
-    obj = bpy.data.objects.get(TEMPLATE_OBJ_NAME)
-    if obj and obj.type == "MESH":
-        return obj
-
-    me = bpy.data.meshes.new(TEMPLATE_OBJ_NAME + "_Mesh")
-    obj = bpy.data.objects.new(TEMPLATE_OBJ_NAME, me)
-    bpy.context.collection.objects.link(obj)
-
-    # Hide helper
-    obj.hide_set(True)
-    obj.hide_render = True
-    obj.hide_select = True
-
-    bm = bmesh.new()
-
-    sqrt3 = math.sqrt(3.0)
-    v0 = bm.verts.new((0.0, 0.0, 0.0))                # slot 0
-    v1 = bm.verts.new((1.0, 0.0, 0.0))                # slot 1
-    v2 = bm.verts.new((0.5, sqrt3 * 0.5, 0.0))        # slot 2
-    m01 = bm.verts.new((0.5, 0.0, 0.0))               # slot 3
-    m12 = bm.verts.new((0.75, sqrt3 * 0.25, 0.0))     # slot 4
-    m20 = bm.verts.new((0.25, sqrt3 * 0.25, 0.0))     # slot 5
-
-    bm.faces.new((v0, m01, m20))
-    bm.faces.new((m01, v1, m12))
-    bm.faces.new((m12, v2, m20))
-    bm.faces.new((m01, m12, m20))
-
-    bm.to_mesh(me)
-    bm.free()
-    me.update()
-
-    # Slot attribute
-    if TEMPLATE_SLOT_ATTR in me.attributes:
-        me.attributes.remove(me.attributes[TEMPLATE_SLOT_ATTR])
-    attr = me.attributes.new(TEMPLATE_SLOT_ATTR, "INT", "POINT")
-    slot_vals = [0, 1, 2, 3, 4, 5]
-    for i in range(len(attr.data)):
-        attr.data[i].value = slot_vals[i] if i < len(slot_vals) else 0
-
-    return obj
-
-
 # -----------------------------
 # Opposite vertex group:
 # (Face index, edge endpoints) -> third vertex index in that face
 # -----------------------------
 def make_opp_vertex_group():
     name = "LS_OppVertex_5x"
-    remove_node_group_if_exists(name)
+    key = NodeGroupReuse.generator_key(name, GENERATOR_VERSION)
+    return NodeGroupReuse.ensure_node_group(name, key, build_opp_vertex_group)
+
 
+def build_opp_vertex_group(name):
     ng = bpy.data.node_groups.new(name, "GeometryNodeTree")
     add_group_socket(ng, "Face", "INPUT", "NodeSocketInt", default=0, min_value=0)
     add_group_socket(ng, "Edge V1", "INPUT", "NodeSocketInt", default=0, min_value=0)
@@ -301,26 +286,15 @@ def make_opp_vertex_group():
 
 
 # -----------------------------
-# One Loop subdivision iteration (GN)
+# Neighbor sums of every vertex
+# Both return (mesh node, sum_all, sum_bnd, n_all, n_bnd): the sum of all / boundary
+# neighbor positions and the number of all / boundary neighbors, as output sockets.
 # -----------------------------
-def make_loop_iter_group(template_obj, opp_group):
-    name = "LS_LoopIter_NoSubdivide_5x"
-    remove_node_group_if_exists(name)
-
-    ng = bpy.data.node_groups.new(name, "GeometryNodeTree")
-    add_group_socket(ng, "Geometry", "INPUT", "NodeSocketGeometry")
-    add_group_socket(ng, "Geometry", "OUTPUT", "NodeSocketGeometry")
-
-    nodes = ng.nodes
+def vertex_sums_from_contributions(ng, mesh):
+    """
+    One point per (vertex, edge) pair, accumulated by owner vertex.
+    """
     links = ng.links
-    nodes.clear()
-
-    gin = n(ng, "NodeGroupInput")
-    gout = n(ng, "NodeGroupOutput")
-
-    # Triangulate
-    tri = n(ng, "GeometryNodeTriangulate")
-    links.new(sock_out(gin, "Geometry"), sock_in(tri, "Mesh", "Geometry"))
 
     # Edge endpoints + boundary flag (Face Count == 1)
     edge_verts = n(ng, "GeometryNodeInputMeshEdgeVertices")
@@ -334,7 +308,7 @@ def make_loop_iter_group(template_obj, opp_group):
 
     st_v1 = n(ng, "GeometryNodeStoreNamedAttribute")
     config_store_named_attr(st_v1, "EDGE", "INT", A_EDGE_V1)
-    links.new(sock_out(tri, "Mesh", "Geometry"), sock_in(st_v1, "Geometry"))
+    links.new(sock_out(mesh, "Mesh", "Geometry"), sock_in(st_v1, "Geometry"))
     links.new(sock_out(edge_verts, "Vertex Index 1", "Vertex Index", "Vertex"), sock_in(st_v1, "Value"))
 
     st_v2 = n(ng, "GeometryNodeStoreNamedAttribute")
@@ -554,11 +528,132 @@ def make_loop_iter_group(template_obj, opp_group):
     s_n_all_v = sample_from_vertex_info(A_P_N_ALL, "FLOAT")
     s_n_bnd_v = sample_from_vertex_info(A_P_N_BND, "FLOAT")
 
+    return (mesh_with_edge_attrs, sock_out(s_sum_all_v, "Value"), sock_out(s_sum_bnd_v, "Value"),
+            sock_out(s_n_all_v, "Value"), sock_out(s_n_bnd_v, "Value"))
+
+
+def vertex_sums_from_edges(ng, mesh):
+    """
+    Compact variant without attributes or extra geometry. Evaluate on Domain averages an
+    edge field over the edges of each vertex, and a point field read on an edge is the
+    edge midpoint, so with n edges at the vertex:
+      sum_all = n * (2 * avg(midpoint) - P)
+      n_bnd   = n * avg(is boundary)
+      sum_bnd = 2 * n * avg(is boundary * midpoint) - n_bnd * P
+    """
+    links = ng.links
+
+    pos = n(ng, "GeometryNodeInputPosition")
+    vert_nei = n(ng, "GeometryNodeInputMeshVertexNeighbors")
+    n_all = sock_out(vert_nei, "Vertex Count")
+
+    edge_nei = n(ng, "GeometryNodeInputMeshEdgeNeighbors")
+    cmp_edge_bnd = n(ng, "FunctionNodeCompare")
+    cmp_edge_bnd.data_type = "INT"
+    cmp_edge_bnd.operation = "EQUAL"
+    sock_in(cmp_edge_bnd, "B").default_value = 1
+    links.new(sock_out(edge_nei, "Face Count"), sock_in(cmp_edge_bnd, "A"))
+
+    def edge_average(value, data_type):
+        avg = n(ng, "GeometryNodeFieldOnDomain")
+        set_enum(avg, "domain", "EDGE")
+        set_enum(avg, "data_type", data_type)
+        links.new(value, sock_in(avg, "Value"))
+        return sock_out(avg, "Value")
+
+    def vector_math(operation, a, b=None, scale=None):
+        vm = n(ng, "ShaderNodeVectorMath")
+        vm.operation = operation
+        links.new(a, sock_in(vm, "Vector"))
+        if b is not None:
+            links.new(b, vm.inputs[1])
+        if scale is not None:
+            links.new(scale, sock_in(vm, "Scale"))
+        return sock_out(vm, "Vector")
+
+    def scalar_math(operation, a, b):
+        m = n(ng, "ShaderNodeMath")
+        m.operation = operation
+        links.new(a, m.inputs[0])
+        if isinstance(b, float):
+            m.inputs[1].default_value = b
+        else:
+            links.new(b, m.inputs[1])
+        return sock_out(m, "Value")
+
+    two_n = scalar_math("MULTIPLY", n_all, 2.0)
+
+    # sum_all
+    mid_avg = edge_average(sock_out(pos, "Position"), "FLOAT_VECTOR")
+    twice_mid = vector_math("SCALE", mid_avg, scale=two_n)
+    n_pos = vector_math("SCALE", sock_out(pos, "Position"), scale=n_all)
+    sum_all = vector_math("SUBTRACT", twice_mid, n_pos)
+
+    # n_bnd, rounded since it is an average times n
+    bnd_avg = edge_average(sock_out(cmp_edge_bnd, "Result"), "FLOAT")
+    n_bnd = scalar_math("ROUND", scalar_math("MULTIPLY", bnd_avg, n_all), 0.0)
+
+    # sum_bnd
+    bnd_mid = vector_math("SCALE", sock_out(pos, "Position"), scale=sock_out(cmp_edge_bnd, "Result"))
+    twice_bnd_mid = vector_math("SCALE", edge_average(bnd_mid, "FLOAT_VECTOR"), scale=two_n)
+    sum_bnd = vector_math("SUBTRACT", twice_bnd_mid, vector_math("SCALE", sock_out(pos, "Position"), scale=n_bnd))
+
+    return mesh, sum_all, sum_bnd, n_all, n_bnd
+
+
+# -----------------------------
+# One Loop subdivision iteration (GN)
+# -----------------------------
+def make_loop_iter_group(opp_group, compact=False):
+    name = "LS_LoopIter_Compact_5x" if compact else "LS_LoopIter_NoSubdivide_5x"
+    key = NodeGroupReuse.generator_key(name, GENERATOR_VERSION, opp_group, compact)
+    return NodeGroupReuse.ensure_node_group(name, key, lambda name: build_loop_iter_group(name, opp_group, compact))
+
+
+def build_loop_iter_group(name, opp_group, compact=False):
+    ng = bpy.data.node_groups.new(name, "GeometryNodeTree")
+    add_group_socket(ng, "Geometry", "INPUT", "NodeSocketGeometry")
+    add_group_socket(ng, "Geometry", "OUTPUT", "NodeSocketGeometry")
+
+    nodes = ng.nodes
+    links = ng.links
+    nodes.clear()
+
+    gin = n(ng, "NodeGroupInput")
+    gout = n(ng, "NodeGroupOutput")
+
+    # Triangulate
+    tri = n(ng, "GeometryNodeTriangulate")
+    links.new(sock_out(gin, "Geometry"), sock_in(tri, "Mesh", "Geometry"))
+
+    if compact:
+        mesh_with_edge_attrs, sum_all, sum_bnd, n_all, n_bnd = vertex_sums_from_edges(ng, tri)
+    else:
+        mesh_with_edge_attrs, sum_all, sum_bnd, n_all, n_bnd = vertex_sums_from_contributions(ng, tri)
+
+    pos = n(ng, "GeometryNodeInputPosition")
+
+    def sample_index(domain, data_type):
+        s = n(ng, "GeometryNodeSampleIndex")
+        config_sample_index(s, domain, data_type)
+        return s
+
+    # Index arithmetic stays in integers: float math is inexact from 2^24 on
+    def int_math(operation, a, b):
+        m = n(ng, "FunctionNodeIntegerMath")
+        m.operation = operation
+        links.new(a, m.inputs[0])
+        if isinstance(b, int):
+            m.inputs[1].default_value = b
+        else:
+            links.new(b, m.inputs[1])
+        return sock_out(m, "Value")
+
     # Beta computation
     n_clamp = n(ng, "ShaderNodeMath")
     n_clamp.operation = "MAXIMUM"
     sock_in(n_clamp, "Value_001").default_value = 1.0
-    links.new(sock_out(s_n_all_v, "Value"), sock_in(n_clamp, "Value"))
+    links.new(n_all, sock_in(n_clamp, "Value"))
 
     tau_over_n = n(ng, "ShaderNodeMath")
     tau_over_n.operation = "DIVIDE"
@@ -598,7 +693,7 @@ def make_loop_iter_group(template_obj, opp_group):
     n_beta = n(ng, "ShaderNodeMath")
     n_beta.operation = "MULTIPLY"
     links.new(sock_out(beta, "Value"), sock_in(n_beta, "Value"))
-    links.new(sock_out(s_n_all_v, "Value"), sock_in(n_beta, "Value_001"))
+    links.new(n_all, sock_in(n_beta, "Value_001"))
 
     w_self = n(ng, "ShaderNodeMath")
     w_self.operation = "SUBTRACT"
@@ -612,7 +707,7 @@ def make_loop_iter_group(template_obj, opp_group):
 
     v_nei = n(ng, "ShaderNodeVectorMath")
     v_nei.operation = "SCALE"
-    links.new(sock_out(s_sum_all_v, "Value"), sock_in(v_nei, "Vector"))
+    links.new(sum_all, sock_in(v_nei, "Vector"))
     links.new(sock_out(beta, "Value"), sock_in(v_nei, "Scale"))
 
     interior_even = n(ng, "ShaderNodeVectorMath")
@@ -629,7 +724,7 @@ def make_loop_iter_group(template_obj, opp_group):
     b_nei = n(ng, "ShaderNodeVectorMath")
     b_nei.operation = "SCALE"
     sock_in(b_nei, "Scale").default_value = 0.125
-    links.new(sock_out(s_sum_bnd_v, "Value"), sock_in(b_nei, "Vector"))
+    links.new(sum_bnd, sock_in(b_nei, "Vector"))
 
     boundary_even = n(ng, "ShaderNodeVectorMath")
     boundary_even.operation = "ADD"
@@ -640,19 +735,19 @@ def make_loop_iter_group(template_obj, opp_group):
     is_valid_bnd.data_type = "FLOAT"
     is_valid_bnd.operation = "EQUAL"
     sock_in(is_valid_bnd, "B").default_value = 2.0
-    links.new(sock_out(s_n_bnd_v, "Value"), sock_in(is_valid_bnd, "A"))
+    links.new(n_bnd, sock_in(is_valid_bnd, "A"))
 
     has_bnd = n(ng, "FunctionNodeCompare")
     has_bnd.data_type = "FLOAT"
     has_bnd.operation = "GREATER_THAN"
     sock_in(has_bnd, "B").default_value = 0.0
-    links.new(sock_out(s_n_bnd_v, "Value"), sock_in(has_bnd, "A"))
+    links.new(n_bnd, sock_in(has_bnd, "A"))
 
     is_isolated = n(ng, "FunctionNodeCompare")
     is_isolated.data_type = "FLOAT"
     is_isolated.operation = "EQUAL"
     sock_in(is_isolated, "B").default_value = 0.0
-    links.new(sock_out(s_n_all_v, "Value"), sock_in(is_isolated, "A"))
+    links.new(n_all, sock_in(is_isolated, "A"))
 
     sw_iso = n(ng, "GeometryNodeSwitch")
     config_switch(sw_iso, "VECTOR")
@@ -779,7 +874,13 @@ def make_loop_iter_group(template_obj, opp_group):
 
     mesh_attrs = st_odd
 
-    # Per-face attributes for instancing template
+    # Per-face target indices of the 6 refined vertices: the corners keep their
+    # vertex index, the edge points are numbered V + edge index
+    domain_size = n(ng, "GeometryNodeAttributeDomainSize")
+    set_enum(domain_size, "component", "MESH")
+    links.new(sock_out(mesh_attrs, "Geometry"), sock_in(domain_size, "Geometry"))
+    vertex_count = sock_out(domain_size, "Point Count")
+
     cof_f0 = n(ng, "GeometryNodeCornersOfFace")
     cof_f1 = n(ng, "GeometryNodeCornersOfFace")
     cof_f2 = n(ng, "GeometryNodeCornersOfFace")
@@ -795,23 +896,6 @@ def make_loop_iter_group(template_obj, opp_group):
     links.new(sock_out(cof_f1, "Corner Index"), sock_in(voc_f1, "Corner Index"))
     links.new(sock_out(cof_f2, "Corner Index"), sock_in(voc_f2, "Corner Index"))
 
-    na_even = n(ng, "GeometryNodeInputNamedAttribute")
-    sock_in(na_even, "Name").default_value = A_EVEN
-    na_odd = n(ng, "GeometryNodeInputNamedAttribute")
-    sock_in(na_odd, "Name").default_value = A_ODD
-
-    def sample_even_from_vertex(voc):
-        s = n(ng, "GeometryNodeSampleIndex")
-        config_sample_index(s, "POINT", "FLOAT_VECTOR")
-        links.new(sock_out(mesh_attrs, "Geometry"), sock_in(s, "Geometry"))
-        links.new(sock_out(na_even, "Attribute"), sock_in(s, "Value"))
-        links.new(sock_out(voc, "Vertex Index", "Vertex"), sock_in(s, "Index"))
-        return s
-
-    s_v0 = sample_even_from_vertex(voc_f0)
-    s_v1 = sample_even_from_vertex(voc_f1)
-    s_v2 = sample_even_from_vertex(voc_f2)
-
     eoc0 = n(ng, "GeometryNodeEdgesOfCorner")
     eoc1 = n(ng, "GeometryNodeEdgesOfCorner")
     eoc2 = n(ng, "GeometryNodeEdgesOfCorner")
@@ -819,124 +903,199 @@ def make_loop_iter_group(template_obj, opp_group):
     links.new(sock_out(cof_f1, "Corner Index"), sock_in(eoc1, "Corner Index"))
     links.new(sock_out(cof_f2, "Corner Index"), sock_in(eoc2, "Corner Index"))
 
-    e01 = sock_out(eoc0, "Next Edge Index", "Next Edge", "Next")
-    e12 = sock_out(eoc1, "Next Edge Index", "Next Edge", "Next")
-    e20 = sock_out(eoc2, "Next Edge Index", "Next Edge", "Next")
+    def odd_index(eoc):
+        return int_math("ADD", sock_out(eoc, "Next Edge Index", "Next Edge", "Next"), vertex_count)
 
-    def sample_odd_from_edge(edge_index_socket):
-        s = n(ng, "GeometryNodeSampleIndex")
-        config_sample_index(s, "EDGE", "FLOAT_VECTOR")
-        links.new(sock_out(mesh_attrs, "Geometry"), sock_in(s, "Geometry"))
-        links.new(sock_out(na_odd, "Attribute"), sock_in(s, "Value"))
-        links.new(edge_index_socket, sock_in(s, "Index"))
-        return s
+    slot_values = [
+        sock_out(voc_f0, "Vertex Index", "Vertex"),
+        sock_out(voc_f1, "Vertex Index", "Vertex"),
+        sock_out(voc_f2, "Vertex Index", "Vertex"),
+        odd_index(eoc0),
+        odd_index(eoc1),
+        odd_index(eoc2),
+    ]
 
-    s_e01 = sample_odd_from_edge(e01)
-    s_e12 = sample_odd_from_edge(e12)
-    s_e20 = sample_odd_from_edge(e20)
-
-    # Store face attrs
-    st_fv0 = n(ng, "GeometryNodeStoreNamedAttribute")
-    config_store_named_attr(st_fv0, "FACE", "FLOAT_VECTOR", A_F_V0)
-    links.new(sock_out(mesh_attrs, "Geometry"), sock_in(st_fv0, "Geometry"))
-    links.new(sock_out(s_v0, "Value"), sock_in(st_fv0, "Value"))
-
-    st_fv1 = n(ng, "GeometryNodeStoreNamedAttribute")
-    config_store_named_attr(st_fv1, "FACE", "FLOAT_VECTOR", A_F_V1)
-    links.new(sock_out(st_fv0, "Geometry"), sock_in(st_fv1, "Geometry"))
-    links.new(sock_out(s_v1, "Value"), sock_in(st_fv1, "Value"))
-
-    st_fv2 = n(ng, "GeometryNodeStoreNamedAttribute")
-    config_store_named_attr(st_fv2, "FACE", "FLOAT_VECTOR", A_F_V2)
-    links.new(sock_out(st_fv1, "Geometry"), sock_in(st_fv2, "Geometry"))
-    links.new(sock_out(s_v2, "Value"), sock_in(st_fv2, "Value"))
-
-    st_fe01 = n(ng, "GeometryNodeStoreNamedAttribute")
-    config_store_named_attr(st_fe01, "FACE", "FLOAT_VECTOR", A_F_E01)
-    links.new(sock_out(st_fv2, "Geometry"), sock_in(st_fe01, "Geometry"))
-    links.new(sock_out(s_e01, "Value"), sock_in(st_fe01, "Value"))
-
-    st_fe12 = n(ng, "GeometryNodeStoreNamedAttribute")
-    config_store_named_attr(st_fe12, "FACE", "FLOAT_VECTOR", A_F_E12)
-    links.new(sock_out(st_fe01, "Geometry"), sock_in(st_fe12, "Geometry"))
-    links.new(sock_out(s_e12, "Value"), sock_in(st_fe12, "Value"))
-
-    st_fe20 = n(ng, "GeometryNodeStoreNamedAttribute")
-    config_store_named_attr(st_fe20, "FACE", "FLOAT_VECTOR", A_F_E20)
-    links.new(sock_out(st_fe12, "Geometry"), sock_in(st_fe20, "Geometry"))
-    links.new(sock_out(s_e20, "Value"), sock_in(st_fe20, "Value"))
-
-    # Face -> points, instance template, realize
-    m2p_faces = n(ng, "GeometryNodeMeshToPoints")
-    config_mesh_to_points(m2p_faces, "FACES")
-    links.new(sock_out(st_fe20, "Geometry"), sock_in(m2p_faces, "Mesh", "Geometry"))
-
-    obj_info = n(ng, "GeometryNodeObjectInfo")
-    sock_in(obj_info, "Object").default_value = template_obj
-    try:
-        obj_info.as_instance = True
-    except Exception:
-        pass
-
-    inst = n(ng, "GeometryNodeInstanceOnPoints")
-    links.new(sock_out(m2p_faces, "Points", "Geometry"), sock_in(inst, "Points", "Geometry"))
-    links.new(sock_out(obj_info, "Geometry"), sock_in(inst, "Instance", "Geometry"))
-
-    realize = n(ng, "GeometryNodeRealizeInstances")
-    links.new(sock_out(inst, "Instances", "Geometry"), sock_in(realize, "Geometry"))
-
-    # Set position based on slot [0..5] mapping to {v0,v1,v2,e01,e12,e20}
-    na_slot = n(ng, "GeometryNodeInputNamedAttribute")
-    sock_in(na_slot, "Name").default_value = TEMPLATE_SLOT_ATTR
-
-    na_fv0 = n(ng, "GeometryNodeInputNamedAttribute"); sock_in(na_fv0, "Name").default_value = A_F_V0
-    na_fv1 = n(ng, "GeometryNodeInputNamedAttribute"); sock_in(na_fv1, "Name").default_value = A_F_V1
-    na_fv2 = n(ng, "GeometryNodeInputNamedAttribute"); sock_in(na_fv2, "Name").default_value = A_F_V2
-    na_fe01 = n(ng, "GeometryNodeInputNamedAttribute"); sock_in(na_fe01, "Name").default_value = A_F_E01
-    na_fe12 = n(ng, "GeometryNodeInputNamedAttribute"); sock_in(na_fe12, "Name").default_value = A_F_E12
-    na_fe20 = n(ng, "GeometryNodeInputNamedAttribute"); sock_in(na_fe20, "Name").default_value = A_F_E20
-
-    def slot_eq(k):
+    g = mesh_attrs
+    if compact:
+        # The soup only needs the topology: positions are sampled from mesh_attrs
+        for nm in (A_EVEN, A_ODD):
+            rm = n(ng, "GeometryNodeRemoveNamedAttribute")
+            links.new(sock_out(g, "Geometry"), sock_in(rm, "Geometry"))
+            sock_in(rm, "Name").default_value = nm
+            g = rm
+
+    face_slots = (A_F_V0, A_F_V1, A_F_V2, A_F_E01, A_F_E12, A_F_E20)
+    for nm, value in zip(face_slots, slot_values):
+        st = n(ng, "GeometryNodeStoreNamedAttribute")
+        config_store_named_attr(st, "FACE", "INT", nm)
+        links.new(sock_out(g, "Geometry"), sock_in(st, "Geometry"))
+        links.new(value, sock_in(st, "Value"))
+        g = st
+
+    # 4 separate copies of every face, one per child triangle. Face attributes are copied along.
+    dup = n(ng, "GeometryNodeDuplicateElements")
+    set_enum(dup, "domain", "FACE")
+    sock_in(dup, "Amount").default_value = 4
+    links.new(sock_out(g, "Geometry"), sock_in(dup, "Geometry"))
+
+    st_dup = n(ng, "GeometryNodeStoreNamedAttribute")
+    config_store_named_attr(st_dup, "FACE", "INT", A_F_CHILD)
+    links.new(sock_out(dup, "Geometry"), sock_in(st_dup, "Geometry"))
+    links.new(sock_out(dup, "Duplicate Index"), sock_in(st_dup, "Value"))
+
+    # Target vertex of every corner: CHILD_SLOTS[child][index in face]
+    def named_int(name):
+        na = n(ng, "GeometryNodeInputNamedAttribute")
+        set_enum(na, "data_type", "INT")
+        sock_in(na, "Name").default_value = name
+        return na
+
+    slot_attrs = [sock_out(named_int(nm), "Attribute") for nm in face_slots]
+
+    foc = n(ng, "GeometryNodeFaceOfCorner")
+    key = n(ng, "ShaderNodeMath")
+    key.operation = "MULTIPLY_ADD"
+    links.new(sock_out(named_int(A_F_CHILD), "Attribute"), key.inputs[0])
+    key.inputs[1].default_value = 3.0
+    links.new(sock_out(foc, "Index in Face"), key.inputs[2])
+
+    keys = [(child, j) for child in range(4) for j in range(3)]
+    cur_target = slot_attrs[CHILD_SLOTS[3][2]]
+    for k in reversed(range(len(keys) - 1)):
+        child, j = keys[k]
         c = n(ng, "FunctionNodeCompare")
-        c.data_type = "INT"
+        c.data_type = "FLOAT"
         c.operation = "EQUAL"
-        sock_in(c, "B").default_value = k
-        links.new(sock_out(na_slot, "Attribute"), sock_in(c, "A"))
-        return c
-
-    cur_vec = na_fe20
-    for k, src in [(4, na_fe12), (3, na_fe01), (2, na_fv2), (1, na_fv1), (0, na_fv0)]:
+        sock_in(c, "B").default_value = float(k)
+        links.new(sock_out(key, "Value"), sock_in(c, "A"))
         sw = n(ng, "GeometryNodeSwitch")
-        config_switch(sw, "VECTOR")
-        links.new(sock_out(slot_eq(k), "Result"), sock_in(sw, "Switch"))
-        links.new(sock_out(cur_vec, "Attribute"), sock_in(sw, "False"))
-        links.new(sock_out(src, "Attribute"), sock_in(sw, "True"))
-        cur_vec = sw
-
-    setp = n(ng, "GeometryNodeSetPosition")
-    links.new(sock_out(realize, "Geometry"), sock_in(setp, "Geometry"))
-    links.new(sock_out(cur_vec, "Output"), sock_in(setp, "Position"))
+        config_switch(sw, "INT")
+        links.new(sock_out(c, "Result"), sock_in(sw, "Switch"))
+        links.new(cur_target, sock_in(sw, "False"))
+        links.new(slot_attrs[CHILD_SLOTS[child][j]], sock_in(sw, "True"))
+        cur_target = sock_out(sw, "Output")
+
+    corner_target = A_SCRATCH if compact else A_C_TARGET
+    point_target = A_SCRATCH if compact else A_P_TARGET
+
+    st_ct = n(ng, "GeometryNodeStoreNamedAttribute")
+    config_store_named_attr(st_ct, "CORNER", "INT", corner_target)
+    links.new(sock_out(st_dup, "Geometry"), sock_in(st_ct, "Geometry"))
+    links.new(cur_target, sock_in(st_ct, "Value"))
+
+    g = st_ct
+    if compact:
+        # The face slots are no longer needed once the corners have their targets
+        for nm in face_slots + (A_F_CHILD,):
+            rm = n(ng, "GeometryNodeRemoveNamedAttribute")
+            links.new(sock_out(g, "Geometry"), sock_in(rm, "Geometry"))
+            sock_in(rm, "Name").default_value = nm
+            g = rm
+
+    # Each copied vertex has a single corner, so reading the corner value on points is exact.
+    # In compact mode this moves the scratch attribute from the corners to the points.
+    st_pt = n(ng, "GeometryNodeStoreNamedAttribute")
+    config_store_named_attr(st_pt, "POINT", "INT", point_target)
+    links.new(sock_out(g, "Geometry"), sock_in(st_pt, "Geometry"))
+    links.new(sock_out(named_int(corner_target), "Attribute"), sock_in(st_pt, "Value"))
+
+    # Weld by index: put every vertex on the integer lattice point of its target index,
+    # so only copies of the same refined vertex are within the merge distance
+    # (the coordinates are integers below LATTICE_SIZE, exact as floats).
+    na_target = named_int(point_target)
+    lattice = []
+    for divisor in (1, LATTICE_SIZE, LATTICE_SIZE * LATTICE_SIZE):
+        digit = sock_out(na_target, "Attribute")
+        if divisor > 1:
+            digit = int_math("DIVIDE_FLOOR", digit, divisor)
+        lattice.append(int_math("FLOORED_MODULO", digit, LATTICE_SIZE))
+
+    xyz = n(ng, "ShaderNodeCombineXYZ")
+    for axis, value in zip(("X", "Y", "Z"), lattice):
+        links.new(value, sock_in(xyz, axis))
+
+    sp_lattice = n(ng, "GeometryNodeSetPosition")
+    links.new(sock_out(st_pt, "Geometry"), sock_in(sp_lattice, "Geometry"))
+    links.new(sock_out(xyz, "Vector"), sock_in(sp_lattice, "Position"))
 
     merge = n(ng, "GeometryNodeMergeByDistance")
-    sock_in(merge, "Distance").default_value = MERGE_DISTANCE
-    links.new(sock_out(setp, "Geometry"), sock_in(merge, "Geometry"))
-
-    # Cleanup: remove all temporary attrs (incl. template slot)
-    cleanup_names = [
-        TEMPLATE_SLOT_ATTR,
-        A_EDGE_V1, A_EDGE_V2, A_EDGE_BOUND,
-        A_P_OWNER, A_P_NEIGHBOR_POS, A_P_BFLAG, A_P_SUM_ALL, A_P_SUM_BND, A_P_N_ALL, A_P_N_BND, A_P_TRAIL,
-        A_EVEN, A_ODD,
-        A_F_V0, A_F_V1, A_F_V2, A_F_E01, A_F_E12, A_F_E20,
-    ]
-    g = merge
+    set_enum(merge, "mode", "ALL")
+    sock_in(merge, "Distance").default_value = 0.5
+    links.new(sock_out(sp_lattice, "Geometry"), sock_in(merge, "Geometry"))
+
+    # Even vertices first, then one odd vertex per edge, as in LoopSubdivisionEngine
+    sort = n(ng, "GeometryNodeSortElements")
+    config_sort_elements(sort, "POINT")
+    links.new(sock_out(merge, "Geometry"), sock_in(sort, "Geometry"))
+    links.new(sock_out(na_target, "Attribute"), sock_in(sort, "Sort Weight", "Sort"))
+
+    # Positions: even vertex t, or the odd vertex of edge t - V
+    is_even = n(ng, "FunctionNodeCompare")
+    is_even.data_type = "INT"
+    is_even.operation = "LESS_THAN"
+    links.new(sock_out(na_target, "Attribute"), sock_in(is_even, "A"))
+    links.new(vertex_count, sock_in(is_even, "B"))
+
+    edge_of_target = int_math("SUBTRACT", sock_out(na_target, "Attribute"), vertex_count)
+
+    na_even = n(ng, "GeometryNodeInputNamedAttribute")
+    sock_in(na_even, "Name").default_value = A_EVEN
+    na_odd = n(ng, "GeometryNodeInputNamedAttribute")
+    sock_in(na_odd, "Name").default_value = A_ODD
+
+    s_even = n(ng, "GeometryNodeSampleIndex")
+    config_sample_index(s_even, "POINT", "FLOAT_VECTOR")
+    links.new(sock_out(mesh_attrs, "Geometry"), sock_in(s_even, "Geometry"))
+    links.new(sock_out(na_even, "Attribute"), sock_in(s_even, "Value"))
+    links.new(sock_out(na_target, "Attribute"), sock_in(s_even, "Index"))
+
+    s_odd = n(ng, "GeometryNodeSampleIndex")
+    config_sample_index(s_odd, "EDGE", "FLOAT_VECTOR")
+    links.new(sock_out(mesh_attrs, "Geometry"), sock_in(s_odd, "Geometry"))
+    links.new(sock_out(na_odd, "Attribute"), sock_in(s_odd, "Value"))
+    links.new(edge_of_target, sock_in(s_odd, "Index"))
+
+    sw_pos = n(ng, "GeometryNodeSwitch")
+    config_switch(sw_pos, "VECTOR")
+    links.new(sock_out(is_even, "Result"), sock_in(sw_pos, "Switch"))
+    links.new(sock_out(s_odd, "Value"), sock_in(sw_pos, "False"))
+    links.new(sock_out(s_even, "Value"), sock_in(sw_pos, "True"))
+
+    setp = n(ng, "GeometryNodeSetPosition")
+    links.new(sock_out(sort, "Geometry"), sock_in(setp, "Geometry"))
+    links.new(sock_out(sw_pos, "Output"), sock_in(setp, "Position"))
+
+    # Cleanup: remove all temporary attrs
+    if compact:
+        cleanup_names = [A_SCRATCH]
+    else:
+        cleanup_names = [
+            A_EDGE_V1, A_EDGE_V2, A_EDGE_BOUND,
+            A_P_OWNER, A_P_NEIGHBOR_POS, A_P_BFLAG, A_P_SUM_ALL, A_P_SUM_BND, A_P_N_ALL, A_P_N_BND, A_P_TRAIL,
+            A_EVEN, A_ODD,
+            A_F_V0, A_F_V1, A_F_V2, A_F_E01, A_F_E12, A_F_E20, A_F_CHILD, A_C_TARGET, A_P_TARGET,
+        ]
+    g = setp
     for nm in cleanup_names:
         rm = n(ng, "GeometryNodeRemoveNamedAttribute")
         links.new(sock_out(g, "Geometry"), sock_in(rm, "Geometry"))
         sock_in(rm, "Name").default_value = nm
         g = rm
 
-    links.new(sock_out(g, "Geometry"), sock_in(gout, "Geometry"))
+    # Past MAX_REFINED_VERTICES the lattice would weld distinct vertices: keep the input
+    refined_count = int_math("ADD", vertex_count, sock_out(domain_size, "Edge Count"))
+    too_big = n(ng, "FunctionNodeCompare")
+    too_big.data_type = "INT"
+    too_big.operation = "GREATER_THAN"
+    links.new(refined_count, sock_in(too_big, "A"))
+    sock_in(too_big, "B").default_value = MAX_REFINED_VERTICES
+    sw_guard = n(ng, "GeometryNodeSwitch")
+    config_switch(sw_guard, "GEOMETRY")
+    links.new(sock_out(too_big, "Result"), sock_in(sw_guard, "Switch"))
+    links.new(sock_out(g, "Geometry"), sock_in(sw_guard, "False"))
+    links.new(sock_out(gin, "Geometry"), sock_in(sw_guard, "True"))
+
+    links.new(sock_out(sw_guard, "Output"), sock_in(gout, "Geometry"))
     return ng
 
 
@@ -945,8 +1104,12 @@ def make_loop_iter_group(template_obj, opp_group):
 # -----------------------------
 def make_repeat_wrapper(iter_group, default_iterations: int):
     name = "LS_LoopSubdiv_NoSubdivide_Repeat_5x"
-    remove_node_group_if_exists(name)
+    key = NodeGroupReuse.generator_key(name, GENERATOR_VERSION, iter_group, default_iterations)
+    return NodeGroupReuse.ensure_node_group(
+        name, key, lambda name: build_repeat_wrapper(name, iter_group, default_iterations))
+
 
+def build_repeat_wrapper(name, iter_group, default_iterations: int):
     ng = bpy.data.node_groups.new(name, "GeometryNodeTree")
     add_group_socket(ng, "Geometry", "INPUT", "NodeSocketGeometry")
     add_group_socket(ng, "Iterations", "INPUT", "NodeSocketInt", default=default_iterations, min_value=0)
@@ -991,20 +1154,127 @@ def ensure_modifier(obj, node_group):
     return mod
 
 
+def add_loop_subdivision_modifier(obj, iterations=DEFAULT_ITERATIONS, library_path=None, compact=False):
+    """
+    Adds the modifier, reusing unedited node groups from earlier runs.
+    With library_path, the groups of that library .blend are linked and reused if it
+    exists, otherwise the generated groups are saved into it for other files to link.
+    compact selects the leaner attribute layout.
+    """
+    refined = mesh_counts(obj, iterations)[-1][0]
+    if refined > MAX_REFINED_VERTICES:
+        raise ValueError(f"{iterations} iterations of {obj.name} make {refined} vertices, "
+                         f"more than the {MAX_REFINED_VERTICES} the weld can tell apart")
+    if library_path and os.path.exists(library_path):
+        NodeGroupReuse.link_library(library_path)
+    opp_group = make_opp_vertex_group()
+    iter_group = make_loop_iter_group(opp_group, compact)
+    wrapper = make_repeat_wrapper(iter_group, iterations)
+    if library_path and not os.path.exists(library_path):
+        NodeGroupReuse.save_library(library_path, [wrapper])
+    return ensure_modifier(obj, wrapper)
+
+
+# -----------------------------
+# Attribute memory estimate
+# -----------------------------
+def mesh_counts(obj, iterations):
+    """
+    (vertices, edges, triangles) of the object's triangulated mesh before each iteration
+    and after the last, iterations + 1 tuples.
+    """
+    me = obj.data
+    me.calc_loop_triangles()
+    V = len(me.vertices)
+    F = len(me.loop_triangles)
+    # Triangulating an n-gon adds n - 3 edges, and sum(n - 2) = F
+    E = len(me.edges) + F - len(me.polygons)
+    counts = [(V, E, F)]
+    for _ in range(iterations):
+        V, E, F = V + E, 2 * E + 3 * F, 4 * F
+        counts.append((V, E, F))
+    return counts
+
+
+def attribute_memory(vertex_count, edge_count, face_count, compact=False):
+    """
+    Estimated bytes of the named attributes alive at each stage of one iteration on a
+    triangle mesh with these element counts, as a list of (stage, bytes). This is
+    arithmetic on the element counts, not a measurement: only the attributes this group
+    stores are counted, not positions, topology, the builtin attributes of the input or
+    the temporary buffers of the nodes.
+    """
+    V, E, F = vertex_count, edge_count, face_count
+    vec = ATTRIBUTE_SIZE["FLOAT_VECTOR"]
+    i32 = ATTRIBUTE_SIZE["INT"]
+    positions = vec * V + vec * E                   # A_EVEN, A_ODD
+    if compact:
+        return [
+            ("even/odd", positions),
+            ("face targets", positions + 6 * i32 * F),
+            # soup: 4F faces with the face slots and A_F_CHILD, 12F corners with A_SCRATCH
+            ("duplicate", positions + 4 * F * 7 * i32 + 12 * F * i32),
+            # welded soup: V + E points with A_SCRATCH
+            ("weld", positions + (V + E) * i32),
+        ]
+
+    flag = ATTRIBUTE_SIZE["BOOLEAN"]
+    edges = (2 * i32 + flag) * E                    # A_EDGE_V1, A_EDGE_V2, A_EDGE_BOUND
+    # A contribution point carries the edge attributes and the 8 A_P_* attributes
+    contribution = 2 * i32 + flag + i32 + 4 * ATTRIBUTE_SIZE["FLOAT"] + 3 * vec
+    soup_point = vec + i32                          # A_EVEN, A_P_TARGET
+    soup_edge = 2 * i32 + flag + vec                # edge attributes, A_ODD
+    soup_face = 7 * i32                             # A_F_V0 .. A_F_E20, A_F_CHILD
+    return [
+        ("edge attributes", edges),
+        ("contributions", edges + 2 * E * contribution),
+        ("vertex info", edges + V * contribution),
+        ("even/odd", edges + positions),
+        ("face targets", edges + positions + 6 * i32 * F),
+        # soup: 12F points, edges and corners (A_C_TARGET) and 4F faces, all attributes copied along
+        ("duplicate", edges + positions + 12 * F * (soup_point + soup_edge + i32) + 4 * F * soup_face),
+        ("weld", edges + positions + (V + E) * soup_point + (2 * E + 3 * F) * soup_edge
+         + 4 * F * soup_face + 12 * F * i32),
+    ]
+
+
+def attribute_memory_report(obj, iterations=DEFAULT_ITERATIONS):
+    """
+    Prints the estimated peak attribute memory of every iteration on the object's mesh,
+    for the default and the compact layout, see attribute_memory(). Returns
+    [(default bytes, compact bytes)].
+    """
+    peaks = []
+    for i, (V, E, F) in enumerate(mesh_counts(obj, iterations)[:-1]):
+        default = max(size for _, size in attribute_memory(V, E, F))
+        compact = max(size for _, size in attribute_memory(V, E, F, compact=True))
+        print(f"Iteration {i + 1}: {V} vertices, {E} edges, {F} triangles, "
+              f"estimated peak attributes {default / 2**20:.1f} MiB, compact {compact / 2**20:.1f} MiB")
+        if V + E > MAX_REFINED_VERTICES:
+            print(f"Iteration {i + 1}: {V + E} refined vertices exceed {MAX_REFINED_VERTICES}, "
+                  f"the mesh is passed through unchanged")
+        peaks.append((default, compact))
+    return peaks
+
+
 # -----------------------------
 # Run
 # -----------------------------
-ensure_object_mode()
+if __name__ == "__main__":
+    ensure_object_mode()
+
+    obj = bpy.context.active_object
+    if not obj or obj.type != "MESH":
+        raise RuntimeError("Select a mesh object first.")
 
-obj = bpy.context.active_object
-if not obj or obj.type != "MESH":
-    raise RuntimeError("Select a mesh object first.")
+    # Shared library .blend of the generated node groups, e.g. "//LoopSubdivisionNodes.blend"
+    LIBRARY_PATH = None
 
-template_obj = ensure_template_object()
-opp_group = make_opp_vertex_group()
-iter_group = make_loop_iter_group(template_obj, opp_group)
-wrapper = make_repeat_wrapper(iter_group, DEFAULT_ITERATIONS)
+    # Leaner attribute layout for big meshes
+    COMPACT = False
 
-ensure_modifier(obj, wrapper)
+    attribute_memory_report(obj)
+    add_loop_subdivision_modifier(obj, library_path=bpy.path.abspath(LIBRARY_PATH) if LIBRARY_PATH else None,
+                                  compact=COMPACT)
 
-print(f"[OK] Added '{MOD_NAME}' (Blender 5.0+, Repeat Zone iterations) to '{obj.name}'.")
+    print(f"[OK] Added '{MOD_NAME}' (Blender 5.0+, Repeat Zone iterations) to '{obj.name}'.")
@@ -1,22 +1,32 @@
 import bpy
 import math
+import os
+import sys
 
-def clean_node_tree(name):
-    """Removes existing node tree if it exists to ensure a fresh build."""
-    if name in bpy.data.node_groups:
-        bpy.data.node_groups.remove(bpy.data.node_groups[name])
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.append(SCRIPTS_DIR)
+
+import NodeGroupReuse
+
+# Bump when the generated node groups change, so existing ones are not reused
+GENERATOR_VERSION = 1
 
 def create_group(name, type='GeometryNodeTree'):
-    clean_node_tree(name)
     return bpy.data.node_groups.new(name=name, type=type)
 
 # --- HELPER: CREATE "CALC BETA" GROUP ---
 def create_beta_calc_group():
     """
-    Creates a reusable Node Group for Loop's Beta calculation.
+    Returns a reusable Node Group for Loop's Beta calculation, generating it if needed.
     Formula: beta = (1/n) * (5/8 - (3/8 + 1/4 * cos(2pi/n))^2)
     """
-    ng = create_group("Loop_Calc_Beta", type='ShaderNodeTree') # ShaderTree works for Math
+    name = "Loop_Calc_Beta"
+    key = NodeGroupReuse.generator_key(name, GENERATOR_VERSION)
+    return NodeGroupReuse.ensure_node_group(name, key, build_beta_calc_group)
+
+def build_beta_calc_group(name):
+    ng = create_group(name, type='ShaderNodeTree') # ShaderTree works for Math
     # In 5.0/4.0+, we use 'interface'
     ng.interface.new_socket(name="Valence", in_out='INPUT', socket_type='NodeSocketFloat')
     ng.interface.new_socket(name="Beta", in_out='OUTPUT', socket_type='NodeSocketFloat')
@@ -74,18 +84,38 @@ def create_beta_calc_group():
     links.new(math_sub.outputs[0], math_final.inputs[1])
 
     links.new(math_final.outputs[0], output_n.inputs['Beta'])
+    return ng
 
 # --- MAIN GENERATOR ---
-def create_loop_modifier(obj, iterations=2):
+def create_loop_modifier(obj, iterations=2, library_path=None):
+    """
+    Adds the modifier, reusing unedited node groups from earlier runs.
+    With library_path, the groups of that library .blend are linked and reused if it
+    exists, otherwise the generated groups are saved into it for other files to link.
+    """
     if not obj or obj.type != 'MESH':
         return
 
+    if library_path and os.path.exists(library_path):
+        NodeGroupReuse.link_library(library_path)
+
     # Ensure dependencies exist
-    create_beta_calc_group()
+    beta_group = create_beta_calc_group()
 
-    # Create Main Group
+    # Main Group
     ng_name = "Loop_Subdiv_Main"
-    ng = create_group(ng_name, type='GeometryNodeTree')
+    key = NodeGroupReuse.generator_key(ng_name, GENERATOR_VERSION, beta_group, iterations)
+    ng = NodeGroupReuse.ensure_node_group(ng_name, key, lambda name: build_loop_group(name, iterations, beta_group))
+
+    if library_path and not os.path.exists(library_path):
+        NodeGroupReuse.save_library(library_path, [ng])
+
+    # Add Modifier
+    mod = obj.modifiers.new(name="Loop Subdivision", type='NODES')
+    mod.node_group = ng
+
+def build_loop_group(name, iterations, beta_group):
+    ng = create_group(name, type='GeometryNodeTree')
 
     # --- Interface (Blender 4.0+ API) ---
     ng.interface.new_socket(name="Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
@@ -141,7 +171,7 @@ def create_loop_modifier(obj, iterations=2):
 
     # 2. Call Beta Group
     n_calc_beta = add_node('GeometryNodeGroup', (200, 300))
-    n_calc_beta.node_tree = bpy.data.node_groups['Loop_Calc_Beta']
+    n_calc_beta.node_tree = beta_group
     # Type conversion: Int to Float
     links.new(n_vert_neigh.outputs['Vertex Count'], n_calc_beta.inputs['Valence'])
 
@@ -354,10 +384,7 @@ def create_loop_modifier(obj, iterations=2):
 
     # Output
     links.new(n_rep_out.outputs[0], n_out.inputs['Geometry'])
-
-    # Add Modifier
-    mod = obj.modifiers.new(name="Loop Subdivision", type='NODES')
-    mod.node_group = ng
+    return ng
 
 # --- EXECUTION ---
 if __name__ == "__main__":
@@ -0,0 +1,175 @@
+import bpy
+import os
+import sys
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.append(SCRIPTS_DIR)
+
+import LoopSubdivisionEngine
+import MeshArrays
+import NodeGroupReuse
+
+# Loop subdivision as a Geometry Nodes modifier that evaluates a precomputed stencil.
+#
+# The GeoNodes generators in LoopSubdivisionGeoNodes/ redo the whole refinement (valence,
+# beta, neighbor sums, opposite vertices, topology) in a Repeat Zone on every evaluation.
+# Here the cage's level-N stencil is compiled once in Python and stored as attributes:
+#   target mesh      the level-N topology, with INT point attribute ls_stencil_start,
+#                    the first stencil entry of every refined vertex
+#   stencil mesh     one loose vertex per stencil entry, with INT ls_stencil_row,
+#                    INT ls_stencil_column and FLOAT ls_stencil_weight
+# The node group on the target reads the cage's evaluated positions and computes every
+# refined position in a fixed number of passes, with no iteration:
+#   gather      Sample Index of the cage position at ls_stencil_column, times the weight
+#   accumulate  Accumulate Field grouped by ls_stencil_row
+#   scatter     Sample Index of the row totals at ls_stencil_start
+# Animating or deforming the cage costs one gather per frame. After changing the cage's
+# connectivity call add_stencil_modifier() again.
+
+GENERATOR_VERSION = 1
+GROUP_NAME = "LS_LoopStencil"
+MOD_NAME = "Loop Subdivision (stencil)"
+
+A_START = "ls_stencil_start"
+A_ROW = "ls_stencil_row"
+A_COLUMN = "ls_stencil_column"
+A_WEIGHT = "ls_stencil_weight"
+
+def build_stencil_group(name):
+    ng = bpy.data.node_groups.new(name, "GeometryNodeTree")
+    ng.interface.new_socket(name="Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
+    ng.interface.new_socket(name="Cage", in_out='INPUT', socket_type='NodeSocketObject')
+    ng.interface.new_socket(name="Stencil", in_out='INPUT', socket_type='NodeSocketObject')
+    ng.interface.new_socket(name="Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+
+    nodes = ng.nodes
+    links = ng.links
+    group_in = nodes.new('NodeGroupInput')
+    group_out = nodes.new('NodeGroupOutput')
+
+    def named_attribute(name, data_type):
+        node = nodes.new('GeometryNodeInputNamedAttribute')
+        node.data_type = data_type
+        node.inputs['Name'].default_value = name
+        return node.outputs['Attribute']
+
+    def sample_index(geometry, value, index):
+        node = nodes.new('GeometryNodeSampleIndex')
+        node.data_type = 'FLOAT_VECTOR'
+        node.domain = 'POINT'
+        links.new(geometry, node.inputs['Geometry'])
+        links.new(value, node.inputs['Value'])
+        links.new(index, node.inputs['Index'])
+        return node.outputs['Value']
+
+    # Cage positions in the cage's own space, after its modifiers (armatures, shape keys, ...)
+    cage = nodes.new('GeometryNodeObjectInfo')
+    cage.transform_space = 'ORIGINAL'
+    links.new(group_in.outputs['Cage'], cage.inputs['Object'])
+
+    stencil = nodes.new('GeometryNodeObjectInfo')
+    stencil.transform_space = 'ORIGINAL'
+    links.new(group_in.outputs['Stencil'], stencil.inputs['Object'])
+
+    # Gather: weight * cage position, per stencil entry
+    position = nodes.new('GeometryNodeInputPosition')
+    gathered = sample_index(cage.outputs['Geometry'], position.outputs['Position'],
+                            named_attribute(A_COLUMN, 'INT'))
+    weighted = nodes.new('ShaderNodeVectorMath')
+    weighted.operation = 'SCALE'
+    links.new(gathered, weighted.inputs['Vector'])
+    links.new(named_attribute(A_WEIGHT, 'FLOAT'), weighted.inputs['Scale'])
+
+    # Accumulate: sum of every row's entries
+    accumulate = nodes.new('GeometryNodeAccumulateField')
+    accumulate.data_type = 'FLOAT_VECTOR'
+    accumulate.domain = 'POINT'
+    links.new(weighted.outputs['Vector'], accumulate.inputs['Value'])
+    links.new(named_attribute(A_ROW, 'INT'), accumulate.inputs['Group ID'])
+
+    # Scatter: every refined vertex reads the total of its row
+    refined = sample_index(stencil.outputs['Geometry'], accumulate.outputs['Total'],
+                           named_attribute(A_START, 'INT'))
+    set_position = nodes.new('GeometryNodeSetPosition')
+    links.new(group_in.outputs['Geometry'], set_position.inputs['Geometry'])
+    links.new(refined, set_position.inputs['Position'])
+
+    links.new(set_position.outputs['Geometry'], group_out.inputs['Geometry'])
+    return ng
+
+def stencil_group():
+    key = NodeGroupReuse.generator_key(GROUP_NAME, GENERATOR_VERSION)
+    return NodeGroupReuse.ensure_node_group(GROUP_NAME, key, build_stencil_group)
+
+def _stencil_object(target_obj):
+    # Helper object holding the stencil entries, kept next to the target and hidden
+    name = f"{target_obj.name}_LoopStencil"
+    obj = bpy.data.objects.get(name)
+    if obj is None:
+        obj = bpy.data.objects.new(name, bpy.data.meshes.new(name))
+        for collection in target_obj.users_collection:
+            collection.objects.link(obj)
+        obj.hide_viewport = True
+        obj.hide_render = True
+    return obj
+
+def _set_modifier_input(mod, name, value):
+    for item in mod.node_group.interface.items_tree:
+        if item.item_type == 'SOCKET' and item.in_out == 'INPUT' and item.name == name:
+            mod[item.identifier] = value
+            return
+    raise ValueError(f"Node group {mod.node_group.name} has no input '{name}'")
+
+def add_stencil_modifier(cage_obj, target_obj, iterations=3):
+    """
+    Makes target_obj the level-`iterations` Loop subdivision of cage_obj, evaluated
+    by a stencil modifier that follows the cage's deformation. The target's mesh is
+    replaced by the refined topology, in the cage's local coordinates.
+    Returns the modifier.
+    """
+    if cage_obj.mode == 'EDIT':
+        cage_obj.update_from_editmode()
+    positions = MeshArrays.read_positions(cage_obj.data)
+    triangles = MeshArrays.read_triangles(cage_obj.data)
+    stencil, refined = LoopSubdivisionEngine.cached_stencil(triangles, len(positions), iterations)
+
+    # Every row has at least one entry, loose cage vertices keep their position
+    me = target_obj.data
+    MeshArrays.write_triangle_mesh(me, stencil.apply(positions), refined)
+    MeshArrays.write_attribute(me, A_START, 'INT', 'POINT', stencil.indptr[:-1])
+
+    stencil_obj = _stencil_object(target_obj)
+    entries = stencil_obj.data
+    MeshArrays.write_polygon_mesh(entries, np.zeros((len(stencil.indices), 3)),
+                                  np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32))
+    MeshArrays.write_attribute(entries, A_ROW, 'INT', 'POINT', stencil.row_of_entry())
+    MeshArrays.write_attribute(entries, A_COLUMN, 'INT', 'POINT', stencil.indices)
+    MeshArrays.write_attribute(entries, A_WEIGHT, 'FLOAT', 'POINT', stencil.weights)
+    entries.update()
+
+    mod = target_obj.modifiers.get(MOD_NAME)
+    if mod is None:
+        mod = target_obj.modifiers.new(MOD_NAME, 'NODES')
+    mod.node_group = stencil_group()
+    _set_modifier_input(mod, "Cage", cage_obj)
+    _set_modifier_input(mod, "Stencil", stencil_obj)
+    target_obj.update_tag()
+    return mod
+
+# --- Execution ---
+if __name__ == "__main__":
+    ITERATIONS=3
+
+    cage_obj = bpy.context.active_object
+    if cage_obj and cage_obj.type == 'MESH':
+        target_obj = bpy.data.objects.new(f"{cage_obj.name}_Loop", bpy.data.meshes.new(f"{cage_obj.name}_Loop"))
+        bpy.context.collection.objects.link(target_obj)
+        target_obj.matrix_world = cage_obj.matrix_world
+        print(f"Adding stencil Loop Subdivision of {cage_obj.name} to {target_obj.name}...")
+        add_stencil_modifier(cage_obj, target_obj, ITERATIONS)
+        print("Done.")
+    else:
+        print("Please select a mesh object.")
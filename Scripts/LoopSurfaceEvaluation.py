@@ -0,0 +1,547 @@
+import numpy as np
+
+import LoopSubdivisionEngine
+from HalfEdgeMesh import HalfEdgeMesh
+
+# Exact evaluation of the Loop limit surface at arbitrary (triangle, u, v) parameters
+# without building a subdivided mesh.
+#
+# A point of triangle (P0, P1, P2) with parameters (u, v) is the limit surface
+# point over (1 - u - v) * P0 + u * P1 + v * P2.
+#
+# After one subdivision step every interior triangle has at most one
+# extraordinary vertex (valence != 6), so the cage is subdivided once and then:
+#  - regular triangles are quartic box spline patches of their 12 surrounding points
+#  - triangles with one extraordinary vertex are evaluated as in Stam's
+#    "Evaluation of Loop Subdivision Surfaces" (1998): the parameter lies in a
+#    regular sub-patch of some level n, whose 12 control points are the K = N + 6
+#    control points multiplied by the local subdivision matrix n times.
+#    Stam diagonalizes that matrix; here its powers are tabulated instead,
+#    because for valence 3 it is not diagonalizable
+#  - triangles touching a boundary or non-manifold vertex are refined a few more
+#    levels (only locally) and evaluated on the leaves: exactly where a leaf is
+#    regular or has one interior extraordinary vertex, otherwise by interpolating
+#    the limit positions and normals of the leaf corners
+#
+# The box spline basis and the subdivision matrices are not tabulated by hand;
+# they are derived once per valence from LoopSubdivisionEngine's own stencils on
+# a small mesh made of N lattice wedges around one vertex, so they always match
+# the rules used by the subdivision scripts.
+
+REGULAR = 0
+EXTRAORDINARY = 1
+OTHER = 2
+
+MAX_LEVEL = 48
+CHUNK_SIZE = 1 << 16
+# Samples whose patch coefficients are transposed at once, small enough to stay in cache
+GATHER_SIZE = 1 << 12
+
+# Lattice offsets of the 12 control points of a regular patch over the triangle
+# (0, 0), (1, 0), (0, 1). The axes are 60 degrees apart, counter-clockwise.
+REGULAR_LAYOUT = (
+    (0, 0), (1, 0), (0, 1), (-1, 1), (-1, 0), (0, -1), (1, -1),
+    (2, 0), (1, 1), (0, 2), (-1, 2), (2, -1),
+)
+
+# --- Wedge mesh used to derive the basis and the subdivision matrices ---
+
+class _WedgeMesh:
+    """
+    N lattice wedges of the given radius glued around a center vertex.
+    A point is addressed as (wedge, x, y) in the 60 degree frame of its wedge.
+    Every vertex except the center and the outer rim has valence 6.
+    """
+
+    def __init__(self, valence, radius):
+        self.valence = valence
+        self.ids = {(0, 0, 0): 0}
+        for s in range(valence):
+            for i in range(1, radius + 1):
+                for j in range(0, radius - i + 1):
+                    self.ids[(s, i, j)] = len(self.ids)
+
+        tris = []
+        for s in range(valence):
+            for i in range(radius):
+                for j in range(radius - i):
+                    tris.append((self.id(s, i, j), self.id(s, i + 1, j), self.id(s, i, j + 1)))
+                    if i + j < radius - 1:
+                        tris.append((self.id(s, i + 1, j), self.id(s, i + 1, j + 1), self.id(s, i, j + 1)))
+        self.triangles = np.array(tris, dtype=np.int32)
+        self.levels = [(len(self.ids), self.triangles)]
+
+    def canonical(self, s, x, y):
+        N = self.valence
+        while True:
+            if x == 0 and y == 0:
+                return (0, 0, 0)
+            if y < 0:
+                # Into the previous wedge, whose y axis is this wedge's x axis
+                s, x, y = (s - 1) % N, -y, x + y
+            elif x < 0:
+                s, x, y = (s + 1) % N, x + y, -x
+            elif x == 0:
+                s, x, y = (s + 1) % N, y, 0
+            else:
+                return (s, x, y)
+
+    def id(self, s, x, y):
+        return self.ids[self.canonical(s, x, y)]
+
+    def refine(self, levels):
+        # Same vertex numbering as LoopSubdivisionEngine.compile_stencil()
+        while len(self.levels) <= levels:
+            V, T = self.levels[-1][:2]
+            if len(self.levels) == 1:
+                self._mesh = HalfEdgeMesh.from_triangles(T, vertex_count=V)
+            else:
+                self._mesh = self._mesh.refine()
+            edges = self._mesh.edges
+            keys = edges[:, 0].astype(np.int64) * V + edges[:, 1]
+            order = np.argsort(keys)
+            self.levels[-1] = (V, T, keys[order], order)
+            self.levels.append((V + len(edges), LoopSubdivisionEngine.refined_triangles(self._mesh)))
+
+    def vertex_id(self, level, s, x, y):
+        """
+        Vertex index of lattice point (x, y) of the level-`level` mesh, where the
+        lattice is 2**level times finer than the level-0 one.
+        """
+        if level == 0:
+            return self.id(s, x, y)
+        if x % 2 == 0 and y % 2 == 0:
+            return self.vertex_id(level - 1, s, x // 2, y // 2)
+        if y % 2 == 0:
+            p, q = ((x - 1) // 2, y // 2), ((x + 1) // 2, y // 2)
+        elif x % 2 == 0:
+            p, q = (x // 2, (y - 1) // 2), (x // 2, (y + 1) // 2)
+        else:
+            p, q = ((x - 1) // 2, (y + 1) // 2), ((x + 1) // 2, (y - 1) // 2)
+        a = self.vertex_id(level - 1, s, *p)
+        b = self.vertex_id(level - 1, s, *q)
+        V, _, keys, order = self.levels[level - 1]
+        edge = order[np.searchsorted(keys, min(a, b) * V + max(a, b))]
+        return V + int(edge)
+
+def _control_layout(valence):
+    """
+    The K = valence + 6 control points around a triangle whose first corner has
+    the given valence, as (wedge, x, y). Same order as REGULAR_LAYOUT for valence 6.
+    """
+    return ([(0, 0, 0)] + [(s, 1, 0) for s in range(valence)] +
+            [(0, 2, 0), (0, 1, 1), (1, 2, 0), (1, 1, 1), (valence - 1, 1, 1)])
+
+# Column of the monomial v**a * w**b in _monomials(), by (a, b)
+_EXPONENT_INDEX = {(a, b): k for k, (a, b) in enumerate((a, b) for a in range(5) for b in range(5 - a))}
+
+def _monomials(v, w):
+    """
+    Returns the 15 quartic monomials v**a * w**b (a + b <= 4) and their v and w
+    derivatives, as a (S, 3, 15) array.
+    """
+    v = np.asarray(v, dtype=np.float64)
+    w = np.asarray(w, dtype=np.float64)
+    vp = [np.ones_like(v), v, v * v, v * v * v, v * v * v * v]
+    wp = [np.ones_like(w), w, w * w, w * w * w, w * w * w * w]
+    out = np.zeros((len(v), 3, 15))
+    column = 0
+    for a in range(5):
+        for b in range(5 - a):
+            out[:, 0, column] = vp[a] * wp[b]
+            if a > 0:
+                out[:, 1, column] = a * vp[a - 1] * wp[b]
+            if b > 0:
+                out[:, 2, column] = b * vp[a] * wp[b - 1]
+            column += 1
+    return out
+
+_box_spline_coefficients = None
+
+def _box_spline():
+    """
+    Monomial coefficients (15, 12) of the 12 box spline basis functions of a regular patch.
+    The limit surface over a regular triangle is a quartic polynomial, so it is
+    fitted exactly from the limit positions of the 15 level-2 vertices inside it.
+    """
+    global _box_spline_coefficients
+    if _box_spline_coefficients is None:
+        mesh = _WedgeMesh(6, 6)
+        V = mesh.levels[0][0]
+        mesh.refine(2)
+        stencil, T2 = LoopSubdivisionEngine.compile_stencil(mesh.triangles, V, 2)
+        limit = LoopSubdivisionEngine.limit_positions(stencil.apply(np.eye(V)), T2)
+
+        samples = [(x, y) for x in range(5) for y in range(5 - x)]
+        rows = [mesh.vertex_id(2, 0, x, y) for x, y in samples]
+        cols = [mesh.id(0, x, y) for x, y in REGULAR_LAYOUT]
+        values = limit[rows]
+        assert np.abs(np.delete(values, cols, axis=1)).max() < 1e-12
+
+        v = np.array([x / 4.0 for x, _ in samples])
+        w = np.array([y / 4.0 for _, y in samples])
+        _box_spline_coefficients = np.linalg.solve(_monomials(v, w)[:, 0], values[:, cols])
+    return _box_spline_coefficients
+
+def box_spline_basis(v, w):
+    """
+    Returns the 12 regular patch basis functions and their v and w derivatives
+    as a (S, 3, 12) array, for control points ordered like REGULAR_LAYOUT.
+    """
+    return _monomials(v, w) @ _box_spline()
+
+class _ExtraordinaryPatch:
+    """
+    Maps the K control points around a vertex of valence N to the control points
+    of the regular sub-patches at every level.
+    """
+
+    def __init__(self, valence):
+        N = valence
+        K = N + 6
+        mesh = _WedgeMesh(N, 5)
+        V = mesh.levels[0][0]
+        mesh.refine(1)
+        stencil, _ = LoopSubdivisionEngine.level_stencil(mesh.triangles, V)
+        S = stencil.apply(np.eye(V))
+
+        layout = _control_layout(N)
+        cols = [mesh.id(*p) for p in layout]
+        # Level-1 points: the K points of the smaller control net around the same
+        # vertex, then the 6 more needed by the three regular sub-patches
+        level1 = layout + [(0, 3, 0), (0, 2, 1), (0, 3, -1), (0, 1, 2), (0, 0, 3), (0, -1, 3)]
+        canonical = [mesh.canonical(*p) for p in level1]
+        rows = [mesh.vertex_id(1, *p) for p in level1]
+        assert np.abs(np.delete(S[rows], cols, axis=1)).max() < 1e-12
+        A_bar = S[rows][:, cols]
+        A = A_bar[:K]
+
+        # A**n = 1 l + R**n, with l the limit position mask. Derivatives only use
+        # R**n so they keep their precision while R**n decays towards the vertex
+        values, vectors = np.linalg.eig(A.T)
+        limit_mask = vectors[:, np.argmin(np.abs(values - 1.0))].real
+        limit_mask /= limit_mask.sum()
+        R = A - limit_mask[None, :]
+        residuals = [np.eye(K) - limit_mask[None, :]]
+        for _ in range(MAX_LEVEL - 1):
+            residuals.append(R @ residuals[-1])
+        residuals = np.array(residuals)
+
+        # The three regular sub-patches of the level-1 triangle that do not touch
+        # the extraordinary vertex, by corners in the level-1 lattice
+        # subpatches[k, n - 1] gives the 12 control points of sub-patch k at level n,
+        # derivative_subpatches[k, n - 1] the same without the constant part
+        self.subpatches = np.empty((3, MAX_LEVEL, 12, K))
+        self.derivative_subpatches = np.empty((3, MAX_LEVEL, 12, K))
+        for k, (c0, c1, c2) in enumerate((((1, 0), (2, 0), (1, 1)), ((0, 1), (1, 1), (0, 2)), ((1, 1), (0, 1), (1, 0)))):
+            ex = (c1[0] - c0[0], c1[1] - c0[1])
+            ey = (c2[0] - c0[0], c2[1] - c0[1])
+            pick = []
+            for x, y in REGULAR_LAYOUT:
+                p = mesh.canonical(0, c0[0] + x * ex[0] + y * ey[0], c0[1] + x * ex[1] + y * ey[1])
+                pick.append(canonical.index(p))
+            self.derivative_subpatches[k] = np.einsum("ij,njk->nik", A_bar[pick], residuals)
+            self.subpatches[k] = self.derivative_subpatches[k] + limit_mask[None, None, :]
+
+_extraordinary_patches = {}
+
+def extraordinary_patch(valence):
+    patch = _extraordinary_patches.get(valence)
+    if patch is None:
+        patch = _ExtraordinaryPatch(valence)
+        _extraordinary_patches[valence] = patch
+    return patch
+
+# --- Parameter bookkeeping ---
+
+def _child_parameters(u, v):
+    """
+    Maps parameters of a triangle to (child, u, v, jacobian) in the 4 triangles
+    produced by LoopSubdivisionEngine.refine_triangles(). The jacobian is d(child u, v) / d(u, v).
+    """
+    w = 1.0 - u - v
+    child = np.full(len(u), 3, dtype=np.int64)
+    child[v >= 0.5] = 2
+    child[u >= 0.5] = 1
+    child[w >= 0.5] = 0
+
+    cu = np.select([child == 0, child == 1, child == 2], [2.0 * u, 2.0 * u - 1.0, 2.0 * v - 1.0], 2.0 * (u + v) - 1.0)
+    cv = np.select([child == 0, child == 1, child == 2], [2.0 * v, 2.0 * v, 2.0 * w], 1.0 - 2.0 * u)
+    jacobians = np.array([
+        [[2.0, 0.0], [0.0, 2.0]],
+        [[2.0, 0.0], [0.0, 2.0]],
+        [[0.0, 2.0], [-2.0, -2.0]],
+        [[2.0, 2.0], [-2.0, 0.0]],
+    ])
+    return child, cu, cv, jacobians[child]
+
+def _descend(faces, u, v, jacobian, levels):
+    for _ in range(levels):
+        child, u, v, J = _child_parameters(u, v)
+        faces = faces * 4 + child
+        jacobian = J @ jacobian
+    return faces, u, v, jacobian
+
+# Re-expressing (u, v) with corner r of the triangle as the first corner
+_ROTATION_JACOBIANS = np.array([
+    [[1.0, 0.0], [0.0, 1.0]],
+    [[0.0, 1.0], [-1.0, -1.0]],
+    [[-1.0, -1.0], [1.0, 0.0]],
+])
+
+def _rotate_parameters(u, v, r):
+    w = np.stack((1.0 - u - v, u, v), axis=1)
+    n = np.arange(len(u))
+    return w[n, (r + 1) % 3], w[n, (r + 2) % 3]
+
+# --- Patch tables ---
+
+class _PatchTable:
+    """
+    Classifies every triangle of a mesh level and gathers its control points.
+    """
+
+    def __init__(self, positions, triangles):
+        P = positions
+        T = np.asarray(triangles, dtype=np.int64)
+        V = len(P)
+        self.positions = P
+        self.triangles = T
+
+        mesh = HalfEdgeMesh.from_triangles(T, vertex_count=V)
+        valence = mesh.valence()
+        boundary_valence = mesh.boundary_valence()
+        ring, ring_length, closed = mesh.vertex_rings()
+
+        good = closed & (boundary_valence == 0) & (ring_length == valence) & (valence >= 3)
+        regular_vertex = good & (valence == 6)
+        extraordinary_vertex = good & (valence != 6)
+
+        kind = np.full(len(T), OTHER, dtype=np.int8)
+        kind[regular_vertex[T].all(axis=1)] = REGULAR
+        ev_corner = extraordinary_vertex[T]
+        single = (ev_corner.sum(axis=1) == 1) & (regular_vertex[T].sum(axis=1) == 2)
+        kind[single] = EXTRAORDINARY
+        self.kind = kind
+        # Corner holding the extraordinary vertex, 0 for everything else
+        self.rotation = np.where(single, np.argmax(ev_corner, axis=1), 0)
+
+        def rotated_ring(x, y, n):
+            start = np.argmax(ring[x] == y[:, None], axis=1)
+            return ring[x[:, None], (start[:, None] + np.arange(n)) % n]
+
+        def gather(tris, n):
+            t0, t1, t2 = tris[:, 0], tris[:, 1], tris[:, 2]
+            r0 = rotated_ring(t0, t1, n)
+            r1 = rotated_ring(t1, t2, 6)
+            r2 = rotated_ring(t2, t0, 6)
+            return np.concatenate((t0[:, None], r0, r1[:, [4, 5]], r2[:, [3, 4]], r1[:, [3]]), axis=1)
+
+        regular = np.nonzero(kind == REGULAR)[0]
+        self.regular_slot = np.full(len(T), -1, dtype=np.int64)
+        self.regular_slot[regular] = np.arange(len(regular))
+        # Monomial coefficients (15, 3, R) of the regular patches, so their samples
+        # need no basis functions
+        self.regular_coefficients = np.einsum('mk,rkc->rmc', _box_spline(), P[gather(T[regular], 6)]).reshape(-1, 45)
+
+        # Control points of extraordinary triangles rotated so the extraordinary
+        # vertex comes first, by valence
+        extraordinary = np.nonzero(kind == EXTRAORDINARY)[0]
+        r = self.rotation[extraordinary]
+        n = np.arange(len(extraordinary))[:, None]
+        rotated = T[extraordinary][n, (r[:, None] + np.arange(3)) % 3]
+        ev_valence = valence[rotated[:, 0]]
+        self.ev_valence = np.zeros(len(T), dtype=np.int64)
+        self.ev_valence[extraordinary] = ev_valence
+        self.ev_slot = np.full(len(T), -1, dtype=np.int64)
+        self.ev_points = {}
+        for N in np.unique(ev_valence):
+            group = np.nonzero(ev_valence == N)[0]
+            self.ev_slot[extraordinary[group]] = np.arange(len(group))
+            self.ev_points[int(N)] = P[gather(rotated[group], int(N))]
+
+        self.limit_positions = None
+        self.limit_normals = None
+
+    def prepare_linear(self):
+        if self.limit_positions is None:
+            self.limit_positions, self.limit_normals = LoopSubdivisionEngine.limit_surface(self.positions, self.triangles)
+
+    def evaluate_regular(self, faces, u, v):
+        # Horner's scheme over contiguous (3, S) rows: Q_a(v) = sum_b c_ab v**b, then
+        # sum_a u**a Q_a(v), several times faster than a (S, 3, 12) basis per sample
+        slots = self.regular_slot[faces]
+        coefficients = np.empty((45, len(faces)))
+        for start in range(0, len(faces), GATHER_SIZE):
+            block = slice(start, start + GATHER_SIZE)
+            coefficients[:, block] = self.regular_coefficients[slots[block]].T
+        coefficients = coefficients.reshape(15, 3, -1)
+        position = np.zeros((3, len(faces)))
+        du = np.zeros((3, len(faces)))
+        dv = np.zeros((3, len(faces)))
+        for a in range(4, -1, -1):
+            Q = coefficients[_EXPONENT_INDEX[a, 4 - a]].copy()
+            dQ = np.zeros_like(Q)
+            for b in range(3 - a, -1, -1):
+                dQ *= v
+                dQ += Q
+                Q *= v
+                Q += coefficients[_EXPONENT_INDEX[a, b]]
+            du *= u
+            du += position
+            position *= u
+            position += Q
+            dv *= u
+            dv += dQ
+        return position.T, du.T, dv.T
+
+    def evaluate_extraordinary(self, faces, u, v, jacobian):
+        r = self.rotation[faces]
+        u, v = _rotate_parameters(u, v, r)
+        jacobian = _ROTATION_JACOBIANS[r] @ jacobian
+
+        S = len(faces)
+        position = np.empty((S, 3))
+        du = np.empty((S, 3))
+        dv = np.empty((S, 3))
+        valences = self.ev_valence[faces]
+        for N in np.unique(valences):
+            group = np.nonzero(valences == N)[0]
+            patch = extraordinary_patch(int(N))
+            points = self.ev_points[int(N)][self.ev_slot[faces[group]]]
+
+            gu = np.maximum(u[group], 0.0)
+            gv = np.maximum(v[group], 0.0)
+            # The extraordinary vertex itself is in no sub-patch, step off it
+            # by less than any level can resolve
+            at_vertex = gu + gv < 2.0 ** (1 - MAX_LEVEL)
+            gu[at_vertex] = gv[at_vertex] = 2.0 ** -MAX_LEVEL
+            level = np.clip(np.floor(1.0 - np.log2(gu + gv)), 1, MAX_LEVEL).astype(np.int64)
+            scale = 2.0 ** level
+            x = gu * scale
+            y = gv * scale
+
+            sub = np.where(x >= 1.0, 0, np.where(y >= 1.0, 1, 2))
+            a = np.select([sub == 0, sub == 1], [x - 1.0, x], 1.0 - x)
+            b = np.select([sub == 0, sub == 1], [y, y - 1.0], 1.0 - y)
+            sign = np.where(sub == 2, -1.0, 1.0) * scale
+
+            basis = box_spline_basis(a, b)
+            key = sub * MAX_LEVEL + level - 1
+            for k in np.unique(key):
+                m = np.nonzero(key == k)[0]
+                X = patch.subpatches[k // MAX_LEVEL, k % MAX_LEVEL]
+                dX = patch.derivative_subpatches[k // MAX_LEVEL, k % MAX_LEVEL]
+                c = points[m]
+                position[group[m]] = np.einsum("sk,skc->sc", basis[m, 0] @ X, c)
+                derivatives = (basis[m, 1:] @ dX) @ c * sign[m][:, None, None]
+                du[group[m]] = derivatives[:, 0]
+                dv[group[m]] = derivatives[:, 1]
+        return position, du, dv, jacobian
+
+    def evaluate_linear(self, faces, u, v):
+        self.prepare_linear()
+        tris = self.triangles[faces]
+        L = self.limit_positions[tris]
+        Nm = self.limit_normals[tris]
+        w = np.stack((1.0 - u - v, u, v), axis=1)
+        position = np.einsum("sk,skc->sc", w, L)
+        normal = np.einsum("sk,skc->sc", w, Nm)
+        return position, L[:, 1] - L[:, 0], L[:, 2] - L[:, 0], normal
+
+class LoopSurfaceEvaluator:
+    """
+    Evaluates the Loop limit surface of a triangle cage at (triangle, u, v) samples.
+    boundary_levels is how many extra levels triangles near boundaries and
+    non-manifold vertices are refined before they are evaluated.
+    """
+
+    def __init__(self, positions, triangles, boundary_levels=3):
+        P = np.asarray(positions, dtype=np.float64)
+        T = np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+        self.triangle_count = len(T)
+        self.boundary_levels = boundary_levels
+
+        P1, T1 = LoopSubdivisionEngine.subdivide_once(P, T)
+        self.level1 = _PatchTable(P1, T1)
+
+        # Triangles that can't be evaluated exactly are refined further together
+        # with their one-ring of triangles, which is all their limit surface depends on
+        other = np.nonzero(self.level1.kind == OTHER)[0]
+        self.deep = None
+        self.deep_face = np.full(len(T1), -1, dtype=np.int64)
+        if len(other):
+            touched = np.zeros(len(P1), dtype=bool)
+            touched[T1[other].ravel()] = True
+            halo = np.nonzero(touched[T1].any(axis=1))[0]
+            used, local = np.unique(T1[halo], return_inverse=True)
+            self.deep_face[halo] = np.arange(len(halo))
+            Pd, Td = LoopSubdivisionEngine.subdivide(P1[used], local.reshape(-1, 3), boundary_levels)
+            self.deep = _PatchTable(Pd, Td)
+
+    def evaluate(self, faces, u, v):
+        """
+        Returns (positions, du, dv, normals), each (S, 3), for S samples.
+        du and dv are the derivatives along the given triangle's u and v.
+        """
+        faces = np.asarray(faces, dtype=np.int64).ravel()
+        u = np.asarray(u, dtype=np.float64).ravel()
+        v = np.asarray(v, dtype=np.float64).ravel()
+        S = len(faces)
+        out = tuple(np.empty((S, 3)) for _ in range(4))
+        for start in range(0, S, CHUNK_SIZE):
+            chunk = slice(start, min(start + CHUNK_SIZE, S))
+            for target, result in zip(out, self._evaluate_chunk(faces[chunk], u[chunk], v[chunk])):
+                target[chunk] = result
+        return out
+
+    def _evaluate_chunk(self, faces, u, v):
+        S = len(faces)
+        jacobian = np.broadcast_to(np.eye(2), (S, 2, 2))
+        faces, u, v, jacobian = _descend(faces, u, v, jacobian, 1)
+
+        position = np.empty((S, 3))
+        du = np.empty((S, 3))
+        dv = np.empty((S, 3))
+        normal = np.full((S, 3), np.nan)
+
+        def store(index, table, f, a, b, J):
+            kind = table.kind[f]
+            for k in (REGULAR, EXTRAORDINARY, OTHER):
+                m = np.nonzero(kind == k)[0]
+                if len(m) == 0:
+                    continue
+                if k == REGULAR:
+                    p, pa, pb = table.evaluate_regular(f[m], a[m], b[m])
+                    Jm = J[m]
+                elif k == EXTRAORDINARY:
+                    p, pa, pb, Jm = table.evaluate_extraordinary(f[m], a[m], b[m], J[m])
+                else:
+                    p, pa, pb, n = table.evaluate_linear(f[m], a[m], b[m])
+                    Jm = J[m]
+                    normal[index[m]] = n
+                # Chain rule back to the parameters of the cage triangle
+                position[index[m]] = p
+                du[index[m]] = pa * Jm[:, 0, 0, None] + pb * Jm[:, 1, 0, None]
+                dv[index[m]] = pa * Jm[:, 0, 1, None] + pb * Jm[:, 1, 1, None]
+
+        kind = self.level1.kind[faces]
+        exact = np.nonzero(kind != OTHER)[0]
+        store(exact, self.level1, faces[exact], u[exact], v[exact], jacobian[exact])
+
+        deep = np.nonzero(kind == OTHER)[0]
+        if len(deep):
+            f, a, b, J = _descend(self.deep_face[faces[deep]], u[deep], v[deep], jacobian[deep], self.boundary_levels)
+            store(deep, self.deep, f, a, b, J)
+
+        computed = np.isnan(normal[:, 0])
+        normal[computed] = np.cross(du[computed], dv[computed])
+        length = np.linalg.norm(normal, axis=1)
+        normal /= np.where(length > 0.0, length, 1.0)[:, None]
+        return position, du, dv, normal
+
+def evaluate(positions, triangles, faces, u, v, boundary_levels=3):
+    """
+    One-shot helper: builds a LoopSurfaceEvaluator and evaluates the samples.
+    """
+    return LoopSurfaceEvaluator(positions, triangles, boundary_levels).evaluate(faces, u, v)
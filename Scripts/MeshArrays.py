@@ -0,0 +1,156 @@
+import numpy as np
+
+# Bulk transfer between Blender meshes and NumPy arrays.
+# Only foreach_get/foreach_set are used, so this module never imports bpy and
+# the arrays it produces can be handed to worker processes or offline tools.
+
+def read_positions(me):
+    """
+    Returns the vertex positions of a mesh as a (V, 3) float64 array.
+    """
+    co = np.empty(len(me.vertices) * 3, dtype=np.float32)
+    me.vertices.foreach_get("co", co)
+    return co.reshape(-1, 3).astype(np.float64)
+
+def read_triangles(me):
+    """
+    Returns the mesh triangulated by Blender's loop triangles as a (F, 3) int32 array.
+    Triangles keep the winding of the polygon they came from.
+    """
+    me.calc_loop_triangles()
+    tris = np.empty(len(me.loop_triangles) * 3, dtype=np.int32)
+    me.loop_triangles.foreach_get("vertices", tris)
+    return tris.reshape(-1, 3)
+
+def read_polygons(me):
+    """
+    Returns (loop_vertices, loop_starts, loop_totals) as int32 arrays.
+    """
+    loop_vertices = np.empty(len(me.loops), dtype=np.int32)
+    me.loops.foreach_get("vertex_index", loop_vertices)
+    loop_starts = np.empty(len(me.polygons), dtype=np.int32)
+    me.polygons.foreach_get("loop_start", loop_starts)
+    loop_totals = np.empty(len(me.polygons), dtype=np.int32)
+    me.polygons.foreach_get("loop_total", loop_totals)
+    return loop_vertices, loop_starts, loop_totals
+
+def read_polygon_values(me, name, dtype):
+    """
+    Returns one value per polygon of a polygon property such as "material_index" or "use_smooth".
+    """
+    values = np.empty(len(me.polygons), dtype=dtype)
+    me.polygons.foreach_get(name, values)
+    return values
+
+def read_vertex_weights(me, group_index):
+    """
+    Returns the weights of one vertex group as a (V,) float32 array, 0 where unassigned.
+    Vertex group memberships are not exposed to foreach_get, so this loops in Python.
+    """
+    weights = np.zeros(len(me.vertices), dtype=np.float32)
+    for v in me.vertices:
+        for g in v.groups:
+            if g.group == group_index:
+                weights[v.index] = g.weight
+    return weights
+
+def read_attribute(me, name):
+    """
+    Returns the values of a generic attribute of a type in _ATTRIBUTE_TYPES, (N,) for
+    single values, (N, 3) for vectors and (N, 4) for colors.
+    """
+    attribute = me.attributes[name]
+    dtype, field, components = _ATTRIBUTE_TYPES[attribute.data_type]
+    values = np.empty(len(attribute.data) * components, dtype=dtype)
+    attribute.data.foreach_get(field, values)
+    return values.reshape(-1, components) if components > 1 else values
+
+def read_corner_normals(me):
+    """
+    Returns the shading normal of every face corner as an (L, 3) float32 array.
+    """
+    normals = np.empty(len(me.loops) * 3, dtype=np.float32)
+    me.corner_normals.foreach_get("vector", normals)
+    return normals.reshape(-1, 3)
+
+def write_positions(me, positions):
+    """
+    Overwrites the vertex positions of a mesh whose topology is unchanged.
+    """
+    me.vertices.foreach_set("co", np.ascontiguousarray(positions, dtype=np.float32).ravel())
+    me.update()
+
+def write_vertex_normals(me, normals):
+    """
+    Shades all faces smooth and stores one custom normal per vertex.
+    """
+    smooth = np.ones(len(me.polygons), dtype=bool)
+    me.polygons.foreach_set("use_smooth", smooth)
+    me.normals_split_custom_set_from_vertices(np.ascontiguousarray(normals, dtype=np.float32))
+    me.update()
+
+def write_corner_normals(me, normals):
+    """
+    Shades all faces smooth and stores one custom normal per face corner.
+    """
+    smooth = np.ones(len(me.polygons), dtype=bool)
+    me.polygons.foreach_set("use_smooth", smooth)
+    me.normals_split_custom_set(np.ascontiguousarray(normals, dtype=np.float32))
+    me.update()
+
+def write_polygon_values(me, name, values):
+    """
+    Sets one value per polygon of a polygon property such as "material_index" or "use_smooth".
+    """
+    me.polygons.foreach_set(name, np.ascontiguousarray(values))
+    me.update()
+
+# Attribute data type -> (NumPy dtype, foreach field, components per element)
+_ATTRIBUTE_TYPES = {
+    'FLOAT': (np.float32, "value", 1),
+    'INT': (np.int32, "value", 1),
+    'BOOLEAN': (bool, "value", 1),
+    'FLOAT_VECTOR': (np.float32, "vector", 3),
+    'FLOAT_COLOR': (np.float32, "color", 4),
+}
+
+def write_attribute(me, name, data_type, domain, values):
+    """
+    Creates or replaces a generic attribute, e.g. write_attribute(me, "weight", 'FLOAT', 'POINT', w).
+    """
+    dtype, field, _ = _ATTRIBUTE_TYPES[data_type]
+    if name in me.attributes:
+        me.attributes.remove(me.attributes[name])
+    attribute = me.attributes.new(name, data_type, domain)
+    attribute.data.foreach_set(field, np.ascontiguousarray(values, dtype=dtype).ravel())
+
+def write_polygon_mesh(me, positions, loop_vertices, loop_starts, edges=None):
+    """
+    Replaces the geometry of a mesh with the given polygons.
+    If edges are given they are written first, in order, and Blender only adds the
+    ones that are missing; otherwise Blender derives all edges from the faces.
+    """
+    me.clear_geometry()
+
+    me.vertices.add(len(positions))
+    me.vertices.foreach_set("co", np.ascontiguousarray(positions, dtype=np.float32).ravel())
+
+    if edges is not None:
+        me.edges.add(len(edges))
+        me.edges.foreach_set("vertices", np.ascontiguousarray(edges, dtype=np.int32).ravel())
+
+    me.loops.add(len(loop_vertices))
+    me.loops.foreach_set("vertex_index", np.ascontiguousarray(loop_vertices, dtype=np.int32))
+
+    # Since Blender 4.0 loop_total is derived from consecutive loop_start offsets
+    me.polygons.add(len(loop_starts))
+    me.polygons.foreach_set("loop_start", np.ascontiguousarray(loop_starts, dtype=np.int32))
+
+    me.update(calc_edges=True)
+
+def write_triangle_mesh(me, positions, triangles, edges=None):
+    """
+    Replaces the geometry of a mesh with the given (F, 3) triangles.
+    """
+    loop_starts = np.arange(0, len(triangles) * 3, 3, dtype=np.int32)
+    write_polygon_mesh(me, positions, np.asarray(triangles).ravel(), loop_starts, edges)
@@ -1,6 +1,8 @@
 import bpy
 import math
 
+import numpy as np
+
 def move_nurbs_control_point(old, new, epsilon):
     # Get the active object
     obj = bpy.context.active_object
@@ -48,6 +50,95 @@ def move_nurbs_control_point(old, new, epsilon):
         print("No matching control points found.")
     else:
         print(f"Success! Moved {points_moved} control point(s).")
+
+def _grid_cells(points, cell_size):
+    # Integer cell of every point in a hashed grid
+    return [tuple(c) for c in np.floor(points / cell_size).astype(np.int64).tolist()]
+
+def move_nurbs_control_points(moves, epsilon, obj=None):
+    """
+    Moves many control points at once. moves is a list of (old, new) XYZ pairs; every
+    point within epsilon of old (per coordinate, W ignored) goes to new. All pairs are
+    matched against the positions before the move, so a new position can be the old
+    position of another pair. Points matched by pairs with different new positions are
+    ambiguous and left in place; the pairs' other points still move. Returns (moved point count, unmatched pairs, ambiguous pairs).
+    """
+    obj = obj or bpy.context.active_object
+    if not obj:
+        print("Error: No active object selected.")
+        return 0, [], []
+    if obj.type != 'SURFACE' and obj.type != 'CURVE':
+        print(f"Error: Selected object is type '{obj.type}', expected 'SURFACE' or 'CURVE'.")
+        return 0, [], []
+
+    # Edit mode keeps its own copy of the points, flush it first
+    was_edit = obj.mode == 'EDIT'
+    if was_edit:
+        bpy.ops.object.mode_set(mode='OBJECT')
+
+    # Read all points once: (x, y, z, w) of every spline, concatenated
+    splines = [spline for spline in obj.data.splines if len(spline.points)]
+    counts = [len(spline.points) for spline in splines]
+    co = np.empty(sum(counts) * 4, dtype=np.float32)
+    start = 0
+    for spline, count in zip(splines, counts):
+        chunk = np.empty(count * 4, dtype=np.float32)
+        spline.points.foreach_get("co", chunk)
+        co[start:start + count * 4] = chunk
+        start += count * 4
+    co = co.reshape(-1, 4)
+
+    # Hashed grid with cells of epsilon: a point within epsilon of old is in one of the 27
+    # cells around old's cell
+    cell_size = epsilon if epsilon > 0 else 1.0
+    grid = {}
+    for index, cell in enumerate(_grid_cells(co[:, :3].astype(np.float64), cell_size)):
+        grid.setdefault(cell, []).append(index)
+
+    olds = np.array([old for old, _ in moves], dtype=np.float64).reshape(-1, 3)
+    news = np.array([new for _, new in moves], dtype=np.float64).reshape(-1, 3)
+    target = np.full(len(co), -1, dtype=np.int64)
+    conflicting = np.zeros(len(co), dtype=bool)
+    unmatched = []
+    ambiguous = set()
+    neighbors = [(i, j, k) for i in (-1, 0, 1) for j in (-1, 0, 1) for k in (-1, 0, 1)]
+    for pair, (old, cell) in enumerate(zip(olds, _grid_cells(olds, cell_size))):
+        candidates = [index for offset in neighbors
+                      for index in grid.get((cell[0] + offset[0], cell[1] + offset[1], cell[2] + offset[2]), ())]
+        candidates = np.array(candidates, dtype=np.int64)
+        if len(candidates):
+            candidates = candidates[np.all(np.abs(co[candidates, :3] - old) <= epsilon, axis=1)]
+        if not len(candidates):
+            unmatched.append(moves[pair])
+            continue
+        for index in candidates.tolist():
+            if target[index] >= 0 and not np.array_equal(news[target[index]], news[pair]):
+                ambiguous.update((int(target[index]), pair))
+                conflicting[index] = True
+            target[index] = pair
+
+    # Ambiguous points stay where they are
+    moved = (target >= 0) & ~conflicting
+    co[moved, :3] = news[target[moved]]
+
+    # Write back the changed splines with one foreach_set each, and refresh once
+    start = 0
+    for spline, count in zip(splines, counts):
+        if moved[start:start + count].any():
+            spline.points.foreach_set("co", co[start:start + count].ravel())
+        start += count
+    obj.data.update_tag()
+    if was_edit:
+        bpy.ops.object.mode_set(mode='EDIT')
+
+    ambiguous = [moves[pair] for pair in sorted(ambiguous)]
+    for old, new in unmatched:
+        print(f"No control point at {tuple(old)}")
+    for old, new in ambiguous:
+        print(f"Ambiguous: {tuple(old)} -> {tuple(new)} matches points of another pair, those were not moved")
+    print(f"Moved {int(moved.sum())} control point(s) for {len(moves) - len(unmatched)} of {len(moves)} pairs.")
+    return int(moved.sum()), unmatched, ambiguous
+
 '''
 Inner ring
 (1,1,1)
@@ -104,7 +195,11 @@ Targets = (
     (1,2,0),
 )
 
-def main():
+def shift_groups():
+    """
+    The shift options as a list of groups of named options, one option of each group
+    making a combination (see ShiftExploration.variants()).
+    """
     ############################
     ### Corner shift options ###
     ############################
@@ -171,6 +266,22 @@ def main():
         [Sides[7], Targets[2]],
     ]
 
+    return [
+        {
+            "cornerShifts_Closer": cornerShifts_Closer,
+            "cornerShifts_Farther": cornerShifts_Farther,
+        },
+        {
+            "sideShifts_1stClosest": sideShifts_1stClosest,
+            "sideShifts_2ndClosest": sideShifts_2ndClosest,
+            "sideShifts_3rdClosest": sideShifts_3rdClosest,
+            "sideShifts_4thClosest": sideShifts_4thClosest,
+        },
+    ]
+
+def main():
+    cornerGroup, sideGroup = shift_groups()
+
     ####################
     ### Combinations ###
     ####################
@@ -209,8 +320,19 @@ def main():
     sideShifts_4thClosest
     '''
 
+    combinations = [
+        cornerShifts + sideShifts
+        for cornerShifts in cornerGroup.values()
+        for sideShifts in sideGroup.values()
+    ]
+
     # # Run the function
     # move_nurbs_control_point(old=(2, 1, 1), new=(3, 3, 3), epsilon=0)
 
+    # # Apply one combination (1 to 8 above) in a single pass; ExploreControlVertexShifts.py ranks them
+    # move_nurbs_control_points(combinations[0], epsilon=1e-6)
+
+    return combinations
+
 if __name__ == "__main__":
     main()
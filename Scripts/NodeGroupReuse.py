@@ -0,0 +1,125 @@
+import bpy
+import hashlib
+
+# Reuse of generated node groups (LoopSubdivisionGeoNodes/*.py).
+#
+# A generated group is tagged with two custom properties:
+#   generator_key          what it was generated from: group name, generator version and
+#                          parameters, including the fingerprints of the groups it uses
+#   generator_fingerprint  hash of its definition (interface, nodes, node settings,
+#                          unlinked socket defaults, links) right after generation
+# ensure_node_group() returns an existing group with the same key instead of building a
+# new one, as long as its current definition still hashes to the stored fingerprint,
+# i.e. nobody edited it by hand. Linked groups count too, so the groups can be kept in
+# one library .blend (save_library()) that other files link (link_library()).
+
+GENERATOR_KEY = "generator_key"
+FINGERPRINT = "generator_fingerprint"
+
+def generator_key(name, version, *parameters):
+    """
+    Key of a generated group. Pass the groups it depends on as parameters, their
+    fingerprints are used.
+    """
+    parts = [name, str(version)]
+    for p in parameters:
+        parts.append(p.get(FINGERPRINT, p.name) if isinstance(p, bpy.types.NodeTree) else repr(p))
+    return ":".join(parts)
+
+def _value(value):
+    if isinstance(value, bpy.types.NodeTree):
+        return f"NodeTree({value.get(FINGERPRINT, value.name)})"
+    if isinstance(value, (bpy.types.ID, bpy.types.Node)):
+        return f"{type(value).__name__}({value.name})"
+    if isinstance(value, (str, bool, int, float)) or value is None:
+        return repr(value)
+    try:
+        return repr(tuple(value))
+    except TypeError:
+        return repr(value)
+
+# Properties every node has (name, location, select, ...); they do not change what a node does
+_BASE_NODE_PROPERTIES = None
+
+def _node_settings(node):
+    global _BASE_NODE_PROPERTIES
+    if _BASE_NODE_PROPERTIES is None:
+        _BASE_NODE_PROPERTIES = {p.identifier for p in bpy.types.Node.bl_rna.properties}
+    settings = []
+    for prop in node.bl_rna.properties:
+        if prop.identifier in _BASE_NODE_PROPERTIES:
+            continue
+        value = getattr(node, prop.identifier, None)
+        if prop.type == 'COLLECTION':
+            # Zone and switch items
+            value = [(getattr(item, "name", ""), getattr(item, "socket_type", "")) for item in value]
+        settings.append((prop.identifier, _value(value)))
+    return settings
+
+def fingerprint(ng):
+    """
+    Hash of a node group's definition. Node names take part because links refer to
+    them; layout (locations, selection) does not.
+    """
+    h = hashlib.sha256()
+
+    def add(*values):
+        h.update(("|".join(str(v) for v in values) + "\n").encode())
+
+    add(ng.bl_idname)
+    for item in ng.interface.items_tree:
+        if item.item_type == 'SOCKET':
+            add("socket", item.in_out, item.socket_type, item.name,
+                *[_value(getattr(item, attr)) for attr in ("default_value", "min_value", "max_value")
+                  if hasattr(item, attr)])
+        else:
+            add("panel", item.name)
+
+    for node in sorted(ng.nodes, key=lambda node: node.name):
+        add("node", node.name, node.bl_idname, *[f"{k}={v}" for k, v in _node_settings(node)])
+        for socket in node.inputs:
+            if not socket.is_linked and hasattr(socket, "default_value"):
+                add("input", socket.identifier, _value(socket.default_value))
+
+    for link in sorted((l.from_node.name, l.from_socket.identifier, l.to_node.name, l.to_socket.identifier)
+                       for l in ng.links):
+        add("link", *link)
+    return h.hexdigest()
+
+def find_node_group(key):
+    """
+    Returns an unedited node group generated from key, local or linked, or None.
+    """
+    for ng in bpy.data.node_groups:
+        if ng.get(GENERATOR_KEY) == key and ng.get(FINGERPRINT) == fingerprint(ng):
+            return ng
+    return None
+
+def ensure_node_group(name, key, build):
+    """
+    Returns the node group generated from key, calling build(name) to generate it
+    only if there is none. Groups are never removed, since other objects and files may
+    use them; a new group gets name or, if taken, name.001 etc.
+    """
+    ng = find_node_group(key)
+    if ng is not None:
+        return ng
+    ng = build(name)
+    ng[GENERATOR_KEY] = key
+    ng[FINGERPRINT] = fingerprint(ng)
+    return ng
+
+def save_library(path, groups):
+    """
+    Writes the node groups, and everything they use, into a library .blend.
+    """
+    bpy.data.libraries.write(path, set(groups), fake_user=True)
+
+def link_library(path):
+    """
+    Links all node groups of a library .blend written by save_library() into this
+    file, so ensure_node_group() finds them instead of generating new ones.
+    """
+    with bpy.data.libraries.load(path, link=True) as (data_from, data_to):
+        data_to.node_groups = list(data_from.node_groups)
+    return data_to.node_groups
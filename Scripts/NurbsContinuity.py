@@ -0,0 +1,349 @@
+import math
+
+import numpy as np
+
+import NurbsEvaluation
+
+# Geometric continuity (G0, G1, G2) of NURBS surface patches (NurbsEvaluation.NurbsSurface),
+# computed from their knot vectors and control grids. Only NumPy is used.
+#
+# Seams are the curves where the surface may lose smoothness:
+#   - knot lines: interior knots of a patch, where a knot of multiplicity m leaves the
+#     patch only C^(degree - m); use_bezier makes every inner knot one of those
+#   - cyclic seams: u = 0 = 1 (or v) of a cyclic patch
+#   - boundaries: patch edges that coincide with an edge of another patch (or another
+#     edge of the same one), in any direction and parameterization
+#   - poles: edges collapsed to a point, e.g. the tip of a fuselage
+# Every seam is sampled densely on both sides; on knot lines each side is evaluated with
+# the knot span on its side, its exact one-sided limit, and for boundaries every sample
+# is projected onto the other edge.
+#
+# Measures per seam, the maximum over its samples:
+#   - gap: distance between the two sides (G0)
+#   - angle: between the tangent planes, oriented by the side of the seam each patch lies
+#     on, so patches with opposite parameterizations compare equal and folds show as
+#     180 degrees (G1)
+#   - curvature: largest difference of the second fundamental forms evaluated on the seam
+#     tangent and the cross-seam direction (G2); at poles, how far the normal curvatures
+#     of all directions are from one quadratic form
+# Tolerances are relative to the model size, the diagonal of the control points' bounds:
+# gaps are compared in model sizes and curvature jumps in 1 / model size.
+
+SAMPLES = 64
+POSITION_TOLERANCE = 1e-6
+ANGLE_TOLERANCE = math.radians(0.1)
+CURVATURE_TOLERANCE = 1e-3
+# Edges closer than this (relative) are a boundary between patches, and collapsed to a point a pole
+MATCH_DISTANCE = 1e-4
+# Distance of the pole rings from the pole, in normalized parameters
+POLE_OFFSET = 1e-5
+
+# --- Differential geometry ---
+
+def _normalize(x):
+    length = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(length, 1e-300), length[..., 0]
+
+def _tangent_coordinates(d, x):
+    """
+    (a, b) with a * Su + b * Sv the projection of the vectors x on the tangent plane.
+    """
+    Su, Sv = d[1, 0], d[0, 1]
+    E = np.einsum('sd,sd->s', Su, Su)
+    F = np.einsum('sd,sd->s', Su, Sv)
+    G = np.einsum('sd,sd->s', Sv, Sv)
+    xu = np.einsum('sd,sd->s', x, Su)
+    xv = np.einsum('sd,sd->s', x, Sv)
+    det = np.maximum(E * G - F * F, 1e-300)
+    return (G * xu - F * xv) / det, (E * xv - F * xu) / det
+
+def second_form(d, normals, x, y):
+    """
+    Second fundamental form II(x, y) with respect to the given normals, for tangent
+    vectors x and y, from evaluate_points() results with derivatives=2.
+    """
+    L = np.einsum('sd,sd->s', d[2, 0], normals)
+    M = np.einsum('sd,sd->s', d[1, 1], normals)
+    N = np.einsum('sd,sd->s', d[0, 2], normals)
+    a, b = _tangent_coordinates(d, x)
+    c, e = _tangent_coordinates(d, y)
+    return L * a * c + M * (a * e + b * c) + N * b * e
+
+def _side(patch, u, v, across, limit=None):
+    """
+    Evaluates one side of a seam. across is (axis, sign): the derivative that points
+    from the seam into this side. With limit ('left' or 'right') the seam is a knot
+    line along axis and the one-sided limit is taken.
+    """
+    axis, sign = across
+    d = patch.evaluate_points(u, v, derivatives=2, side_u=limit if axis == 'u' else None,
+                              side_v=limit if axis == 'v' else None)
+    inward = sign * (d[1, 0] if axis == 'u' else d[0, 1])
+    along = d[0, 1] if axis == 'u' else d[1, 0]
+    return d, inward, along
+
+def seam_measures(first, second, scale):
+    """
+    Gap, angle and curvature arrays along a seam, from the _side() results of both
+    sides at the same points. Samples where a side is degenerate are NaN.
+    """
+    d1, inward1, along = first
+    d2, inward2, _ = second
+    tangent, along_length = _normalize(along)
+    gap = np.linalg.norm(d1[0, 0] - d2[0, 0], axis=1)
+
+    # Cross-seam directions: into the first side, and across the seam out of the second
+    cross1, length1 = _normalize(inward1 - np.einsum('sd,sd->s', inward1, tangent)[:, None] * tangent)
+    cross2, length2 = _normalize(np.einsum('sd,sd->s', inward2, tangent)[:, None] * tangent - inward2)
+    normal1, _ = _normalize(np.cross(tangent, cross1))
+    normal2, _ = _normalize(np.cross(tangent, cross2))
+    valid = (along_length > 1e-12 * scale) & (length1 > 1e-12 * scale) & (length2 > 1e-12 * scale)
+    angle = np.arccos(np.clip(np.einsum('sd,sd->s', normal1, normal2), -1.0, 1.0))
+
+    curvature = np.zeros(len(gap))
+    for x1, y1, x2, y2 in ((tangent, tangent, tangent, tangent), (tangent, cross1, tangent, cross2),
+                           (cross1, cross1, cross2, cross2)):
+        jump = np.abs(second_form(d1, normal1, x1, y1) - second_form(d2, normal2, x2, y2))
+        curvature = np.maximum(curvature, jump)
+    return gap, np.where(valid, angle, np.nan), np.where(valid, curvature, np.nan)
+
+# --- Seams ---
+
+def _seam(kind, patches, where, gap, angle, curvature):
+    return {
+        "kind": kind,
+        "patches": patches,
+        "where": where,
+        "gap": float(np.max(gap)) if len(gap) else 0.0,
+        "angle": float(np.nanmax(angle)) if np.any(np.isfinite(angle)) else 0.0,
+        "curvature": float(np.nanmax(curvature)) if np.any(np.isfinite(curvature)) else 0.0,
+    }
+
+def interior_knots(point_count, order, use_endpoint, use_cyclic, use_bezier):
+    """
+    (normalized parameter, multiplicity) of the distinct knots inside the domain, and
+    for cyclic directions the seam at 0.
+    """
+    knots = NurbsEvaluation.knot_vector(point_count, order, use_endpoint, use_cyclic, use_bezier)
+    start, end = NurbsEvaluation.parameter_range(knots, point_count, order, use_cyclic)
+    values, counts = np.unique(knots, return_counts=True)
+    inside = (values > start) & (values < end)
+    result = [((k - start) / (end - start), int(m)) for k, m in zip(values[inside], counts[inside])]
+    if use_cyclic:
+        result.insert(0, (0.0, int(counts[values == start][0])))
+    return result
+
+def knot_seams(patch, index, scale, samples=SAMPLES):
+    """
+    Seams of the knot lines and cyclic seams of one patch.
+    """
+    seams = []
+    t = np.linspace(0.0, 1.0, samples)
+    for axis, parameterization, cyclic in (('u', patch.parameterization_u(), patch.use_cyclic_u),
+                                          ('v', patch.parameterization_v(), patch.use_cyclic_v)):
+        degree = parameterization[1] - 1
+        for knot, multiplicity in interior_knots(*parameterization):
+            # Cyclic seams end the domain before they start it
+            before = np.full(samples, 1.0 if knot == 0.0 else knot)
+            after = np.full(samples, knot)
+            if axis == 'u':
+                first = _side(patch, before, t, ('u', -1), 'left')
+                second = _side(patch, after, t, ('u', 1), 'right')
+            else:
+                first = _side(patch, t, before, ('v', -1), 'left')
+                second = _side(patch, t, after, ('v', 1), 'right')
+            kind = "cyclic seam" if cyclic and knot == 0.0 else "knot line"
+            where = f"{axis} = {knot:.4g}, C{degree - multiplicity}"
+            seams.append(_seam(kind, (index, index), where, *seam_measures(first, second, scale)))
+    return seams
+
+# Side 0: v = 0, side 1: u = 1, side 2: v = 1, side 3: u = 0 (as in NurbsTessellation.py).
+_SIDE_NAMES = ("v = 0", "u = 1", "v = 1", "u = 0")
+_SIDE_ACROSS = (('v', 1), ('u', -1), ('v', -1), ('u', 1))
+
+def _side_uv(side, t):
+    fixed = np.full_like(t, 0.0 if side in (0, 3) else 1.0)
+    return (t, fixed) if side in (0, 2) else (fixed, t)
+
+def _open_sides(patch):
+    sides = []
+    if not patch.use_cyclic_v:
+        sides += [0, 2]
+    if not patch.use_cyclic_u:
+        sides += [1, 3]
+    return sorted(sides)
+
+def _project_on_side(patch, side, points, guess_count=256, iterations=4):
+    """
+    Edge parameters of the points of the side's curve closest to the given points.
+    """
+    t = np.linspace(0.0, 1.0, guess_count)
+    curve = patch.evaluate_points(*_side_uv(side, t))[0, 0]
+    nearest = np.argmin(np.linalg.norm(points[:, None] - curve[None], axis=2), axis=1)
+    t = t[nearest]
+    key_first, key_second = ((1, 0), (2, 0)) if side in (0, 2) else ((0, 1), (0, 2))
+    for _ in range(iterations):
+        d = patch.evaluate_points(*_side_uv(side, t), derivatives=2)
+        offset = d[0, 0] - points
+        first = d[key_first]
+        numerator = np.einsum('sd,sd->s', offset, first)
+        denominator = np.einsum('sd,sd->s', first, first) + np.einsum('sd,sd->s', offset, d[key_second])
+        t = np.clip(t - numerator / np.where(np.abs(denominator) > 1e-300, denominator, 1e-300), 0.0, 1.0)
+    return t
+
+def boundary_seams(patches, scale, samples=SAMPLES, match_distance=MATCH_DISTANCE):
+    """
+    Seams between coinciding patch edges, and poles. Returns (seams, poles), poles being
+    (patch, side, position) of the edges collapsed to a point.
+    """
+    t = np.linspace(0.0, 1.0, samples)
+    tolerance = match_distance * scale
+    edges = []
+    poles = []
+    for index, patch in enumerate(patches):
+        for side in _open_sides(patch):
+            curve = patch.evaluate_points(*_side_uv(side, t))[0, 0]
+            if np.linalg.norm(curve - curve[0], axis=1).max() <= tolerance:
+                poles.append((index, side, curve.mean(axis=0)))
+            else:
+                edges.append((index, side, curve))
+
+    seams = []
+    if len(edges) < 2:
+        return seams, poles
+    ends = np.array([(curve[0], curve[-1], curve[samples // 2]) for _, _, curve in edges])
+    for i, (index, side, curve) in enumerate(edges):
+        # Candidates by their end points, forward or reversed
+        forward = np.linalg.norm(ends[i + 1:, :2] - ends[i, :2], axis=2).max(axis=1)
+        backward = np.linalg.norm(ends[i + 1:, :2] - ends[i, 1::-1], axis=2).max(axis=1)
+        for j in np.nonzero(np.minimum(forward, backward) <= tolerance)[0] + i + 1:
+            other, other_side, _ = edges[j]
+            t_other = _project_on_side(patches[other], other_side, curve)
+            first = _side(patches[index], *_side_uv(side, t), _SIDE_ACROSS[side])
+            second = _side(patches[other], *_side_uv(other_side, t_other), _SIDE_ACROSS[other_side])
+            gap, angle, curvature = seam_measures(first, second, scale)
+            if gap.max() > tolerance:
+                # Same ends, different curves
+                continue
+            where = f"{_SIDE_NAMES[side]} / {_SIDE_NAMES[other_side]}"
+            seams.append(_seam("boundary", (index, int(other)), where, gap, angle, curvature))
+    return seams, poles
+
+def _pole_ring(patch, side, samples):
+    t = np.linspace(0.0, 1.0, samples)
+    u, v = _side_uv(side, t)
+    axis, sign = _SIDE_ACROSS[side]
+    if axis == 'u':
+        u = u + sign * POLE_OFFSET
+    else:
+        v = v + sign * POLE_OFFSET
+    d, inward, _ = _side(patch, u, v, _SIDE_ACROSS[side])
+    normals, length = _normalize(np.cross(d[1, 0], d[0, 1]))
+    return d, inward, normals, length
+
+def pole_seams(patches, poles, scale, samples=SAMPLES, match_distance=MATCH_DISTANCE):
+    """
+    One seam per group of coinciding poles, measured on rings of samples around them.
+    """
+    seams = []
+    used = set()
+    for i, (index, side, position) in enumerate(poles):
+        if i in used:
+            continue
+        group = [j for j in range(i, len(poles)) if j not in used
+                 and np.linalg.norm(poles[j][2] - position) <= match_distance * scale]
+        used.update(group)
+        rings = [_pole_ring(patches[poles[j][0]], poles[j][1], samples) for j in group]
+        normals = np.concatenate([ring[2] for ring in rings])
+        valid = np.concatenate([ring[3] for ring in rings]) > 1e-12 * scale ** 2
+        # Orient every patch's normals like the first one's
+        mean = normals[:samples][valid[:samples]].mean(axis=0) if valid[:samples].any() else normals[0]
+        for k in range(len(group)):
+            block = slice(k * samples, (k + 1) * samples)
+            if np.nanmean(normals[block] @ mean) < 0:
+                normals[block] *= -1
+        mean, _ = _normalize(normals[valid].sum(axis=0))
+        angle = np.where(valid, np.arccos(np.clip(normals @ mean, -1.0, 1.0)), np.nan)
+
+        # Normal curvature of every radial direction against the best quadratic form
+        curvature = np.full(len(normals), np.nan)
+        if valid.sum() >= 3:
+            kappa = []
+            for k, (d, inward, _, _) in enumerate(rings):
+                ring_normals = normals[k * samples:(k + 1) * samples]
+                radial, _ = _normalize(inward)
+                kappa.append(second_form(d, ring_normals, radial, radial)
+                             / np.maximum(np.einsum('sd,sd->s', radial, radial), 1e-300))
+            kappa = np.concatenate(kappa)
+            helper = np.eye(3)[np.argmin(np.abs(mean))]
+            e1, _ = _normalize(np.cross(mean, helper))
+            e2 = np.cross(mean, e1)
+            radial, _ = _normalize(np.concatenate([ring[1] for ring in rings]))
+            c, s = radial @ e1, radial @ e2
+            A = np.stack((c * c, 2 * c * s, s * s), axis=1)
+            fit, *_ = np.linalg.lstsq(A[valid], kappa[valid], rcond=None)
+            curvature = np.where(valid, np.abs(A @ fit - kappa), np.nan)
+        patches_ = tuple(int(poles[j][0]) for j in group)
+        where = ", ".join(f"{poles[j][0]}: {_SIDE_NAMES[poles[j][1]]}" for j in group)
+        seams.append(_seam("pole", patches_, where, np.zeros(1), angle, curvature))
+    return seams
+
+# --- Analysis ---
+
+def model_scale(patches):
+    """
+    Diagonal of the bounds of all control points.
+    """
+    points = np.concatenate([p.control_points[..., :3].reshape(-1, 3) for p in patches])
+    return max(float(np.linalg.norm(points.max(axis=0) - points.min(axis=0))), 1e-300)
+
+def classify(seam, scale, position_tolerance=POSITION_TOLERANCE, angle_tolerance=ANGLE_TOLERANCE,
+             curvature_tolerance=CURVATURE_TOLERANCE):
+    """
+    Highest continuity of a seam within the tolerances: 2, 1, 0, or -1 for a gap.
+    """
+    if seam["gap"] > position_tolerance * scale:
+        return -1
+    if seam["angle"] > angle_tolerance:
+        return 0
+    if seam["curvature"] * scale > curvature_tolerance:
+        return 1
+    return 2
+
+def analyze_patches(patches, samples=SAMPLES, position_tolerance=POSITION_TOLERANCE,
+                    angle_tolerance=ANGLE_TOLERANCE, curvature_tolerance=CURVATURE_TOLERANCE,
+                    match_distance=MATCH_DISTANCE):
+    """
+    Measures every seam of the patches. Returns (seams, scale); each seam is a dict with
+    kind, patches, where, gap, angle (radians), curvature and continuity (-1 to 2).
+    """
+    scale = model_scale(patches)
+    seams = []
+    for index, patch in enumerate(patches):
+        seams += knot_seams(patch, index, scale, samples)
+    boundaries, poles = boundary_seams(patches, scale, samples, match_distance)
+    seams += boundaries
+    seams += pole_seams(patches, poles, scale, samples, match_distance)
+    for seam in seams:
+        seam["continuity"] = classify(seam, scale, position_tolerance, angle_tolerance, curvature_tolerance)
+    return seams, scale
+
+def format_report(seams, scale, limit=25):
+    """
+    Lines summarizing the seams: counts, the G2 verdict and the worst seams.
+    """
+    names = {-1: "gap", 0: "G0", 1: "G1", 2: "G2"}
+    counts = {}
+    for seam in seams:
+        key = (seam["kind"], seam["continuity"])
+        counts[key] = counts.get(key, 0) + 1
+    lines = [f"{len(seams)} seams, model size {scale:.4g}"]
+    for (kind, continuity), count in sorted(counts.items()):
+        lines.append(f"  {count:5d} x {kind}: {names[continuity]}")
+    broken = sorted((s for s in seams if s["continuity"] < 2), key=lambda s: (s["continuity"], -s["curvature"]))
+    lines.append("G2 holds" if not broken else f"G2 fails at {len(broken)} seams:")
+    for seam in broken[:limit]:
+        lines.append(f"  {names[seam['continuity']]:>3}  {seam['kind']} of patches {seam['patches']} at {seam['where']}: "
+                     f"gap {seam['gap']:.3g}, angle {math.degrees(seam['angle']):.4g} deg, "
+                     f"curvature jump {seam['curvature']:.4g}")
+    return lines
@@ -0,0 +1,387 @@
+from collections import OrderedDict
+
+import numpy as np
+
+# Array based evaluation of Blender NURBS surfaces. Only NumPy is used.
+#
+# A surface is a grid of (x, y, z, w) control points, stored V-major like Blender's
+# spline.points (point i, j is spline.points[j * point_count_u + i]), with an order,
+# and endpoint, cyclic and bezier flags per direction.
+#
+# Knot vectors follow Blender's calcknots() (blenkernel/intern/curve.cc):
+#   - inner knots 0, 1, 2, ... appear once, or order - 1 times with use_bezier
+#   - use_endpoint repeats the first and last knot order times (order - 1 when cyclic)
+#   - cyclic splines get order - 1 more knots and wrap the first order - 1 points
+# Without use_bezier and use_cyclic these are the knot vectors of
+# PrintNurbsSurface.compute_knot_vector(), scaled by the number of spans.
+#
+# Parameters are normalized: u = 0 and u = 1 are the ends of the spline's domain
+# [knots[order - 1], knots[point_count]] (knots[point_count + order - 1] when cyclic), and
+# derivatives are taken with respect to the normalized parameters.
+#
+# Evaluation is in matrix form: per direction, vectorized Cox-de Boor (with the
+# derivative recurrence of Piegl and Tiller, "The NURBS Book", A2.3) gives dense
+# (samples, point_count) basis matrices, and the homogeneous surface and its partial
+# derivatives are tensor contractions of those with the control grid. The rational
+# derivatives then follow from the quotient rule (The NURBS Book, A4.4).
+#
+# Models are usually many patches with the same point counts, orders and flags. The
+# basis matrices of uniform grids are memoized in a BasisCache keyed by the
+# parameterization and the resolution, and evaluate_patches() evaluates all patches
+# that share both with one batched contraction.
+
+def knot_vector(point_count, order, use_endpoint=False, use_cyclic=False, use_bezier=False):
+    """
+    Returns Blender's knot vector of one direction as a float64 array of
+    point_count + order knots, point_count + 2 * order - 1 when cyclic.
+    """
+    if order < 2 or order > point_count:
+        raise ValueError(f"Order {order} is invalid for {point_count} points")
+    repeat_inner = order - 1 if use_bezier else 1
+    if use_endpoint:
+        head = order - 1 if use_cyclic else order
+    else:
+        head = min(2, repeat_inner) if use_bezier else 1
+    tail = 2 * order - 1 if use_cyclic else (order if use_endpoint else 0)
+    knot_count = point_count + order + (order - 1 if use_cyclic else 0)
+
+    knots = np.empty(knot_count, dtype=np.float64)
+    current = 0.0
+    offset = 1 if use_endpoint and use_cyclic else 0
+    if offset:
+        knots[0] = current
+        current += 1.0
+    remaining = head
+    for i in range(offset, knot_count - tail):
+        knots[i] = current
+        remaining -= 1
+        if remaining == 0:
+            current += 1.0
+            remaining = repeat_inner
+    # One by one: with few points the tail repeats knots it has just written
+    for i in range(tail):
+        knots[knot_count - tail + i] = current + (knots[i] - knots[0])
+    return knots
+
+def parameter_range(knots, point_count, order, use_cyclic=False):
+    """
+    Returns (start, end) of the domain of a knot vector made by knot_vector().
+    """
+    end = knots[point_count + order - 1] if use_cyclic else knots[point_count]
+    return knots[order - 1], end
+
+def basis_functions(knots, degree, parameters, derivatives=0, side=None):
+    """
+    Nonzero basis functions of every parameter (raw knot values) and their derivatives.
+    Returns (span, values): span (S,) is the knot span of each parameter, values
+    (derivatives + 1, S, degree + 1) holds N_{span - degree + r} and its derivatives.
+    With side 'left' or 'right', parameters on a knot (up to rounding) take the span on
+    that side of it: the one-sided limits there.
+    """
+    t = np.asarray(parameters, dtype=np.float64)
+    p = degree
+    S = len(t)
+    # The last span that is not empty, so that t = end belongs to it
+    last = len(knots) - p - 2
+    found = t
+    if side is not None:
+        rounding = 1e-9 * (knots[-1] - knots[0])
+        found = t - rounding if side == 'left' else t + rounding
+    span = np.clip(np.searchsorted(knots, found, side='right') - 1, p, last)
+    while np.any(knots[span + 1] == knots[span]):
+        empty = knots[span + 1] == knots[span]
+        span[empty] -= 1
+
+    left = np.zeros((p + 1, S))
+    right = np.zeros((p + 1, S))
+    ndu = np.zeros((p + 1, p + 1, S))
+    ndu[0, 0] = 1.0
+    for j in range(1, p + 1):
+        left[j] = t - knots[span + 1 - j]
+        right[j] = knots[span + j] - t
+        saved = np.zeros(S)
+        for r in range(j):
+            # Lower triangle: knot differences, upper triangle: basis functions
+            ndu[j, r] = right[r + 1] + left[j - r]
+            temp = ndu[r, j - 1] / ndu[j, r]
+            ndu[r, j] = saved + right[r + 1] * temp
+            saved = left[j - r] * temp
+        ndu[j, j] = saved
+
+    values = np.zeros((derivatives + 1, S, p + 1))
+    values[0] = ndu[:, p].T
+    for r in range(p + 1):
+        a = np.zeros((2, p + 1, S))
+        a[0, 0] = 1.0
+        s1, s2 = 0, 1
+        for k in range(1, min(derivatives, p) + 1):
+            d = np.zeros(S)
+            rk = r - k
+            pk = p - k
+            if r >= k:
+                a[s2, 0] = a[s1, 0] / ndu[pk + 1, rk]
+                d = a[s2, 0] * ndu[rk, pk]
+            j1 = 1 if rk >= -1 else -rk
+            j2 = k - 1 if r - 1 <= pk else p - r
+            for j in range(j1, j2 + 1):
+                a[s2, j] = (a[s1, j] - a[s1, j - 1]) / ndu[pk + 1, rk + j]
+                d = d + a[s2, j] * ndu[rk + j, pk]
+            if r <= pk:
+                a[s2, k] = -a[s1, k - 1] / ndu[pk + 1, r]
+                d = d + a[s2, k] * ndu[r, pk]
+            values[k, :, r] = d
+            s1, s2 = s2, s1
+
+    factor = float(p)
+    for k in range(1, min(derivatives, p) + 1):
+        values[k] *= factor
+        factor *= p - k
+    return span, values
+
+def basis_matrices(point_count, order, use_endpoint, use_cyclic, use_bezier, parameters, derivatives=0,
+                   side=None):
+    """
+    Dense basis matrices of one direction at normalized parameters in [0, 1].
+    Returns (derivatives + 1, S, point_count): row s of matrix k holds the k-th
+    derivatives of all point_count basis functions at parameter s. See
+    basis_functions() for side.
+    """
+    knots = knot_vector(point_count, order, use_endpoint, use_cyclic, use_bezier)
+    start, end = parameter_range(knots, point_count, order, use_cyclic)
+    if end <= start:
+        # Blender draws nothing for these either, e.g. bezier without endpoint and point_count == order
+        raise ValueError(f"Knot vector {knots.tolist()} has an empty domain")
+    u = np.asarray(parameters, dtype=np.float64)
+    span, values = basis_functions(knots, order - 1, start + u * (end - start), derivatives, side)
+
+    S = len(u)
+    extended = point_count + (order - 1 if use_cyclic else 0)
+    columns = span[:, None] - (order - 1) + np.arange(order)
+    matrices = np.zeros((derivatives + 1, S, extended))
+    rows = np.repeat(np.arange(S), order)
+    for k in range(derivatives + 1):
+        matrices[k, rows, columns.ravel()] = values[k].ravel()
+        # Chain rule for the normalized parameter
+        matrices[k] *= (end - start) ** k
+    if use_cyclic:
+        # The wrapped points are the first order - 1 points again
+        matrices[:, :, :order - 1] += matrices[:, :, point_count:]
+        matrices = matrices[:, :, :point_count]
+    return matrices
+
+def uniform_parameters(resolution):
+    """
+    resolution evenly spaced normalized parameters from 0 to 1.
+    """
+    return np.linspace(0.0, 1.0, resolution)
+
+class BasisCache:
+    """
+    LRU cache of the basis matrices of uniform parameter grids, keyed by
+    (point_count, order, use_endpoint, use_cyclic, use_bezier, resolution). Entries
+    hold the matrices up to the highest derivative asked for so far and are read-only.
+    The least recently used entries are evicted above memory_limit bytes.
+    """
+
+    def __init__(self, memory_limit=64 * 1024**2):
+        self.memory_limit = memory_limit
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, parameterization, resolution, derivatives=0):
+        """
+        basis_matrices() of the parameterization at uniform_parameters(resolution).
+        """
+        key = tuple(parameterization) + (resolution,)
+        matrices = self._entries.get(key)
+        if matrices is not None and len(matrices) > derivatives:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return matrices[:derivatives + 1]
+
+        self.misses += 1
+        matrices = basis_matrices(*parameterization, uniform_parameters(resolution), derivatives)
+        matrices.setflags(write=False)
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key).nbytes
+        if matrices.nbytes <= self.memory_limit:
+            self._entries[key] = matrices
+            self._bytes += matrices.nbytes
+            while self._bytes > self.memory_limit:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+        return matrices
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+_default_basis_cache = None
+
+def default_basis_cache():
+    """
+    Returns the basis cache shared by everything running in this Python session.
+    """
+    global _default_basis_cache
+    if _default_basis_cache is None:
+        _default_basis_cache = BasisCache()
+    return _default_basis_cache
+
+def rational_derivatives(homogeneous):
+    """
+    Cartesian point and partial derivatives from the homogeneous ones, by the quotient
+    rule. homogeneous maps (k, l), the order of differentiation in u and v, to (..., 4)
+    arrays; the result maps the same keys to (..., 3) arrays.
+    """
+    w = {key: value[..., 3:] for key, value in homogeneous.items()}
+    a = {key: value[..., :3] for key, value in homogeneous.items()}
+    result = {}
+    for k, l in sorted(homogeneous, key=sum):
+        value = a[k, l]
+        for i in range(k + 1):
+            for j in range(l + 1):
+                if i == 0 and j == 0:
+                    continue
+                value = value - _binomial(k, i) * _binomial(l, j) * w[i, j] * result[k - i, l - j]
+        result[k, l] = value / w[0, 0]
+    return result
+
+def evaluate_homogeneous(Pw, basis_u, basis_v, derivatives=0):
+    """
+    Batched evaluation of homogeneous control grids Pw (P, V, U, 4) on the grid of the
+    basis matrices' parameters. Returns a dict (k, l) -> (P, len(v), len(u), 3) array
+    of the k-th u and l-th v derivative, for k + l <= derivatives.
+    """
+    homogeneous = {}
+    for l in range(derivatives + 1):
+        # Contract v first: (P, Sv, U, 4), reused for every u derivative
+        along_v = np.einsum('sj,pjid->psid', basis_v[l], Pw)
+        for k in range(derivatives + 1 - l):
+            homogeneous[k, l] = np.einsum('ti,psid->pstd', basis_u[k], along_v)
+    return rational_derivatives(homogeneous)
+
+def evaluate_patches(patches, resolution_u, resolution_v, derivatives=0, cache=None):
+    """
+    Evaluates every NurbsSurface on a uniform resolution_u x resolution_v grid.
+    Patches with the same parameterization share one cached basis lookup and one
+    batched contraction. Returns one dict per patch, as NurbsSurface.evaluate().
+    """
+    if cache is None:
+        cache = default_basis_cache()
+    groups = {}
+    for index, patch in enumerate(patches):
+        groups.setdefault((patch.parameterization_u(), patch.parameterization_v()), []).append(index)
+
+    results = [None] * len(patches)
+    for (parameterization_u, parameterization_v), indices in groups.items():
+        basis_u = cache.get(parameterization_u, resolution_u, derivatives)
+        basis_v = cache.get(parameterization_v, resolution_v, derivatives)
+        Pw = np.stack([patches[i].homogeneous_points() for i in indices])
+        batch = evaluate_homogeneous(Pw, basis_u, basis_v, derivatives)
+        for position, index in enumerate(indices):
+            results[index] = {key: value[position] for key, value in batch.items()}
+    return results
+
+def _binomial(n, k):
+    value = 1
+    for i in range(k):
+        value = value * (n - i) // (i + 1)
+    return value
+
+class NurbsSurface:
+    """
+    One NURBS surface patch: a (point_count_v, point_count_u, 4) grid of (x, y, z, w)
+    control points with Blender's per-direction order and flags.
+    """
+
+    def __init__(self, control_points, order_u, order_v, use_endpoint_u=False, use_endpoint_v=False,
+                 use_cyclic_u=False, use_cyclic_v=False, use_bezier_u=False, use_bezier_v=False):
+        self.control_points = np.asarray(control_points, dtype=np.float64)
+        if self.control_points.ndim != 3 or self.control_points.shape[2] != 4:
+            raise ValueError(f"Expected a (V, U, 4) control grid, got shape {self.control_points.shape}")
+        self.order_u = order_u
+        self.order_v = order_v
+        self.use_endpoint_u = use_endpoint_u
+        self.use_endpoint_v = use_endpoint_v
+        self.use_cyclic_u = use_cyclic_u
+        self.use_cyclic_v = use_cyclic_v
+        self.use_bezier_u = use_bezier_u
+        self.use_bezier_v = use_bezier_v
+
+    @classmethod
+    def from_spline(cls, spline):
+        """
+        Builds the patch of a Blender surface spline of type 'NURBS'.
+        """
+        co = np.empty(len(spline.points) * 4, dtype=np.float32)
+        spline.points.foreach_get("co", co)
+        return cls(co.reshape(spline.point_count_v, spline.point_count_u, 4), spline.order_u, spline.order_v,
+                   spline.use_endpoint_u, spline.use_endpoint_v, spline.use_cyclic_u, spline.use_cyclic_v,
+                   spline.use_bezier_u, spline.use_bezier_v)
+
+    @property
+    def point_count_u(self):
+        return self.control_points.shape[1]
+
+    @property
+    def point_count_v(self):
+        return self.control_points.shape[0]
+
+    def parameterization_u(self):
+        return self.point_count_u, self.order_u, self.use_endpoint_u, self.use_cyclic_u, self.use_bezier_u
+
+    def parameterization_v(self):
+        return self.point_count_v, self.order_v, self.use_endpoint_v, self.use_cyclic_v, self.use_bezier_v
+
+    def homogeneous_points(self):
+        """
+        (w * x, w * y, w * z, w) of every control point.
+        """
+        P = self.control_points.copy()
+        P[..., :3] *= P[..., 3:]
+        return P
+
+    def evaluate_matrices(self, basis_u, basis_v, derivatives=0):
+        """
+        Surface points and partial derivatives from basis matrices made by
+        basis_matrices() for this patch's parameterization, on the grid of their
+        parameters. Returns a dict (k, l) -> (len(v), len(u), 3) array of the k-th
+        u and l-th v derivative, for k + l <= derivatives.
+        """
+        batch = evaluate_homogeneous(self.homogeneous_points()[None], basis_u, basis_v, derivatives)
+        return {key: value[0] for key, value in batch.items()}
+
+    def evaluate(self, u, v, derivatives=0):
+        """
+        Evaluates the patch on the grid of normalized parameters u x v. See
+        evaluate_matrices() for the result.
+        """
+        basis_u = basis_matrices(*self.parameterization_u(), u, derivatives)
+        basis_v = basis_matrices(*self.parameterization_v(), v, derivatives)
+        return self.evaluate_matrices(basis_u, basis_v, derivatives)
+
+    def evaluate_grid(self, resolution_u, resolution_v, derivatives=0, cache=None):
+        """
+        evaluate() on uniform grids, with the basis matrices from a BasisCache.
+        """
+        if cache is None:
+            cache = default_basis_cache()
+        basis_u = cache.get(self.parameterization_u(), resolution_u, derivatives)
+        basis_v = cache.get(self.parameterization_v(), resolution_v, derivatives)
+        return self.evaluate_matrices(basis_u, basis_v, derivatives)
+
+    def evaluate_points(self, u, v, derivatives=0, side_u=None, side_v=None):
+        """
+        Evaluates the patch at the (u[s], v[s]) pairs. Returns a dict (k, l) -> (S, 3).
+        side_u and side_v ('left' or 'right') pick the one-sided limits at knots.
+        """
+        basis_u = basis_matrices(*self.parameterization_u(), u, derivatives, side_u)
+        basis_v = basis_matrices(*self.parameterization_v(), v, derivatives, side_v)
+        Pw = self.homogeneous_points()
+        homogeneous = {}
+        for l in range(derivatives + 1):
+            for k in range(derivatives + 1 - l):
+                homogeneous[k, l] = np.einsum('sj,jid,si->sd', basis_v[l], Pw, basis_u[k])
+        return rational_derivatives(homogeneous)
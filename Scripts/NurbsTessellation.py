@@ -0,0 +1,385 @@
+import math
+
+import numpy as np
+
+import NurbsEvaluation
+import ProcessPool
+
+# Adaptive tessellation of NURBS surface patches (NurbsEvaluation.NurbsSurface) into
+# one indexed triangle mesh. Only NumPy is used.
+#
+# Each patch is refined as a quadtree over its normalized (u, v) domain, on an integer
+# grid of 2^(max_depth + 1) steps per direction. A cell is split while the surface is
+# farther than the chordal tolerance from the two triangles the cell is emitted as, or
+# its normals deviate from the corners' mean normal by more than the angle tolerance,
+# both checked on a 5 x 5 lattice of samples. Only the directions the surface bends in
+# are split, so e.g. a cylinder is not refined along its straight lines. Patches are
+# refined on a process pool.
+#
+# Cracks are avoided by construction:
+#   - inside a patch, every leaf is triangulated with all the vertices lying on its
+#     edges (fanned from its center when a neighbor is finer), so there are no
+#     T-junctions
+#   - patch edges that coincide (shared boundaries, cyclic seams) are found by
+#     position, forward or reversed, get the union of the vertices of both sides and
+#     are welded by grid position; edges collapsed to a point (poles) become one vertex
+# Triangles are wound counter-clockwise around cross(dS/du, dS/dv) of their patch.
+
+MIN_DEPTH = 2
+MAX_DEPTH = 8
+ANGLE_TOLERANCE = math.radians(10.0)
+# Edge samples closer than this are the same point
+WELD_DISTANCE = 1e-6
+# Fewer patches are refined in this process, a pool takes a moment to start
+PARALLEL_MIN_PATCHES = 16
+
+# Sample lattice of a cell, as fractions of its size
+_LATTICE = np.linspace(0.0, 1.0, 5)
+
+# --- Refinement ---
+
+def _angles(normals, valid, reference):
+    cosine = np.einsum('n...d,n...d->n...', normals, reference)
+    return np.where(valid, np.arccos(np.clip(cosine, -1.0, 1.0)), 0.0)
+
+def _line_distances(S):
+    """
+    Distance of the samples along the last lattice axis to the line through the first
+    and last one; to the first one where those coincide.
+    """
+    offset = S - S[..., :1, :]
+    direction = S[..., -1:, :] - S[..., :1, :]
+    length = np.linalg.norm(direction, axis=-1, keepdims=True)
+    direction = direction / np.maximum(length, 1e-300)
+    along = np.einsum('...d,...d->...', offset, direction)[..., None] * direction
+    return np.linalg.norm(offset - along, axis=-1)
+
+def _needs_split(patch, u0, v0, size_u, size_v, grid, chordal_tolerance, angle_tolerance):
+    """
+    (split in u, split in v) of the cells.
+    """
+    N = len(u0)
+    s, t = np.meshgrid(_LATTICE, _LATTICE)
+    u = (u0[:, None] + s.ravel() * size_u[:, None]) / grid
+    v = (v0[:, None] + t.ravel() * size_v[:, None]) / grid
+    result = patch.evaluate_points(u.ravel(), v.ravel(), derivatives=1)
+    S = result[0, 0].reshape(N, 5, 5, 3)
+
+    # Distance to the two triangles the cell is emitted as, (00, 10, 11) holding the
+    # samples with s >= t and (00, 11, 01) the others, along the triangle's normal.
+    # Degenerate triangles (at poles) use the distance to the bilinear patch instead
+    P00, P10, P01, P11 = S[:, 0, 0], S[:, 0, 4], S[:, 4, 0], S[:, 4, 4]
+    weights = ((1 - s) * (1 - t), s * (1 - t), (1 - s) * t, s * t)
+    bilinear = sum(w[..., None] * P[:, None, None] for w, P in zip(weights, (P00, P10, P01, P11)))
+    fallback = np.linalg.norm(S - bilinear, axis=-1)
+    chord = np.empty((N, 5, 5))
+    for (A, B, C), inside in (((P00, P10, P11), s >= t), ((P00, P11, P01), s < t)):
+        normal = np.cross(B - A, C - A)
+        area = np.linalg.norm(normal, axis=-1)
+        flat = area > 1e-12 * np.einsum('nd,nd->n', C - A, C - A)
+        normal /= np.where(flat, area, 1.0)[:, None]
+        height = np.abs(np.einsum('nabd,nd->nab', S - A[:, None, None], normal))
+        chord = np.where(inside, np.where(flat[:, None, None], height, fallback), chord)
+
+    # Normal deviation from the corners' mean normal; degenerate normals (poles) are ignored
+    normals = np.cross(result[1, 0], result[0, 1]).reshape(N, 5, 5, 3)
+    length = np.linalg.norm(normals, axis=-1, keepdims=True)
+    valid = length[..., 0] > 1e-12
+    normals = np.where(length > 1e-12, normals / np.maximum(length, 1e-300), 0.0)
+    mean = normals[:, [0, 0, 4, 4], [0, 4, 0, 4]].sum(axis=1)
+    mean /= np.maximum(np.linalg.norm(mean, axis=-1, keepdims=True), 1e-300)
+    angle = _angles(normals, valid, mean[:, None, None])
+    split = ((chord.reshape(N, -1).max(axis=1) > chordal_tolerance)
+             | (angle.reshape(N, -1).max(axis=1) > angle_tolerance))
+
+    # Split the directions the surface bends in: rows run along u, columns along v.
+    # Cells bent in neither (twisted ones) are split in both
+    bend = []
+    for axis in (1, 2):
+        lines = np.swapaxes(S, 1, 2) if axis == 2 else S
+        line_normals = np.swapaxes(normals, 1, 2) if axis == 2 else normals
+        line_valid = np.swapaxes(valid, 1, 2) if axis == 2 else valid
+        distance = _line_distances(lines).reshape(N, -1).max(axis=1)
+        turn = _angles(line_normals, line_valid & line_valid[:, :, 2:3], line_normals[:, :, 2:3]).reshape(N, -1).max(axis=1)
+        bend.append(np.maximum(distance / chordal_tolerance, turn / angle_tolerance))
+    most = np.maximum(bend[0], bend[1])
+    return split & (bend[0] >= 0.5 * most), split & (bend[1] >= 0.5 * most)
+
+def refine_patch(patch, chordal_tolerance, angle_tolerance=ANGLE_TOLERANCE, min_depth=MIN_DEPTH,
+                 max_depth=MAX_DEPTH):
+    """
+    Quadtree leaves of one patch as an (L, 4) int32 array of (u0, v0, u1, v1) on the
+    grid of 2^(max_depth + 1) steps per direction, so the centers of leaves are grid
+    points too. Cells are split in u, v or both, at most max_depth times each way.
+    """
+    grid = 2 << max_depth
+    size = grid >> min_depth
+    i, j = np.meshgrid(np.arange(1 << min_depth), np.arange(1 << min_depth))
+    u0 = (i.ravel() * size).astype(np.int64)
+    v0 = (j.ravel() * size).astype(np.int64)
+    size_u = np.full(len(u0), size, dtype=np.int64)
+    size_v = size_u.copy()
+    leaves = []
+    while len(u0):
+        split_u = np.zeros(len(u0), dtype=bool)
+        split_v = split_u.copy()
+        active = (size_u > 2) | (size_v > 2)
+        if active.any():
+            split_u[active], split_v[active] = _needs_split(patch, u0[active], v0[active], size_u[active],
+                                                            size_v[active], grid, chordal_tolerance, angle_tolerance)
+        split_u &= size_u > 2
+        split_v &= size_v > 2
+        done = ~(split_u | split_v)
+        leaves.append(np.stack((u0[done], v0[done], u0[done] + size_u[done], v0[done] + size_v[done]), axis=1))
+        half_u = np.where(split_u, size_u // 2, size_u)
+        half_v = np.where(split_v, size_v // 2, size_v)
+        children = []
+        for du, dv in ((0, 0), (1, 0), (0, 1), (1, 1)):
+            take = ~done & (split_u | (du == 0)) & (split_v | (dv == 0))
+            children.append((u0[take] + du * half_u[take], v0[take] + dv * half_v[take], half_u[take], half_v[take]))
+        u0, v0, size_u, size_v = (np.concatenate(c) for c in zip(*children))
+    return np.concatenate(leaves).astype(np.int32)
+
+def _refine_task(index, control_points, parameterization, chordal_tolerance, angle_tolerance, min_depth, max_depth):
+    patch = NurbsEvaluation.NurbsSurface(control_points, *parameterization)
+    return index, refine_patch(patch, chordal_tolerance, angle_tolerance, min_depth, max_depth)
+
+def _parameterization(patch):
+    return (patch.order_u, patch.order_v, patch.use_endpoint_u, patch.use_endpoint_v,
+            patch.use_cyclic_u, patch.use_cyclic_v, patch.use_bezier_u, patch.use_bezier_v)
+
+def refine_patches(patches, chordal_tolerance, angle_tolerance=ANGLE_TOLERANCE, min_depth=MIN_DEPTH,
+                   max_depth=MAX_DEPTH, workers=None):
+    """
+    refine_patch() of every patch, on a process pool when there are many.
+    """
+    workers = workers or ProcessPool.default_worker_count()
+    if workers == 1 or len(patches) < PARALLEL_MIN_PATCHES:
+        return [refine_patch(p, chordal_tolerance, angle_tolerance, min_depth, max_depth) for p in patches]
+    leaves = [None] * len(patches)
+    with ProcessPool.ProcessPool(min(workers, len(patches))) as pool:
+        tasks = [(_refine_task, (i, p.control_points, _parameterization(p), chordal_tolerance, angle_tolerance,
+                                 min_depth, max_depth)) for i, p in enumerate(patches)]
+        for i, patch_leaves in pool.imap_unordered(tasks):
+            leaves[i] = patch_leaves
+    return leaves
+
+# --- Patch edges ---
+# Side 0: v = 0, side 1: u = 1, side 2: v = 1, side 3: u = 0. Along every side the
+# edge parameter runs with u or v from 0 to the grid size.
+
+def _side_coordinates(side, t, grid):
+    """
+    Grid (u, v) of the points at edge parameters t of a side.
+    """
+    t = np.asarray(t)
+    fixed = np.full_like(t, 0 if side in (0, 3) else grid)
+    return (t, fixed) if side in (0, 2) else (fixed, t)
+
+def _side_parameters(side, iu, iv, grid):
+    """
+    Edge parameters of the grid points lying on a side.
+    """
+    if side == 0:
+        on = iv == 0
+    elif side == 1:
+        on = iu == grid
+    elif side == 2:
+        on = iv == grid
+    else:
+        on = iu == 0
+    return (iu if side in (0, 2) else iv)[on]
+
+def match_edges(patches, weld_distance=WELD_DISTANCE):
+    """
+    Returns (matches, poles): matches lists (edge a, edge b, reversed) of coinciding
+    patch sides, an edge being 4 * patch + side; poles lists the edges collapsed to a point.
+    """
+    samples = np.linspace(0.0, 1.0, 5)
+    positions = []
+    for patch in patches:
+        for side in range(4):
+            u, v = _side_coordinates(side, samples, 1.0)
+            positions.append(patch.evaluate_points(u, v)[0, 0])
+    positions = np.array(positions)
+
+    extent = np.linalg.norm(positions - positions[:, :1], axis=-1).max(axis=1)
+    poles = np.nonzero(extent <= weld_distance)[0]
+    edges = np.nonzero(extent > weld_distance)[0]
+    candidates = positions[edges]
+    matches = []
+    for position, a in enumerate(edges):
+        rest = candidates[position + 1:]
+        forward = np.linalg.norm(rest - candidates[position], axis=-1).max(axis=1) <= weld_distance
+        backward = np.linalg.norm(rest - candidates[position][::-1], axis=-1).max(axis=1) <= weld_distance
+        for offset in np.nonzero(forward | backward)[0]:
+            matches.append((int(a), int(edges[position + 1 + offset]), bool(backward[offset] and not forward[offset])))
+    return matches, poles
+
+def _edge_components(matches):
+    """
+    Connected groups of matched edges: edge -> (root, reversed relative to root).
+    """
+    neighbors = {}
+    for a, b, reversed_ in matches:
+        neighbors.setdefault(a, []).append((b, reversed_))
+        neighbors.setdefault(b, []).append((a, reversed_))
+    component = {}
+    for root in neighbors:
+        if root in component:
+            continue
+        component[root] = (root, False)
+        stack = [root]
+        while stack:
+            edge = stack.pop()
+            flipped = component[edge][1]
+            for other, reversed_ in neighbors[edge]:
+                if other not in component:
+                    component[other] = (root, flipped != reversed_)
+                    stack.append(other)
+    return component
+
+def _connected_labels(count, a, b):
+    """
+    Smallest index of the connected component of every index, for the pairs (a[i], b[i]).
+    """
+    labels = np.arange(count)
+    while True:
+        low = np.minimum(labels[a], labels[b])
+        changed = labels.copy()
+        np.minimum.at(changed, a, low)
+        np.minimum.at(changed, b, low)
+        # Pointer jumping
+        changed = changed[changed]
+        if np.array_equal(changed, labels):
+            return labels
+        labels = changed
+
+# --- Triangulation ---
+
+def _leaf_triangles(leaves, iu, iv, grid):
+    """
+    Triangles of the leaves as point keys, with every point on a leaf's edges included.
+    Returns (triangles as keys, center keys that were added).
+    """
+    width = grid + 1
+    rows = {int(v): np.sort(iu[iv == v]) for v in np.unique(iv)}
+    columns = {int(u): np.sort(iv[iu == u]) for u in np.unique(iu)}
+
+    def between(line, low, high):
+        return line[np.searchsorted(line, low):np.searchsorted(line, high, side='right')]
+
+    triangles = []
+    centers = []
+    for u0, v0, u1, v1 in leaves.tolist():
+        bottom = between(rows[v0], u0, u1)
+        right = between(columns[u1], v0, v1)
+        top = between(rows[v1], u0, u1)
+        left = between(columns[u0], v0, v1)
+        if len(bottom) + len(right) + len(top) + len(left) == 8:
+            c00, c10, c11, c01 = v0 * width + u0, v0 * width + u1, v1 * width + u1, v1 * width + u0
+            triangles += [(c00, c10, c11), (c00, c11, c01)]
+            continue
+        # Counter-clockwise in (u, v), each corner once
+        ring = ([v0 * width + u for u in bottom[:-1]] + [v * width + u1 for v in right[:-1]]
+                + [v1 * width + u for u in top[::-1][:-1]] + [v * width + u0 for v in left[::-1][:-1]])
+        center = ((v0 + v1) // 2) * width + (u0 + u1) // 2
+        centers.append(center)
+        triangles += [(center, ring[k], ring[(k + 1) % len(ring)]) for k in range(len(ring))]
+    return np.array(triangles, dtype=np.int64).reshape(-1, 3), np.array(centers, dtype=np.int64)
+
+def tessellate_patches(patches, chordal_tolerance, angle_tolerance=ANGLE_TOLERANCE, min_depth=MIN_DEPTH,
+                       max_depth=MAX_DEPTH, weld_distance=WELD_DISTANCE, workers=None):
+    """
+    Tessellates NurbsSurface patches into one crack-free mesh.
+    Returns (positions (V, 3) float64, triangles (F, 3) int32, patch of every triangle).
+    """
+    grid = 2 << max_depth
+    width = grid + 1
+    leaves = refine_patches(patches, chordal_tolerance, angle_tolerance, min_depth, max_depth, workers)
+
+    # Grid points of every patch: the leaf corners
+    points = []
+    for patch_leaves in leaves:
+        corners = np.concatenate([patch_leaves[:, [1, 0]], patch_leaves[:, [1, 2]],
+                                  patch_leaves[:, [3, 0]], patch_leaves[:, [3, 2]]])
+        points.append(set((corners[:, 0] * width + corners[:, 1]).tolist()))
+
+    # Coinciding edges get the union of their points
+    matches, poles = match_edges(patches, weld_distance)
+    component = _edge_components(matches)
+    shared = {}
+    for edge, (root, flipped) in component.items():
+        patch, side = divmod(edge, 4)
+        keys = np.fromiter(points[patch], dtype=np.int64)
+        t = _side_parameters(side, keys % width, keys // width, grid)
+        shared.setdefault(root, set()).update((grid - t if flipped else t).tolist())
+    for edge, (root, flipped) in component.items():
+        patch, side = divmod(edge, 4)
+        t = np.fromiter(shared[root], dtype=np.int64)
+        u, v = _side_coordinates(side, grid - t if flipped else t, grid)
+        points[patch].update((v * width + u).tolist())
+
+    # Triangulate, then evaluate every used point once
+    offsets = [0]
+    positions = []
+    triangles = []
+    patch_index = []
+    point_keys = []
+    for index, (patch, patch_leaves) in enumerate(zip(patches, leaves)):
+        keys = np.fromiter(points[index], dtype=np.int64)
+        patch_triangles, centers = _leaf_triangles(patch_leaves, keys % width, keys // width, grid)
+        keys = np.unique(np.concatenate((keys, centers)))
+        local = np.searchsorted(keys, patch_triangles)
+        triangles.append(local + offsets[-1])
+        patch_index.append(np.full(len(local), index, dtype=np.int32))
+        positions.append(patch.evaluate_points((keys % width) / grid, (keys // width) / grid)[0, 0])
+        point_keys.append(keys)
+        offsets.append(offsets[-1] + len(keys))
+
+    # Weld coinciding edges and poles by grid position
+    a, b = [], []
+    for edge, (root, flipped) in component.items():
+        if edge == root:
+            continue
+        t = np.fromiter(shared[root], dtype=np.int64)
+        for e, t_edge in ((edge, grid - t if flipped else t), (root, t)):
+            patch, side = divmod(e, 4)
+            u, v = _side_coordinates(side, t_edge, grid)
+            (a if e == edge else b).append(offsets[patch] + np.searchsorted(point_keys[patch], v * width + u))
+    for edge in poles:
+        patch, side = divmod(int(edge), 4)
+        keys = point_keys[patch]
+        t = _side_parameters(side, keys % width, keys // width, grid)
+        u, v = _side_coordinates(side, t, grid)
+        on_edge = offsets[patch] + np.searchsorted(keys, v * width + u)
+        a.append(on_edge)
+        b.append(np.full_like(on_edge, on_edge[0]))
+    labels = _connected_labels(offsets[-1], np.concatenate(a + [np.empty(0, np.int64)]).astype(np.int64),
+                               np.concatenate(b + [np.empty(0, np.int64)]).astype(np.int64))
+
+    positions = np.concatenate(positions)
+    triangles = labels[np.concatenate(triangles)]
+    patch_index = np.concatenate(patch_index)
+    keep = ((triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2])
+            & (triangles[:, 2] != triangles[:, 0]))
+    triangles = triangles[keep]
+    used, triangles = np.unique(triangles, return_inverse=True)
+    return positions[used], triangles.reshape(-1, 3).astype(np.int32), patch_index[keep]
+
+def uniform_tessellation(patches, resolution_u, resolution_v):
+    """
+    Tessellation on a fixed resolution_u x resolution_v grid per patch, like Blender's
+    own, for comparison. Patches are not welded. Returns (positions, triangles).
+    """
+    positions = []
+    triangles = []
+    offset = 0
+    i, j = np.meshgrid(np.arange(resolution_u - 1), np.arange(resolution_v - 1))
+    c00 = (j * resolution_u + i).ravel()
+    quads = np.stack((c00, c00 + 1, c00 + resolution_u + 1, c00 + resolution_u), axis=1)
+    for result in NurbsEvaluation.evaluate_patches(patches, resolution_u, resolution_v):
+        positions.append(result[0, 0].reshape(-1, 3))
+        triangles.append(np.concatenate((quads[:, [0, 1, 2]], quads[:, [0, 2, 3]])) + offset)
+        offset += resolution_u * resolution_v
+    return np.concatenate(positions), np.concatenate(triangles).astype(np.int32)
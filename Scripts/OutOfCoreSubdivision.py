@@ -0,0 +1,144 @@
+import math
+import os
+
+import numpy as np
+
+import LoopSubdivisionEngine
+import ParallelSubdivision
+
+# Loop subdivision of meshes whose refined levels do not fit in memory, such as
+# terrain cages subdivided to game resolution (5 levels of a 50k triangle map are
+# 51M triangles).
+#
+# The cage is cut into spatially compact tiles. Each tile is subdivided on its own
+# together with a one-ring halo, which makes its own faces come out exactly as in the
+# whole mesh (see ParallelSubdivision.py), and every level of it is written into
+# memory-mapped .npy files straight away. Seam vertices get the same index from both
+# tiles, so nothing needs to be merged afterwards. Only one tile's levels are ever
+# held in memory.
+#
+# Output directory layout, loadable with np.load(path, mmap_mode='r'):
+#   tiles.npy                  (F,) tile index of every cage face
+#   level{k}_positions.npy     (V_k, 3) float32
+#   level{k}_triangles.npy     (F * 4^k, 3) int32, descendants of cage face f at rows f * 4^k ..
+
+# Refined triangles per tile at the last level; bounds the memory used
+TILE_SIZE = 2000000
+
+# Rows per write when exporting
+CHUNK_SIZE = 1000000
+
+def level_paths(directory, level):
+    return (os.path.join(directory, f"level{level}_positions.npy"),
+            os.path.join(directory, f"level{level}_triangles.npy"))
+
+def open_level(directory, level):
+    """
+    Returns (positions, triangles) of a level written by subdivide_to_files() as read-only memory maps.
+    """
+    positions_path, triangles_path = level_paths(directory, level)
+    return np.load(positions_path, mmap_mode='r'), np.load(triangles_path, mmap_mode='r')
+
+def subdivide_to_files(positions, triangles, iterations, directory, tile_size=TILE_SIZE, all_levels=True):
+    """
+    Loop subdivides the mesh tile by tile into memory-mapped files in directory.
+    Writes every level 1 .. iterations, or only the last one if all_levels is False.
+    Returns the number of tiles.
+    """
+    P = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    T = np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+    V = len(P)
+    os.makedirs(directory, exist_ok=True)
+
+    edges, face_edges, _, _ = LoopSubdivisionEngine.build_edges(T, V)
+    tiles = max(1, math.ceil(len(T) * 4 ** iterations / tile_size))
+    part = ParallelSubdivision.partition_faces(P, T, tiles)
+    np.save(os.path.join(directory, "tiles.npy"), part)
+
+    levels = range(1, iterations + 1) if all_levels else [iterations]
+    outputs = {}
+    for level in levels:
+        vertex_count, face_count = ParallelSubdivision.subdivided_size(V, len(edges), len(T), level)
+        positions_path, triangles_path = level_paths(directory, level)
+        outputs[level] = (
+            np.lib.format.open_memmap(positions_path, mode='w+', dtype=np.float32, shape=(vertex_count, 3)),
+            np.lib.format.open_memmap(triangles_path, mode='w+', dtype=np.int32, shape=(face_count, 3)),
+        )
+
+    for index in range(tiles):
+        core, halo = ParallelSubdivision.partition_halo(T, part, index)
+        if len(core) == 0:
+            continue
+        used, local = np.unique(T[np.concatenate((core, halo))], return_inverse=True)
+        refined = LoopSubdivisionEngine.subdivide_levels(P[used], local.reshape(-1, 3), iterations)
+        for level, (tile_positions, tile_triangles) in enumerate(refined, 1):
+            if level in outputs:
+                out_positions, out_triangles = outputs[level]
+                ParallelSubdivision.write_partition(tile_positions, tile_triangles, core, T, face_edges,
+                                                    V, len(edges), level, out_positions, out_triangles)
+
+    for out_positions, out_triangles in outputs.values():
+        out_positions.flush()
+        out_triangles.flush()
+    return tiles
+
+# --- Export ---
+
+def _ply_header(vertex_count, face_count):
+    return (
+        "ply\n"
+        "format binary_little_endian 1.0\n"
+        f"element vertex {vertex_count}\n"
+        "property float x\n"
+        "property float y\n"
+        "property float z\n"
+        f"element face {face_count}\n"
+        "property list uchar int vertex_indices\n"
+        "end_header\n"
+    ).encode("ascii")
+
+def _face_records(triangles):
+    faces = np.empty(len(triangles), dtype=[("count", "u1"), ("vertices", "<i4", 3)])
+    faces["count"] = 3
+    faces["vertices"] = triangles
+    return faces
+
+def write_ply(path, positions, triangles):
+    """
+    Writes a binary PLY, CHUNK_SIZE rows at a time so memory maps are streamed
+    from disk instead of loaded.
+    """
+    with open(path, "wb") as f:
+        f.write(_ply_header(len(positions), len(triangles)))
+        for start in range(0, len(positions), CHUNK_SIZE):
+            f.write(np.ascontiguousarray(positions[start:start + CHUNK_SIZE], dtype="<f4").tobytes())
+        for start in range(0, len(triangles), CHUNK_SIZE):
+            f.write(_face_records(triangles[start:start + CHUNK_SIZE]).tobytes())
+
+def export_ply(directory, path, level):
+    """
+    Exports a whole level written by subdivide_to_files() as one binary PLY.
+    """
+    positions, triangles = open_level(directory, level)
+    write_ply(path, positions, triangles)
+
+def export_tiles_ply(directory, path_format, level):
+    """
+    Exports a level as one PLY per tile, each with its own vertex numbering, for
+    engines that stream terrain in chunks. path_format is formatted with the tile
+    index, e.g. "terrain_{}.ply". Returns the written paths.
+    """
+    positions, triangles = open_level(directory, level)
+    part = np.load(os.path.join(directory, "tiles.npy"))
+    n = 4 ** level
+    paths = []
+    for index in range(int(part.max(initial=-1)) + 1):
+        core = np.nonzero(part == index)[0]
+        if len(core) == 0:
+            continue
+        rows = (core[:, None] * n + np.arange(n)).ravel()
+        used, local = np.unique(triangles[rows], return_inverse=True)
+        path = path_format.format(index)
+        write_ply(path, positions[used], local.reshape(-1, 3))
+        paths.append(path)
+    return paths
@@ -0,0 +1,222 @@
+import numpy as np
+
+import LoopSubdivisionEngine
+import ProcessPool
+from ProcessPool import SharedArray
+
+# Loop subdivision of many meshes, or of one huge mesh, on a pool of worker processes.
+#
+# Inputs and outputs live in shared memory (ProcessPool.SharedArray). Output sizes are
+# known up front from the cage edge count, so workers write their results straight into
+# arrays allocated by the parent and nothing big is ever pickled.
+#
+# A mesh with more than PARTITION_SIZE triangles is split into spatially compact
+# partitions. Each worker subdivides its partition plus a one-ring halo (every face
+# touching a partition vertex): the Loop stencils only reach one ring per level and
+# each level halves the distance, so the descendants of the partition's own faces
+# come out exactly as in the full mesh, at any depth.
+#
+# Partitions are stitched by numbering the refined vertices from the cage element they
+# lie on instead of from the refinement order: a refined vertex is a dyadic point
+# (w0, w1, w2) / 2^L of a cage triangle, and
+#   cage vertex                  -> its cage index
+#   point t / 2^L along edge e   -> V + e * (2^L - 1) + t - 1
+#   point inside cage face f     -> V + E * (2^L - 1) + f * (2^L - 1)(2^L - 2) / 2 + ...
+# Every worker that sees a seam vertex computes the same index for it, so the
+# pieces share their seam vertices without a merge pass. Triangles keep the engine's
+# order (the descendants of cage face f are rows f * 4^L .. (f + 1) * 4^L - 1);
+# vertices are in the order above rather than the engine's.
+
+# Cage triangles above which a single mesh is split across the workers
+PARTITION_SIZE = 200000
+
+def subdivided_size(vertex_count, edge_count, face_count, iterations):
+    """
+    Returns (vertex count, triangle count) after `iterations` Loop subdivision steps.
+    """
+    D = 2 ** iterations
+    return vertex_count + edge_count * (D - 1) + face_count * (D - 1) * (D - 2) // 2, face_count * 4 ** iterations
+
+def partition_faces(positions, triangles, parts):
+    """
+    Splits the faces into `parts` spatially compact groups of equal size by recursive
+    bisection of the face centers along their longest extent. Returns the (F,) part index.
+    """
+    T = np.asarray(triangles).reshape(-1, 3)
+    centers = np.asarray(positions, dtype=np.float64)[T].mean(axis=1)
+    part = np.empty(len(T), dtype=np.int32)
+    stack = [(np.arange(len(T)), 0, parts)]
+    while stack:
+        faces, first, count = stack.pop()
+        if count == 1 or len(faces) <= 1:
+            part[faces] = first
+            continue
+        c = centers[faces]
+        axis = int(np.argmax(c.max(axis=0) - c.min(axis=0)))
+        left = count // 2
+        k = len(faces) * left // count
+        order = np.argpartition(c[:, axis], k)
+        stack.append((faces[order[:k]], first, left))
+        stack.append((faces[order[k:]], first + left, count - left))
+    return part
+
+def _count_edges(triangles, vertex_count):
+    a = triangles.astype(np.int64)
+    b = np.roll(a, -1, axis=1)
+    return len(np.unique(np.minimum(a, b) * vertex_count + np.maximum(a, b)))
+
+def _subdivide_mesh(index, positions, triangles, iterations, out_positions, out_triangles):
+    out_positions[:], out_triangles[:] = LoopSubdivisionEngine.subdivide(positions, triangles, iterations)
+    return index
+
+def _corner_weights(iterations):
+    # Barycentric weights, times 2^L, of the corners of the level-L descendants of a
+    # triangle in the child order of LoopSubdivisionEngine.refine_triangles().
+    # The same for every cage face.
+    w = np.eye(3, dtype=np.int64)[None] * 2 ** iterations
+    for _ in range(iterations):
+        c0, c1, c2 = w[:, 0], w[:, 1], w[:, 2]
+        m01, m12, m20 = (c0 + c1) // 2, (c1 + c2) // 2, (c2 + c0) // 2
+        w = np.stack((
+            np.stack((c0, m01, m20), axis=1),
+            np.stack((m01, c1, m12), axis=1),
+            np.stack((m12, c2, m20), axis=1),
+            np.stack((m01, m12, m20), axis=1),
+        ), axis=1).reshape(-1, 3, 3)
+    return w.reshape(-1, 3)
+
+def canonical_indices(faces, triangles, face_edges, vertex_count, edge_count, iterations):
+    """
+    Global indices of the corners of the level-L descendants of the given cage faces,
+    numbered by the cage element they lie on (see the top of this file).
+    """
+    D = 2 ** iterations
+    w = _corner_weights(iterations)
+    zero = w == 0
+    tri = triangles[faces].astype(np.int64)
+    fe = face_edges[faces].astype(np.int64)
+    ids = np.empty((len(faces), len(w)), dtype=np.int64)
+
+    # Face interior, numbered row by row over w1 = 1 .. D - 2
+    inside = ~zero.any(axis=1)
+    u = w[inside, 1] - 1
+    local = u * (D - 1) - u * (u + 1) // 2 + w[inside, 2] - 1
+    ids[:, inside] = (vertex_count + edge_count * (D - 1) + faces[:, None].astype(np.int64) * ((D - 1) * (D - 2) // 2)
+                      + local)
+
+    # Cage edge j runs from corner j to corner j + 1; t is the weight on its larger vertex
+    for j in range(3):
+        k = (j + 1) % 3
+        on = zero[:, (j + 2) % 3] & ~zero[:, j] & ~zero[:, k]
+        forward = (tri[:, k] > tri[:, j])[:, None]
+        t = np.where(forward, w[on, k], w[on, j])
+        ids[:, on] = vertex_count - 1 + fe[:, j, None] * (D - 1) + t
+
+    # Cage vertices
+    for j in range(3):
+        ids[:, w[:, j] == D] = tri[:, j, None]
+    return ids.reshape(-1, 3)
+
+def partition_halo(triangles, part, index):
+    """
+    Returns (core, halo): the faces of partition `index` and every other face that
+    touches one of their vertices.
+    """
+    core = np.nonzero(part == index)[0]
+    touched = np.zeros(int(triangles.max(initial=-1)) + 1, dtype=bool)
+    touched[triangles[core]] = True
+    halo = np.nonzero(touched[triangles].any(axis=1) & (part != index))[0]
+    return core, halo
+
+def write_partition(positions, triangles, core, cage_triangles, face_edges, vertex_count, edge_count, level,
+                    out_positions, out_triangles):
+    """
+    Writes the level-`level` descendants of the cage faces core into the whole mesh
+    arrays out_positions and out_triangles. positions and triangles are the refined
+    partition, whose first len(core) * 4^level faces descend from core.
+    """
+    n = 4 ** level
+    T = triangles[:len(core) * n].ravel()
+    ids = canonical_indices(core, cage_triangles, face_edges, vertex_count, edge_count, level)
+
+    global_index = np.full(len(positions), -1, dtype=np.int64)
+    global_index[T] = ids.ravel()
+    written = global_index >= 0
+    out_positions[global_index[written]] = positions[written]
+    out_triangles[(core[:, None] * n + np.arange(n)).ravel()] = ids
+
+def _subdivide_partition(mesh, index, positions, triangles, face_edges, part, edge_count, iterations,
+                         out_positions, out_triangles):
+    core, halo = partition_halo(triangles, part, index)
+    if len(core) == 0:
+        return mesh
+    used, local = np.unique(triangles[np.concatenate((core, halo))], return_inverse=True)
+    P, T = LoopSubdivisionEngine.subdivide(positions[used], local.reshape(-1, 3), iterations)
+    write_partition(P, T, core, triangles, face_edges, len(positions), edge_count, iterations,
+                    out_positions, out_triangles)
+    return mesh
+
+def subdivide_meshes(meshes, iterations=1, workers=None, partition_size=PARTITION_SIZE):
+    """
+    Loop subdivides a list of (positions, triangles) meshes on a process pool.
+    Yields (index, positions, triangles) as meshes finish. The arrays are views of
+    shared memory that is released when the next item is requested, so write them
+    out (or copy them) right away.
+    Meshes with more than partition_size triangles are split across the workers.
+    """
+    workers = workers or ProcessPool.default_worker_count()
+    inputs = []
+    outputs = []
+    extras = []
+    try:
+        for positions, triangles in meshes:
+            inputs.append((SharedArray.copy(np.asarray(positions).reshape(-1, 3), np.float64),
+                           SharedArray.copy(np.asarray(triangles).reshape(-1, 3), np.int32)))
+        split = [len(T.array) > partition_size and workers > 1 for P, T in inputs]
+
+        with ProcessPool.ProcessPool(workers) as pool:
+            # Exact output sizes need the edge counts. Whole meshes are counted by the
+            # workers, partitioned ones need their face edges here anyway.
+            whole = [i for i in range(len(inputs)) if not split[i]]
+            edge_counts = dict(zip(whole, pool.map(
+                (_count_edges, (inputs[i][1], len(inputs[i][0].array))) for i in whole)))
+
+            tasks = []
+            remaining = np.zeros(len(inputs), dtype=np.int64)
+            for i, (P, T) in enumerate(inputs):
+                if split[i]:
+                    edges, face_edges, _, _ = LoopSubdivisionEngine.build_edges(T.array, len(P.array))
+                    edge_counts[i] = len(edges)
+                    face_edges = SharedArray.copy(face_edges, np.int32)
+                    part = SharedArray.copy(partition_faces(P.array, T.array, workers))
+                    extras += [face_edges, part]
+
+                vertex_count, face_count = subdivided_size(len(P.array), edge_counts[i], len(T.array), iterations)
+                out_P = SharedArray((vertex_count, 3), np.float64)
+                out_T = SharedArray((face_count, 3), np.int32)
+                outputs.append((out_P, out_T))
+
+                if split[i]:
+                    for index in range(workers):
+                        tasks.append((face_count // workers, (_subdivide_partition, (
+                            i, index, P, T, face_edges, part, edge_counts[i], iterations, out_P, out_T))))
+                    remaining[i] = workers
+                else:
+                    tasks.append((face_count, (_subdivide_mesh, (i, P, T, iterations, out_P, out_T))))
+                    remaining[i] = 1
+
+            # Biggest tasks first keeps the workers busy until the end
+            tasks.sort(key=lambda task: -task[0])
+            for i in pool.imap_unordered(task for size, task in tasks):
+                remaining[i] -= 1
+                if remaining[i] == 0:
+                    out_P, out_T = outputs[i]
+                    yield i, out_P.array, out_T.array
+                    out_P.unlink()
+                    out_T.unlink()
+    finally:
+        for shared in [a for pair in inputs + outputs for a in pair] + extras:
+            try:
+                shared.unlink()
+            except FileNotFoundError:
+                pass
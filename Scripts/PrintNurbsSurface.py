@@ -1,4 +1,12 @@
 import bpy
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.append(SCRIPTS_DIR)
+
+import NurbsEvaluation
 
 def compute_knot_vector(points_count, order, use_endpoint, use_cyclic):
     """
@@ -96,9 +104,10 @@ def print_nurbs_math():
 
             knots_u = None
             knots_v = None
-            if bez_u or bez_v:
-                knots_u = "Computed by Blender based on the above parameters"
-                knots_v = knots_u
+            if bez_u or bez_v or cyc_u or cyc_v:
+                # Blender's own layout (not normalized), see NurbsEvaluation.knot_vector()
+                knots_u = NurbsEvaluation.knot_vector(points_u, order_u, end_u, cyc_u, bez_u).tolist()
+                knots_v = NurbsEvaluation.knot_vector(points_v, order_v, end_v, cyc_v, bez_v).tolist()
             else:
                 knots_u = compute_knot_vector(points_u, order_u, end_u, cyc_u)
                 knots_v = compute_knot_vector(points_v, order_v, end_v, cyc_v)
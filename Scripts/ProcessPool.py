@@ -0,0 +1,146 @@
+import multiprocessing
+import os
+import sys
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Process pool that also works from inside Blender, plus NumPy arrays in shared
+# memory so big meshes reach the workers without being pickled.
+#
+# Workers are started with the 'spawn' method: fork would copy Blender's whole
+# process state, and it is not available on Windows. A spawned worker is a plain
+# Python interpreter; it gets the parent's sys.path, so task functions must live
+# in importable modules that do not import bpy.
+
+def default_worker_count():
+    return os.cpu_count() or 1
+
+def _python_executable():
+    # Since Blender 2.91 sys.executable is the bundled Python, before that it was blender itself
+    executable = sys.executable
+    if os.path.basename(executable).lower().startswith("blender"):
+        for name in ("python.exe", "python3", "python"):
+            candidate = os.path.join(sys.prefix, "bin", name)
+            if os.path.exists(candidate):
+                return candidate
+    return executable
+
+@contextmanager
+def _hidden_main():
+    # Spawned workers re-import the parent's __main__ from __main__.__spec__ or
+    # __main__.__file__. In Blender that is the running script or a text block, which
+    # imports bpy, so hide it while the workers start.
+    main = sys.modules["__main__"]
+    saved_spec = getattr(main, "__spec__", None)
+    saved_file = getattr(main, "__file__", None)
+    main.__spec__ = None
+    if saved_file is not None:
+        del main.__file__
+    try:
+        yield
+    finally:
+        main.__spec__ = saved_spec
+        if saved_file is not None:
+            main.__file__ = saved_file
+
+class SharedArray:
+    """
+    NumPy array in a named shared memory block. It pickles as its name, shape and
+    dtype, so passing it to a worker attaches to the same memory instead of copying.
+    The process that created it calls unlink() when done; others only close().
+    """
+
+    def __init__(self, shape, dtype, name=None):
+        self.shape = tuple(int(n) for n in shape)
+        self.dtype = np.dtype(dtype)
+        nbytes = max(int(np.prod(self.shape)) * self.dtype.itemsize, 1)
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf)
+
+    @classmethod
+    def copy(cls, array, dtype=None):
+        array = np.asarray(array, dtype=dtype)
+        shared = cls(array.shape, array.dtype)
+        shared.array[...] = array
+        return shared
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def __getstate__(self):
+        return self.name, self.shape, self.dtype.str
+
+    def __setstate__(self, state):
+        name, shape, dtype = state
+        self.__init__(shape, dtype, name)
+
+    def close(self):
+        self.array = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # A view is still alive (e.g. in a traceback); the mapping goes with it
+            pass
+
+    def unlink(self):
+        self.close()
+        self._shm.unlink()
+
+def _run_task(task):
+    # Shared arrays are handed to the function as plain arrays and closed afterwards
+    function, args = task
+    try:
+        return function(*[a.array if isinstance(a, SharedArray) else a for a in args])
+    finally:
+        for a in args:
+            if isinstance(a, SharedArray):
+                a.close()
+
+class ProcessPool:
+    """
+    Pool of spawned worker processes. Tasks are (function, args) tuples; any
+    SharedArray in args arrives in the worker as a NumPy array view of the shared memory.
+    Use it as a context manager so the workers are always shut down.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or default_worker_count()
+        context = multiprocessing.get_context("spawn")
+        context.set_executable(_python_executable())
+        with _hidden_main():
+            self._pool = context.Pool(self.workers)
+
+    def map(self, tasks):
+        """
+        Runs the tasks and returns their results in order.
+        """
+        return self._pool.map(_run_task, list(tasks), chunksize=1)
+
+    def imap_unordered(self, tasks):
+        """
+        Runs the tasks and yields their results as they finish.
+        """
+        return self._pool.imap_unordered(_run_task, list(tasks), chunksize=1)
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    def terminate(self):
+        self._pool.terminate()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
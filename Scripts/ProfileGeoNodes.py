@@ -0,0 +1,422 @@
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+try:
+    import bpy
+except ImportError:
+    # Outside Blender only --diff works
+    bpy = None
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.append(SCRIPTS_DIR)
+
+# Profiles a Geometry Nodes modifier, e.g. one made by LoopSubdivisionGeoNodes/*.py.
+#
+#   blender --background scene.blend --python Scripts/ProfileGeoNodes.py -- --object Cube [options]
+#   python Scripts/ProfileGeoNodes.py --diff old.json new.json
+#
+# Sweep: the whole modifier stack is evaluated for every Iterations value, best of REPEATS.
+#
+# Nodes: Blender does not expose its per-node timings to Python, so they are measured
+# by prefix timing. For every node with a geometry output, a copy of the node group is
+# evaluated with that output wired to the group output (or, inside a Repeat Zone, to the
+# zone's Repeat Output), which times everything up to and including the node. A node's
+# own time is its prefix time minus the largest prefix time of the nodes feeding its
+# geometry inputs. Fields are evaluated by the geometry node that consumes them, so the
+# time of Math, Sample Index, Blur Attribute etc. is counted in that node. Group nodes
+# with a geometry output are expanded, their nodes are reported as "group node/node".
+# Per-iteration: for iteration k the modifier's input is replaced by its own result at
+# Iterations = k - 1, and the group runs with Iterations = 1.
+#
+# Node times are summed per frame (NodeFrame). Reports are JSON; --diff compares two of
+# them by node type, by frame and by total, e.g. before and after a GENERATOR_VERSION bump.
+
+REPEATS = 3
+ITERATIONS = (1, 2, 3)
+# Frame of the nodes that are in none
+NO_FRAME = "(no frame)"
+
+# --- Evaluation ---
+
+def _input_identifier(mod, name):
+    for item in mod.node_group.interface.items_tree:
+        if item.item_type == 'SOCKET' and item.in_out == 'INPUT' and item.name == name:
+            return item.identifier
+    return None
+
+def evaluation_time(obj, repeats=REPEATS):
+    """
+    Best wall time of evaluating the object's modifier stack.
+    """
+    best = math.inf
+    for _ in range(repeats):
+        obj.update_tag()
+        start = time.perf_counter()
+        bpy.context.view_layer.update()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _evaluated_counts(obj):
+    evaluated = obj.evaluated_get(bpy.context.evaluated_depsgraph_get())
+    me = evaluated.to_mesh()
+    try:
+        return len(me.vertices), len(me.polygons)
+    finally:
+        evaluated.to_mesh_clear()
+
+def sweep(obj, mod, iterations=ITERATIONS, repeats=REPEATS):
+    """
+    Evaluation time and output size of the modifier stack for every Iterations value.
+    """
+    identifier = _input_identifier(mod, "Iterations")
+    if identifier is None:
+        raise ValueError(f"Node group {mod.node_group.name} has no 'Iterations' input")
+    previous = mod[identifier]
+    records = []
+    try:
+        for level in iterations:
+            mod[identifier] = level
+            seconds = evaluation_time(obj, repeats)
+            vertices, faces = _evaluated_counts(obj)
+            records.append({"iterations": level, "seconds": seconds, "vertices": vertices, "faces": faces})
+            print(f"Iterations {level}: {seconds:.4f}s, {vertices} vertices, {faces} faces")
+    finally:
+        mod[identifier] = previous
+    return records
+
+# --- Node graph ---
+
+def _geometry_output(node):
+    for socket in node.outputs:
+        if socket.type == 'GEOMETRY' and socket.enabled:
+            return socket
+    return None
+
+def _geometry_input(node):
+    for socket in node.inputs:
+        if socket.type == 'GEOMETRY' and socket.enabled:
+            return socket
+    return None
+
+def _expands(node):
+    # Group nodes that process geometry are profiled node by node
+    return (node.bl_idname == 'GeometryNodeGroup' and node.node_tree is not None
+            and _geometry_output(node) is not None)
+
+def _reachable(tree, start, forward):
+    edges = {}
+    for link in tree.links:
+        a, b = (link.from_node.name, link.to_node.name) if forward else (link.to_node.name, link.from_node.name)
+        edges.setdefault(a, []).append(b)
+    seen = {start.name}
+    stack = [start.name]
+    while stack:
+        for name in edges.get(stack.pop(), ()):
+            if name not in seen:
+                seen.add(name)
+                stack.append(name)
+    return seen
+
+def _exit_node(tree, node):
+    """
+    The node whose geometry input ends the node's scope: the innermost Repeat Output
+    of a zone containing it, otherwise the group output.
+    """
+    best = None
+    for zone_in in tree.nodes:
+        if zone_in.bl_idname != 'GeometryNodeRepeatInput':
+            continue
+        zone_out = zone_in.paired_output
+        inside = _reachable(tree, zone_in, True) & _reachable(tree, zone_out, False)
+        if node.name in inside and node is not zone_out and (best is None or len(inside) < best[0]):
+            best = (len(inside), zone_out)
+    if best is not None:
+        return best[1]
+    for candidate in tree.nodes:
+        if candidate.bl_idname == 'NodeGroupOutput' and candidate.is_active_output:
+            return candidate
+    raise ValueError(f"Node group {tree.name} has no group output")
+
+def _profiled_nodes(tree, path=()):
+    """
+    (path, node name) of every node with a geometry output, nested groups included.
+    """
+    found = []
+    for node in tree.nodes:
+        if node.bl_idname == 'NodeFrame' or _geometry_output(node) is None:
+            continue
+        found.append((path, node.name))
+        if _expands(node):
+            found += _profiled_nodes(node.node_tree, path + (node.name,))
+    return found
+
+def _copy_along(root, path):
+    """
+    Copies root and the groups along path, so the last copy can be edited. Returns
+    the copies; they lose their generator key so they are never reused.
+    """
+    import NodeGroupReuse
+    copies = [root.copy()]
+    for name in path:
+        node = copies[-1].nodes[name]
+        node.node_tree = node.node_tree.copy()
+        copies.append(node.node_tree)
+    for copy in copies:
+        if NodeGroupReuse.GENERATOR_KEY in copy:
+            del copy[NodeGroupReuse.GENERATOR_KEY]
+    return copies
+
+def _prefix_time(obj, mod, root, path, name, repeats):
+    copies = _copy_along(root, path)
+    tree = copies[-1]
+    node = tree.nodes[name]
+    exit_socket = _geometry_input(_exit_node(tree, node))
+    for link in list(exit_socket.links):
+        tree.links.remove(link)
+    tree.links.new(_geometry_output(node), exit_socket)
+    try:
+        mod.node_group = copies[0]
+        return evaluation_time(obj, repeats)
+    finally:
+        mod.node_group = root
+        for copy in copies:
+            bpy.data.node_groups.remove(copy)
+
+def _predecessors(root, path, name):
+    """
+    Geometry nodes feeding the node, as (path, name). A nested group input is fed by
+    whatever feeds its group node.
+    """
+    tree = root
+    for step in path:
+        tree = tree.nodes[step].node_tree
+    node = tree.nodes[name]
+    if node.bl_idname == 'NodeGroupInput':
+        return _predecessors(root, path[:-1], path[-1]) if path else []
+    found = []
+    for socket in node.inputs:
+        if socket.type != 'GEOMETRY':
+            continue
+        for link in socket.links:
+            found.append((path, link.from_node.name))
+    return found
+
+def _frame(root, path, name):
+    tree = root
+    for step in path:
+        tree = tree.nodes[step].node_tree
+    node = tree.nodes[name]
+    parent = node.parent
+    if parent is None and path:
+        return _frame(root, path[:-1], path[-1])
+    return (parent.label or parent.name) if parent is not None else NO_FRAME
+
+def profile_nodes(obj, mod, repeats=REPEATS):
+    """
+    Own time of every geometry node of the modifier's node group, for the current
+    input and inputs. Returns a report: total, nodes and frames sorted by time.
+    """
+    root = mod.node_group
+    total = evaluation_time(obj, repeats)
+    prefix = {}
+    for path, name in _profiled_nodes(root):
+        prefix[path, name] = _prefix_time(obj, mod, root, path, name, repeats)
+
+    nodes = []
+    for (path, name), seconds in prefix.items():
+        tree = root
+        for step in path:
+            tree = tree.nodes[step].node_tree
+        node = tree.nodes[name]
+        if _expands(node):
+            continue
+        before = [prefix[p] for p in _predecessors(root, path, name) if p in prefix]
+        nodes.append({
+            "node": "/".join(path + (name,)),
+            "type": node.bl_idname,
+            "label": node.label,
+            "frame": _frame(root, path, name),
+            "seconds": max(seconds - max(before, default=0.0), 0.0),
+        })
+
+    frames = {}
+    for record in nodes:
+        record["share"] = record["seconds"] / total if total > 0 else 0.0
+        frames[record["frame"]] = frames.get(record["frame"], 0.0) + record["seconds"]
+    nodes.sort(key=lambda record: record["seconds"], reverse=True)
+    frames = [{"frame": frame, "seconds": seconds, "share": seconds / total if total > 0 else 0.0}
+              for frame, seconds in sorted(frames.items(), key=lambda item: item[1], reverse=True)]
+    return {"total": total, "nodes": nodes, "frames": frames}
+
+def _bake(obj, mod, identifier, level):
+    """
+    New mesh of the object's stack up to and including mod, at Iterations = level.
+    """
+    later = obj.modifiers[list(obj.modifiers).index(mod) + 1:]
+    shown = [m.show_viewport for m in later]
+    previous = mod[identifier]
+    try:
+        for m in later:
+            m.show_viewport = False
+        mod[identifier] = level
+        obj.update_tag()
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        return bpy.data.meshes.new_from_object(obj.evaluated_get(depsgraph), preserve_all_data_layers=True,
+                                               depsgraph=depsgraph)
+    finally:
+        mod[identifier] = previous
+        for m, show in zip(later, shown):
+            m.show_viewport = show
+
+def profile_iterations(obj, mod, iterations=ITERATIONS, repeats=REPEATS):
+    """
+    profile_nodes() of every iteration: iteration k runs once on the result of k - 1.
+    """
+    identifier = _input_identifier(mod, "Iterations")
+    if identifier is None:
+        raise ValueError(f"Node group {mod.node_group.name} has no 'Iterations' input")
+    original = obj.data
+    others = [(m, m.show_viewport) for m in obj.modifiers if m is not mod]
+    previous = mod[identifier]
+    levels = []
+    for level in iterations:
+        me = _bake(obj, mod, identifier, level - 1)
+        counts = {"input_vertices": len(me.vertices), "input_faces": len(me.polygons)}
+        try:
+            obj.data = me
+            for m, _ in others:
+                m.show_viewport = False
+            mod[identifier] = 1
+            report = profile_nodes(obj, mod, repeats)
+        finally:
+            obj.data = original
+            for m, show in others:
+                m.show_viewport = show
+            mod[identifier] = previous
+            bpy.data.meshes.remove(me)
+        report["iteration"] = level
+        report.update(counts)
+        levels.append(report)
+        print(format_report(report))
+    return levels
+
+# --- Reports ---
+
+def format_report(report, limit=25):
+    lines = [f"Iteration {report['iteration']}: {report['total']:.4f}s on {report['input_vertices']} vertices, "
+             f"{report['input_faces']} faces"]
+    for record in report["nodes"][:limit]:
+        lines.append(f"  {record['share'] * 100:5.1f}%  {record['seconds']:.4f}s  {record['node']}"
+                     f"  ({record['type']}{', ' + record['label'] if record['label'] else ''})")
+    if len(report["frames"]) > 1 or report["frames"] and report["frames"][0]["frame"] != NO_FRAME:
+        lines.append("  Frames:")
+        for record in report["frames"]:
+            lines.append(f"  {record['share'] * 100:5.1f}%  {record['seconds']:.4f}s  {record['frame']}")
+    return "\n".join(lines)
+
+def _by(report, field):
+    totals = {}
+    for record in report["nodes"]:
+        totals[record[field]] = totals.get(record[field], 0.0) + record["seconds"]
+    return totals
+
+def diff_reports(old, new):
+    """
+    Returns lines comparing two profiles: sweep times, and per iteration the total and
+    the time per node type and per frame. Node names are not compared, they change
+    between generator versions.
+    """
+    def change(a, b):
+        if a is None or b is None:
+            return f"{'-' if a is None else f'{a:.4f}s'} -> {'-' if b is None else f'{b:.4f}s'}"
+        ratio = f" ({b / a:.2f}x)" if a > 0 else ""
+        return f"{a:.4f}s -> {b:.4f}s{ratio}"
+
+    lines = []
+    old_sweep = {r["iterations"]: r for r in old.get("sweep", [])}
+    for r in new.get("sweep", []):
+        before = old_sweep.get(r["iterations"])
+        lines.append(f"Iterations {r['iterations']}: {change(before and before['seconds'], r['seconds'])}")
+
+    old_levels = {r["iteration"]: r for r in old.get("levels", [])}
+    for r in new.get("levels", []):
+        before = old_levels.get(r["iteration"])
+        if before is None:
+            continue
+        lines.append(f"Iteration {r['iteration']}: {change(before['total'], r['total'])}")
+        for field in ("type", "frame"):
+            a, b = _by(before, field), _by(r, field)
+            keys = sorted(set(a) | set(b), key=lambda k: abs(b.get(k, 0.0) - a.get(k, 0.0)), reverse=True)
+            if field == "frame" and keys == [NO_FRAME]:
+                continue
+            for k in keys:
+                lines.append(f"  {k}: {change(a.get(k), b.get(k))}")
+    return lines
+
+def write_report(path, report):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=1)
+
+def read_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+def profile(obj, mod, iterations=ITERATIONS, repeats=REPEATS, nodes=True):
+    """
+    Sweep and, with nodes, per-iteration node profile of a Geometry Nodes modifier.
+    """
+    import NodeGroupReuse
+    return {
+        "environment": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "blender": bpy.app.version_string,
+            "object": obj.name,
+            "modifier": mod.name,
+            "node_group": mod.node_group.name,
+            "generator_key": mod.node_group.get(NodeGroupReuse.GENERATOR_KEY),
+        },
+        "sweep": sweep(obj, mod, iterations, repeats),
+        "levels": profile_iterations(obj, mod, iterations, repeats) if nodes else [],
+    }
+
+def _arguments():
+    # Blender passes the script's own arguments after "--"
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    parser = argparse.ArgumentParser(description="Profiles a Geometry Nodes modifier.")
+    parser.add_argument("--object", help="object to profile, default the active object")
+    parser.add_argument("--modifier", help="Geometry Nodes modifier, default the first one")
+    parser.add_argument("--iterations", nargs="+", type=int, default=list(ITERATIONS))
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--sweep-only", action="store_true", help="skip the per-node profile")
+    parser.add_argument("--output", help="report JSON file")
+    parser.add_argument("--baseline", help="report JSON file to compare against")
+    parser.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"), help="compare two report files and exit")
+    return parser.parse_args(argv)
+
+# --- Execution ---
+if __name__ == "__main__":
+    args = _arguments()
+    if args.diff:
+        print("\n".join(diff_reports(read_report(args.diff[0]), read_report(args.diff[1]))))
+        sys.exit(0)
+    if bpy is None:
+        sys.exit("Profiling needs Blender, only --diff runs outside it.")
+
+    obj = bpy.data.objects[args.object] if args.object else bpy.context.active_object
+    if obj is None:
+        sys.exit("No object to profile.")
+    mods = [m for m in obj.modifiers if m.type == 'NODES' and (args.modifier is None or m.name == args.modifier)]
+    if not mods or mods[0].node_group is None:
+        sys.exit(f"{obj.name} has no Geometry Nodes modifier to profile.")
+
+    report = profile(obj, mods[0], args.iterations, args.repeats, not args.sweep_only)
+    if args.output:
+        write_report(args.output, report)
+        print(f"Wrote {args.output}")
+    if args.baseline:
+        print("\n".join(diff_reports(read_report(args.baseline), report)))
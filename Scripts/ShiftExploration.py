@@ -0,0 +1,263 @@
+import csv
+import itertools
+import math
+
+import numpy as np
+
+import CurvatureFields
+import NurbsContinuity
+import NurbsEvaluation
+import NurbsTessellation
+import ProcessPool
+
+# Scores variants of a NURBS surface made by moving control points, offline and in
+# parallel. Only NumPy is used, so the variants can be scored on a ProcessPool.
+#
+# A study is a list of groups of named options, an option being a list of (old, new)
+# control point moves as in MoveNurbsControlVertex.move_nurbs_control_points(). Every
+# combination of one option per group is a variant; its moves are applied together.
+#
+# Every variant is scored on:
+#   - self-intersections: pairs of triangles of its tessellation (NurbsTessellation.py)
+#     that cross without sharing a vertex
+#   - continuity: seams below G2 (NurbsContinuity.py), their worst normal angle and
+#     curvature jump
+#   - curvature smoothness: the integral of |grad H|^2, H the mean curvature, times the
+#     squared model size, and the bending energy, the integral of k1^2 + k2^2; both do
+#     not depend on the model's size
+# and ranked by self-intersections, then G2 failures, then curvature variation.
+
+EPSILON = 1e-6
+# Samples per direction of the curvature integrals
+CURVATURE_RESOLUTION = 48
+# Tessellation for the self-intersection test, relative to the model size
+TESSELLATION_TOLERANCE = 1e-3
+TESSELLATION_DEPTH = 6
+
+COLUMNS = ("rank", "variant", "self_intersections", "g2_failures", "max_angle", "curvature_jump",
+           "curvature_variation", "bending_energy", "moved_points", "unmatched_moves")
+
+# --- Variants ---
+
+def variants(groups):
+    """
+    Every combination of one option per group: a list of (name, moves).
+    groups is a list of {option name: [(old, new), ...]} dicts.
+    """
+    result = []
+    for options in itertools.product(*[list(group.items()) for group in groups]):
+        name = " + ".join(option_name for option_name, _ in options)
+        result.append((name, [move for _, moves in options for move in moves]))
+    return result
+
+def apply_moves(control_points, moves, epsilon=EPSILON):
+    """
+    Moves the control points of several (V, U, 4) grids together: every point within
+    epsilon of an old position (per coordinate) goes to its new one, matched against the
+    positions before the move. Points claimed by moves with different new positions stay.
+    Returns (moved grids, moved point count, unmatched move count).
+    """
+    sizes = [grid.size // 4 for grid in control_points]
+    points = np.concatenate([np.asarray(grid, dtype=np.float64).reshape(-1, 4) for grid in control_points])
+    olds = np.array([old for old, _ in moves], dtype=np.float64).reshape(-1, 3)
+    news = np.array([new for _, new in moves], dtype=np.float64).reshape(-1, 3)
+    if len(olds) == 0:
+        # e.g. a "no shift" baseline option
+        return [np.array(grid, dtype=np.float64) for grid in control_points], 0, 0
+
+    # (points, moves) matches
+    match = np.all(np.abs(points[:, None, :3] - olds[None]) <= epsilon, axis=2)
+    claimed = match.any(axis=1)
+    target = np.argmax(match, axis=1)
+    conflicting = np.any(match & np.any(news[None] != news[target][:, None], axis=2), axis=1)
+    moved = claimed & ~conflicting
+    points[moved, :3] = news[target[moved]]
+
+    grids = [block.reshape(grid.shape) for block, grid in zip(np.split(points, np.cumsum(sizes)[:-1]), control_points)]
+    return grids, int(moved.sum()), int((~match.any(axis=0)).sum())
+
+# --- Self-intersection ---
+
+def _candidate_pairs(positions, triangles):
+    """
+    Pairs (i < j) of triangles whose bounds share a cell of a hashed grid.
+    """
+    corners = positions[triangles]
+    low = corners.min(axis=1)
+    high = corners.max(axis=1)
+    size = max(float(np.mean(high - low)) * 2.0, 1e-300)
+    cell_low = np.floor(low / size).astype(np.int64)
+    cell_high = np.floor(high / size).astype(np.int64)
+    extent = cell_high - cell_low + 1
+
+    triangle_index = []
+    cells = []
+    for offset in itertools.product(*[range(int(extent[:, k].max())) for k in range(3)]):
+        inside = np.all(np.array(offset) < extent, axis=1)
+        triangle_index.append(np.nonzero(inside)[0])
+        cells.append(cell_low[inside] + offset)
+    triangle_index = np.concatenate(triangle_index)
+    cells = np.concatenate(cells)
+    _, key = np.unique(cells, axis=0, return_inverse=True)
+    key = key.ravel()
+    order = np.argsort(key, kind='stable')
+    key = key[order]
+    triangle_index = triangle_index[order]
+
+    pairs = []
+    for shift in range(1, len(key)):
+        same = key[shift:] == key[:-shift]
+        if not same.any():
+            break
+        pairs.append(np.stack((triangle_index[:-shift][same], triangle_index[shift:][same]), axis=1))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.sort(np.concatenate(pairs), axis=1)
+    pairs = np.unique(pairs[pairs[:, 0] != pairs[:, 1]], axis=0)
+    overlap = np.all((low[pairs[:, 0]] <= high[pairs[:, 1]]) & (low[pairs[:, 1]] <= high[pairs[:, 0]]), axis=1)
+    return pairs[overlap]
+
+def _segments_cross(start, end, triangles):
+    """
+    Whether the segments cross the (S, 3, 3) triangles (Moller-Trumbore).
+    """
+    direction = end - start
+    edge1 = triangles[:, 1] - triangles[:, 0]
+    edge2 = triangles[:, 2] - triangles[:, 0]
+    p = np.cross(direction, edge2)
+    det = np.einsum('sd,sd->s', edge1, p)
+    scale = np.linalg.norm(edge1, axis=1) * np.linalg.norm(edge2, axis=1) * np.linalg.norm(direction, axis=1)
+    valid = np.abs(det) > 1e-12 * np.maximum(scale, 1e-300)
+    inverse = 1.0 / np.where(valid, det, 1.0)
+    s = start - triangles[:, 0]
+    u = np.einsum('sd,sd->s', s, p) * inverse
+    q = np.cross(s, edge1)
+    v = np.einsum('sd,sd->s', direction, q) * inverse
+    t = np.einsum('sd,sd->s', edge2, q) * inverse
+    return valid & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0) & (t <= 1)
+
+def self_intersections(positions, triangles):
+    """
+    Number of pairs of triangles that cross each other and share no vertex.
+    """
+    pairs = _candidate_pairs(positions, triangles)
+    first = triangles[pairs[:, 0]]
+    second = triangles[pairs[:, 1]]
+    adjacent = np.any(first[:, :, None] == second[:, None, :], axis=(1, 2))
+    first = positions[first[~adjacent]]
+    second = positions[second[~adjacent]]
+    crossing = np.zeros(len(first), dtype=bool)
+    for a, b in ((first, second), (second, first)):
+        for k in range(3):
+            crossing |= _segments_cross(a[:, k], a[:, (k + 1) % 3], b)
+    return int(crossing.sum())
+
+# --- Scoring ---
+
+def curvature_measures(patches, scale, resolution=CURVATURE_RESOLUTION):
+    """
+    (curvature variation, bending energy) of the patches, see the top of the file.
+    """
+    variation = 0.0
+    bending = 0.0
+    spacing = 1.0 / (resolution - 1)
+    for patch in patches:
+        d = patch.evaluate_grid(resolution, resolution, derivatives=2)
+        Su, Sv = d[1, 0], d[0, 1]
+        E = np.einsum('vud,vud->vu', Su, Su)
+        F = np.einsum('vud,vud->vu', Su, Sv)
+        G = np.einsum('vud,vud->vu', Sv, Sv)
+        det = E * G - F * F
+        valid = det > 1e-12 * np.maximum(E * G, 1e-300)
+        det = np.where(valid, det, 1.0)
+        fields = CurvatureFields.surface_curvature(d)
+        H = np.nan_to_num(fields["mean"])
+        K = np.nan_to_num(fields["gaussian"])
+        Hv, Hu = np.gradient(H, spacing)
+        gradient = (G * Hu * Hu - 2 * F * Hu * Hv + E * Hv * Hv) / det
+        area = np.sqrt(det) * spacing * spacing
+        variation += float(np.sum(np.where(valid, gradient * area, 0.0)))
+        bending += float(np.sum(np.where(valid, (4 * H * H - 2 * K) * area, 0.0)))
+    return variation * scale * scale, bending
+
+def score_variant(patches):
+    """
+    Metrics of one variant, a dict with the COLUMNS from self_intersections on.
+    """
+    seams, scale = NurbsContinuity.analyze_patches(patches)
+    broken = [s for s in seams if s["continuity"] < 2]
+    positions, triangles, _ = NurbsTessellation.tessellate_patches(
+        patches, TESSELLATION_TOLERANCE * scale, max_depth=TESSELLATION_DEPTH, workers=1)
+    variation, bending = curvature_measures(patches, scale)
+    return {
+        "self_intersections": self_intersections(positions, triangles),
+        "g2_failures": len(broken),
+        "max_angle": math.degrees(max((s["angle"] for s in seams), default=0.0)),
+        "curvature_jump": max((s["curvature"] for s in seams), default=0.0) * scale,
+        "curvature_variation": variation,
+        "bending_energy": bending,
+    }
+
+def _patch_arguments(patch):
+    return (patch.order_u, patch.order_v, patch.use_endpoint_u, patch.use_endpoint_v,
+            patch.use_cyclic_u, patch.use_cyclic_v, patch.use_bezier_u, patch.use_bezier_v)
+
+def _score_task(index, name, control_points, arguments, moves, epsilon):
+    record = {"variant": name}
+    try:
+        grids, record["moved_points"], record["unmatched_moves"] = apply_moves(control_points, moves, epsilon)
+        patches = [NurbsEvaluation.NurbsSurface(grid, *a) for grid, a in zip(grids, arguments)]
+        record.update(score_variant(patches))
+    except ValueError as error:
+        # e.g. an order that no longer fits; ranked last
+        record["error"] = str(error)
+    return index, record
+
+def rank_key(record):
+    if "error" in record:
+        return (1, 0, 0, 0.0)
+    return (0, record["self_intersections"], record["g2_failures"], record["curvature_variation"])
+
+def explore(patches, groups, epsilon=EPSILON, workers=None):
+    """
+    Scores every variant of the patches on a process pool. Returns the records, ranked.
+    """
+    control_points = [patch.control_points for patch in patches]
+    arguments = [_patch_arguments(patch) for patch in patches]
+    tasks = [(_score_task, (i, name, control_points, arguments, moves, epsilon))
+             for i, (name, moves) in enumerate(variants(groups))]
+    workers = min(workers or ProcessPool.default_worker_count(), len(tasks))
+    if workers <= 1:
+        records = [function(*args)[1] for function, args in tasks]
+    else:
+        records = [None] * len(tasks)
+        with ProcessPool.ProcessPool(workers) as pool:
+            for index, record in pool.imap_unordered(tasks):
+                records[index] = record
+    records.sort(key=rank_key)
+    for rank, record in enumerate(records, 1):
+        record["rank"] = rank
+    return records
+
+# --- Tables ---
+
+def _cell(record, column):
+    value = record.get(column, "")
+    return f"{value:.4g}" if isinstance(value, float) else str(value)
+
+def format_table(records, limit=None):
+    """
+    Lines of an aligned table of the ranked records.
+    """
+    rows = [list(COLUMNS)] + [[_cell(record, column) for column in COLUMNS] for record in records[:limit]]
+    widths = [max(len(row[k]) for row in rows) for k in range(len(COLUMNS))]
+    lines = ["  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows]
+    lines += [f"{record['variant']}: {record['error']}" for record in records[:limit] if "error" in record]
+    return lines
+
+def write_table(records, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS + ("error",))
+        for record in records:
+            writer.writerow([_cell(record, column) for column in COLUMNS + ("error",)])
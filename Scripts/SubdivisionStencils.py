@@ -0,0 +1,259 @@
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+# Sparse stencil matrices for subdivision schemes and a cache for them.
+# A stencil maps control point positions to refined positions:
+#   refined = stencil.apply(control)
+# so once the stencil of a topology is known, re-subdividing after a
+# vertex-only edit is a single sparse matrix-vector product.
+#
+# Only NumPy is used (Blender does not ship SciPy), the matrix is stored in
+# compressed sparse row form: indptr, indices, weights.
+
+STENCIL_VERSION = 1
+
+class SparseStencil:
+    """
+    Compressed sparse row matrix of shape (row_count, column_count).
+    """
+
+    def __init__(self, indptr, indices, weights, column_count):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.column_count = int(column_count)
+        self._rows = None
+        self._columns = None
+
+    @property
+    def row_count(self):
+        return len(self.indptr) - 1
+
+    @property
+    def shape(self):
+        return (self.row_count, self.column_count)
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes + self.weights.nbytes
+
+    def row_of_entry(self):
+        """
+        Returns the row index of every stored entry.
+        """
+        if self._rows is None:
+            self._rows = np.repeat(np.arange(self.row_count, dtype=np.int32), np.diff(self.indptr))
+        return self._rows
+
+    def _column_index(self):
+        """
+        Returns (column_indptr, rows): the rows of every column's entries, the
+        transposed structure of the matrix without the weights.
+        """
+        if self._columns is None:
+            order = np.argsort(self.indices, kind="stable")
+            column_indptr = np.zeros(self.column_count + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.indices, minlength=self.column_count), out=column_indptr[1:])
+            self._columns = (column_indptr, self.row_of_entry()[order])
+        return self._columns
+
+    def rows_using(self, columns):
+        """
+        Returns the sorted rows that read any of the given columns.
+        """
+        column_indptr, rows = self._column_index()
+        return np.unique(rows[_ranges(column_indptr, np.asarray(columns, dtype=np.int64))])
+
+    def apply_rows(self, values, rows):
+        """
+        Returns (stencil @ values)[rows] without touching the other rows.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        rows = np.asarray(rows, dtype=np.int64)
+        entries = _ranges(self.indptr, rows)
+        local = np.repeat(np.arange(len(rows)), self.indptr[rows + 1] - self.indptr[rows])
+        weights = self.weights[entries]
+        gathered = values[self.indices[entries]]
+        if gathered.ndim == 1:
+            return np.bincount(local, weights=weights * gathered, minlength=len(rows))
+        out = np.empty((len(rows), gathered.shape[1]), dtype=np.float64)
+        for d in range(gathered.shape[1]):
+            out[:, d] = np.bincount(local, weights=weights * gathered[:, d], minlength=len(rows))
+        return out
+
+    @classmethod
+    def from_coo(cls, rows, cols, weights, row_count, column_count):
+        """
+        Builds a stencil from (row, column, weight) triplets.
+        Duplicate entries are summed and rows are sorted by column.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+
+        keys = rows * column_count + cols
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        summed = np.bincount(inverse.ravel(), weights=weights, minlength=len(unique_keys))
+
+        unique_rows = unique_keys // column_count
+        indptr = np.zeros(row_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(unique_rows, minlength=row_count), out=indptr[1:])
+        return cls(indptr, unique_keys % column_count, summed, column_count)
+
+    def apply(self, values):
+        """
+        Returns stencil @ values for a (column_count, D) array.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        rows = self.row_of_entry()
+        gathered = values[self.indices]
+        if gathered.ndim == 1:
+            return np.bincount(rows, weights=self.weights * gathered, minlength=self.row_count)
+        out = np.empty((self.row_count, gathered.shape[1]), dtype=np.float64)
+        for d in range(gathered.shape[1]):
+            out[:, d] = np.bincount(rows, weights=self.weights * gathered[:, d], minlength=self.row_count)
+        return out
+
+    def compose(self, other):
+        """
+        Returns the stencil self @ other, i.e. applying other first.
+        """
+        lengths = np.diff(other.indptr)[self.indices]
+        total = int(lengths.sum())
+
+        rows = np.repeat(self.row_of_entry(), lengths)
+        scale = np.repeat(self.weights, lengths)
+        # Position of each expanded entry inside other's arrays
+        first = np.repeat(other.indptr[self.indices] - (np.cumsum(lengths) - lengths), lengths)
+        positions = first + np.arange(total, dtype=np.int64)
+
+        return SparseStencil.from_coo(
+            rows, other.indices[positions], scale * other.weights[positions],
+            self.row_count, other.column_count)
+
+    def to_arrays(self):
+        return {
+            "indptr": self.indptr,
+            "indices": self.indices,
+            "weights": self.weights,
+            "column_count": np.array(self.column_count, dtype=np.int64),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays["indptr"], arrays["indices"], arrays["weights"], int(arrays["column_count"]))
+
+def _ranges(indptr, items):
+    """
+    Returns the concatenated entry positions indptr[i]:indptr[i + 1] of the given items.
+    """
+    starts = indptr[items]
+    lengths = indptr[items + 1] - starts
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return offsets + np.arange(int(lengths.sum()), dtype=np.int64)
+
+def topology_key(scheme, face_buffer, vertex_count, levels):
+    """
+    Hashes a face index buffer together with everything else the stencil depends on.
+    """
+    h = hashlib.sha256()
+    h.update(f"{scheme}:{STENCIL_VERSION}:{vertex_count}:{levels}:".encode())
+    h.update(np.ascontiguousarray(face_buffer, dtype=np.int32).tobytes())
+    return h.hexdigest()
+
+def _entry_nbytes(entry):
+    return sum(a.nbytes for a in entry.values())
+
+class StencilCache:
+    """
+    Two level LRU cache of compiled stencils, keyed by topology_key().
+    Entries are dicts of NumPy arrays. The in-memory level keeps the most recently
+    used entries up to memory_limit bytes; the disk level stores one .npz file per
+    entry in directory and evicts the least recently used files above disk_limit bytes.
+    """
+
+    def __init__(self, directory=None, memory_limit=512 * 1024**2, disk_limit=4 * 1024**3):
+        self.directory = directory
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key):
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return entry
+
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                entry = {name: data[name] for name in data.files}
+        except (OSError, ValueError):
+            return None
+        # Touch the file so disk eviction sees it as recently used
+        os.utime(path)
+        self._remember(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        self._remember(key, entry)
+        if self.directory:
+            path = self._path(key)
+            tmp_path = path + ".tmp.npz"
+            np.savez(tmp_path, **entry)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+
+    def clear(self):
+        self._memory.clear()
+        self._memory_bytes = 0
+
+    def _remember(self, key, entry):
+        if key in self._memory:
+            self._memory_bytes -= _entry_nbytes(self._memory.pop(key))
+        size = _entry_nbytes(entry)
+        if size > self.memory_limit:
+            return
+        self._memory[key] = entry
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_limit:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= _entry_nbytes(evicted)
+
+    def _evict_disk(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz") and not name.endswith(".tmp.npz"):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_limit:
+                break
+            os.remove(path)
+            total -= size
+
+_default_cache = None
+
+def default_cache():
+    """
+    Returns the cache shared by everything running in this Python session.
+    It lives in the system temp directory so it also survives restarts.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = StencilCache(os.path.join(tempfile.gettempdir(), "SubdivisionStencils"))
+    return _default_cache
@@ -0,0 +1,57 @@
+import bpy
+import os
+import sys
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.append(SCRIPTS_DIR)
+
+import MeshArrays
+import NurbsEvaluation
+import NurbsTessellation
+
+# Converts NURBS surface objects into meshes with the adaptive tessellation of
+# NurbsTessellation.py: triangles are dense where the surface bends and sparse where it
+# is flat, and patches of the same object that share a boundary are welded.
+# Only splines of type 'NURBS' are converted; tolerances are in object space.
+
+def tessellate_nurbs(obj, chordal_tolerance=1e-3, angle_tolerance=NurbsTessellation.ANGLE_TOLERANCE,
+                     max_depth=NurbsTessellation.MAX_DEPTH):
+    """
+    Creates a mesh object next to a SURFACE object. Returns it, or None without NURBS splines.
+    """
+    splines = [s for s in obj.data.splines if s.type == 'NURBS']
+    if not splines:
+        return None
+    patches = [NurbsEvaluation.NurbsSurface.from_spline(s) for s in splines]
+    positions, triangles, patch_index = NurbsTessellation.tessellate_patches(
+        patches, chordal_tolerance, angle_tolerance, max_depth=max_depth)
+
+    me = bpy.data.meshes.new(f"{obj.name}_Tessellated")
+    MeshArrays.write_triangle_mesh(me, positions, triangles)
+    for material in obj.data.materials:
+        me.materials.append(material)
+    material_index = np.array([s.material_index for s in splines], dtype=np.int32)
+    MeshArrays.write_polygon_values(me, "material_index", material_index[patch_index])
+
+    result = bpy.data.objects.new(me.name, me)
+    result.matrix_world = obj.matrix_world
+    for collection in obj.users_collection:
+        collection.objects.link(result)
+
+    uniform = sum(2 * (s.resolution_u * s.point_count_u - 1) * (s.resolution_v * s.point_count_v - 1) for s in splines)
+    print(f"{obj.name}: {len(triangles)} triangles, about {uniform} at the spline resolutions")
+    return result
+
+# --- Execution ---
+if __name__ == "__main__":
+    CHORDAL_TOLERANCE=1e-3
+    MAX_DEPTH=8
+
+    surfaces = [obj for obj in bpy.context.selected_objects if obj.type == 'SURFACE']
+    if not surfaces:
+        print("Please select NURBS surface objects.")
+    for obj in surfaces:
+        tessellate_nurbs(obj, CHORDAL_TOLERANCE, max_depth=MAX_DEPTH)